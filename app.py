@@ -15,8 +15,6 @@ logger = sup_f.init_custome_logger(
 CHAT_CONFIG = sup_f.get_config(BOT_CONFIG_PATH, 'CHAT')
 DB_CONFIG = sup_f.get_config(BOT_CONFIG_PATH, 'DB')
 
-data_presenter = DataPresenter(CHAT_CONFIG, DB_CONFIG)
-
 # The layer for choosing an around
 CHOOSING_AROUND = 0
 
@@ -40,6 +38,7 @@ TEXT_COMMON_STAT = '📊 The common statistics'
 TEXT_NEW_STAT = '⚡ By the new flats relative to old ones'
 TEXT_OLD_STAT = '⌛ By the old flats'
 TEXT_SOLD_STAT = '💵 By the sold flats relative to old ones'
+TEXT_WEEK_STAT = '📅 The week over week changes'
 TEXT_GEN_SUM = 'ℹ General summary'
 TEXT_STAT_BY_FLAT = '🔢 The stats by number of rooms'
 TEXT_STAT_BY_RB = '🏘 The stats by residential complex'
@@ -82,6 +81,7 @@ def around_choice(update: Update, context: CallbackContext) -> int:
             [TEXT_NEW_STAT],
             [TEXT_OLD_STAT],
             [TEXT_SOLD_STAT],
+            [TEXT_WEEK_STAT],
             [TEXT_BACK]
         ], input_field_placeholder='Chose menu item...')
     )
@@ -110,6 +110,12 @@ def around_cons_report(update: Update, context: CallbackContext) -> None:
     )
 
 
+def around_week_report(update: Update, context: CallbackContext) -> None:
+    update.message.reply_text(
+        data_presenter.get_week_report()
+    )
+
+
 def help_command(update: Update, context: CallbackContext) -> None:
     """Send a message when the command /help is issued."""
     update.message.reply_text('Help!')
@@ -149,6 +155,7 @@ def back_from_main_menu_item(update: Update, context: CallbackContext) -> int:
             [TEXT_NEW_STAT],
             [TEXT_OLD_STAT],
             [TEXT_SOLD_STAT],
+            [TEXT_WEEK_STAT],
             [TEXT_BACK]
         ], input_field_placeholder='Chose menu item...')
     )
@@ -302,6 +309,10 @@ def end(update: Update, context: CallbackContext) -> int:
 if __name__ == '__main__':
     logger.info('RUN')
 
+    # Created only in the main process: with is_parallel_render the render workers
+    # import this module again and must not start rendering themselves
+    data_presenter = DataPresenter(CHAT_CONFIG, DB_CONFIG)
+
     """Start the bot."""
     # Create the Updater and pass it your bot's token.
     updater = Updater(CHAT_CONFIG['token'])
@@ -322,6 +333,7 @@ if __name__ == '__main__':
                 MessageHandler(
                     Filters.regex(f'^({TEXT_COMMON_STAT}|{TEXT_NEW_STAT}|{TEXT_OLD_STAT}|{TEXT_SOLD_STAT})$'),
                     main_menu_item_choice),
+                MessageHandler(Filters.regex(f'^{TEXT_WEEK_STAT}$'), around_week_report),
                 MessageHandler(Filters.regex(f'^{TEXT_BACK}$'), back_from_around_main_menu),
             ],
             CHOOSING_STAT_GROUP: [
@@ -1,105 +1,59 @@
 """Модуль для получения и обработки данных из БД
 """
 import logging
-from datetime import timedelta
-from typing import Dict, List
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
-from . import support_functions as sup_f
 from .data_parser_root import DataParserRoot
-
-
-class DataParser(DataParserRoot):
-    """Класс для получения и обработки данных из БД
+from .day_store import DayStore
+
+# Расширение файлов колоночных снимков данных
+SNAPSHOT_FILE_EXT = '.feather'
+# Расширение директорий хранилищ данных по дням
+DAY_STORE_DIR_EXT = '.days'
+# Компактная схема основного набора данных, приводится при загрузке в init_data()
+# Колонки с целочисленными id
+DATA_ID_COLUMNS = ['id_custome']
+# Колонки с наименованиями, хранимые как категориальные
+DATA_CATEGORY_COLUMNS = ['rb_title', 'rooms_count_title']
+# Числовые колонки, уменьшаемые до int32 или float32, если это не меняет значений
+DATA_NUMERIC_COLUMNS = ['total_area', 'price']
+# Типы статистики и группировки стат. данных, которые получает рендер
+STAT_TYPES = ['common', 'new', 'sell', 'old']
+STAT_GROUPINGS = [[], ['rooms_count_title'], ['rb_title'], ['rb_title', 'rooms_count_title']]
+
+
+class StatData():
+    """Класс получения стат. данных по типам статистики и группировкам
+    из уже рассчитанных стат. данных, без основного набора данных.
+    Нужен рендеру, которому стат. данные окружения достаются из снимка
+    или после рендеринга окружения, см. DataParser.get_all_stat_data()
 
     Args:
-        DataParserRoot (class): Корневой класс для получения и обработки данных из БД
+        stat_data (Dict[Tuple[str, Tuple[str, ...]], List[Dict]]): Стат. данные
+        по типу статистики и группировке
     """
 
-    def __init__(self, db_config):
-        logging.debug('Инициализация')
-        DataParserRoot.__init__(self, db_config)
-        # Срез новых записей данных за текущий день
-        self.__new_data_current_day: DataFrame = pd.DataFrame({})
-
-        # Срез старых записей данных за текущий день
-        self.__old_data_current_day: DataFrame = pd.DataFrame({})
-
-        # Срез старых записей данных за предыдущий день
-        self.__old_data_previous_day: DataFrame = pd.DataFrame({})
-
-        # Срез проданных записей данных за текущий день
-        self.__sell_data_current_day: DataFrame = pd.DataFrame({})
-
-        # Срез данных за текущий день
-        self.data_current_day: DataFrame = pd.DataFrame({})
+    def __init__(self, stat_data: Dict[Tuple[str, Tuple[str, ...]], List[Dict]]):
+        # Стат. данные по типу статистики и группировке
+        self.stat_data = stat_data
 
-        # Срез данных за предыдущий день
-        self.data_previous_day: DataFrame = pd.DataFrame({})
-
-    def init_data(self, sql_query: str = '', file_path: str = '') -> None:
-        """Инициализация данных для последующих обработки и получения
+    def get_stat_data(self, stat_type: str, group_rows: List[str]) -> List[Dict]:
+        """Получение стат. данных по типу статистики и группировке
 
         Args:
-            sql_query (str): SQL-запрос для полученния данных из БД
-            file_path (str): The path to the file contained data
-        """
-        logging.info('Инициализация значений для последующей обработки')
-
-        if not sql_query and not file_path:
-            raise Exception('The sql_query param or the file_path param must be provided')
-
-        # Получаем данные для обработки
-        if sql_query:
-            logging.debug(f'Получение основного набора данных по запросу: \n {sql_query}')
-            self.data = self.db_wrapper.execute_select_pd(sql_query)
-            # self.data.to_csv('data.csv', encoding='utf-8')
-        else:
-            logging.debug(f'Getting data from the file: \n {file_path}')
-            self.data = pd.read_csv(file_path, encoding='utf-8', parse_dates=['price_actual_date'])
-
-        logging.debug(f'Записей получено: {len(self.data)}')
-
-        # Получаем текущую дату 'сегодня' из данных
-        self.current_date = self.data.price_actual_date.max().date()
-        logging.debug(f'Текущая дата определена: {self.current_date}')
-        # Переводим текущую дату в тектовый формат для сравнения в pd
-        self.current_date_str = str(self.current_date)
-
-        # Устанавливаем дату предыдущего дня
-        self.previous_date = self.current_date + timedelta(days=-1)
-        logging.debug(f'Предыдущая дата: {self.previous_date}')
-        # Переводим дату предыдущего дня в строчный вид
-        self.previous_date_str = str(self.previous_date)
-
-        # Устанавливаем срез данных за текущий день
-        self.data_current_day = self.data[self.data.price_actual_date == self.current_date_str].copy()
-        logging.debug(
-            f'Количество записей в срезе за дату {self.current_date_str}: {len(self.data_current_day)}')
-        # Устанавливаем срез данных за предыдущий день
-        self.data_previous_day = self.data[self.data.price_actual_date == self.previous_date_str].copy()
-        logging.debug(
-            f'Количество записей в срезе за дату {self.previous_date_str}: {len(self.data_previous_day)}')
-
-        self.__old_data_current_day = self.get_old_data(
-            self.current_date + timedelta(days=-30), self.current_date)
-        logging.debug(
-            f'Количество старых записей за текущую дату {self.current_date}: {len(self.__old_data_current_day)}')
-
-        self.__old_data_previous_day = self.get_old_data(
-            self.previous_date + timedelta(days=-30), self.previous_date)
-        logging.debug(
-            f'Количество старых записей за предыдущую дату: {len(self.__old_data_previous_day)}')
-
-        self.__new_data_current_day = sup_f.get_diff_data(self.data_current_day, self.data_previous_day)
-        logging.debug(
-            f'Количество новых записей за текущую дату: {len(self.__new_data_current_day)}')
+            stat_type (str): Тип статистики: common, new, sell или old
+            group_rows (List[str]): Список из строк группировки данных,
+            пустой список - общая сводка
 
-        self.__sell_data_current_day = self.get_sell_data(self.previous_date, self.current_date)
-        logging.debug(
-            f'Количество проданных записей за текущую дату: {len(self.__sell_data_current_day)}')
+        Returns:
+            List[Dict]: Стат. данные
+        """
+        return self.stat_data[(stat_type, tuple(group_rows))]
 
     def get_common_cons_all_rb(self) -> Dict:
         """Полученние стат. данных общей сводки общей статистики
@@ -108,7 +62,7 @@ class DataParser(DataParserRoot):
         Returns:
             Dict: стат. данные общей сводки общей статистики
         """
-        return self.set_common_attrs({}, self.data_current_day, self.data_previous_day)
+        return next(iter(self.get_stat_data('common', [])), {})
 
     def get_common_cons_each_count_flats(self) -> List[Dict]:
         """Получение стат. данных общей статистики в разрезе типа комнат
@@ -116,7 +70,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные общей статистики в разрезе типа комнат
         """
-        return self.generate_stat_data(self.data_current_day, self.data_previous_day, ['rooms_count_title'])
+        return self.get_stat_data('common', ['rooms_count_title'])
 
     def get_common_cons_each_rbs(self) -> List[Dict]:
         """Получение стат. данных общей статистики в разрезе типа ЖК
@@ -124,7 +78,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные общей статистики в разрезе типа ЖК
         """
-        return self.generate_stat_data(self.data_current_day, self.data_previous_day, ['rb_title'])
+        return self.get_stat_data('common', ['rb_title'])
 
     def get_common_cons_each_rb_to_count_flats(self) -> List[Dict]:
         """Получение стат. данных общей статистики в разрезе типа ЖК
@@ -134,9 +88,7 @@ class DataParser(DataParserRoot):
             List[Dict]: Стат. данные общей статистики в разрезе типа ЖК
             по типу комнат
         """
-        return self.generate_stat_data(self.data_current_day,
-                                       self.data_previous_day,
-                                       ['rb_title', 'rooms_count_title'])
+        return self.get_stat_data('common', ['rb_title', 'rooms_count_title'])
 
     def get_new_cons_all_rb(self) -> Dict:
         """Получение стат. данных новых за текущую дату относительно старых
@@ -146,7 +98,7 @@ class DataParser(DataParserRoot):
             List[Dict]: Стат. данные общей сводки
         """
 
-        return self.set_common_attrs({}, self.__new_data_current_day, self.__old_data_current_day)
+        return next(iter(self.get_stat_data('new', [])), {})
 
     def get_new_cons_each_count_flats(self) -> List[Dict]:
         """Стат. данные новые за текущую дату относительно старых за пред.
@@ -155,9 +107,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные по типу квартир
         """
-        return self.generate_stat_data(self.__new_data_current_day,
-                                       self.__old_data_current_day,
-                                       ['rooms_count_title'])
+        return self.get_stat_data('new', ['rooms_count_title'])
 
     def get_new_cons_each_rbs(self) -> List[Dict]:
         """Стат. данные новые за текущую дату относительно старых за пред.
@@ -166,9 +116,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные по типу ЖК
         """
-        return self.generate_stat_data(self.__new_data_current_day,
-                                       self.__old_data_current_day,
-                                       ['rb_title'])
+        return self.get_stat_data('new', ['rb_title'])
 
     def get_new_cons_each_rb_to_count_flats(self) -> List[Dict]:
         """Стат. данные новые за текущую дату относительно старых за пред.
@@ -177,11 +125,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные по типу ЖК и типу квартир
         """
-        return self.generate_stat_data(self.__new_data_current_day,
-                                       self.__old_data_current_day,
-                                       ['rb_title', 'rooms_count_title'])
-
-    ######
+        return self.get_stat_data('new', ['rb_title', 'rooms_count_title'])
 
     def get_sell_cons_all_rb(self) -> Dict:
         """Получение стат. данных проданных за текущую дату относительно старых
@@ -191,7 +135,7 @@ class DataParser(DataParserRoot):
             List[Dict]: Стат. данные общей сводки
         """
 
-        return self.set_common_attrs({}, self.__sell_data_current_day, self.__old_data_current_day)
+        return next(iter(self.get_stat_data('sell', [])), {})
 
     def get_sell_cons_each_count_flats(self) -> List[Dict]:
         """Стат. данные проданные за текущую дату относительно старых за пред.
@@ -200,9 +144,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные по типу квартир
         """
-        return self.generate_stat_data(self.__sell_data_current_day,
-                                       self.__old_data_current_day,
-                                       ['rooms_count_title'])
+        return self.get_stat_data('sell', ['rooms_count_title'])
 
     def get_sell_cons_each_rbs(self) -> List[Dict]:
         """Стат. данные проданные за текущую дату относительно старых за пред.
@@ -211,9 +153,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные по типу ЖК
         """
-        return self.generate_stat_data(self.__sell_data_current_day,
-                                       self.__old_data_current_day,
-                                       ['rb_title'])
+        return self.get_stat_data('sell', ['rb_title'])
 
     def get_sell_cons_each_rb_to_count_flats(self) -> List[Dict]:
         """Стат. данные проданные за текущую дату относительно старых за пред.
@@ -222,9 +162,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные по типу ЖК и типу квартир
         """
-        return self.generate_stat_data(self.__sell_data_current_day,
-                                       self.__old_data_current_day,
-                                       ['rb_title', 'rooms_count_title'])
+        return self.get_stat_data('sell', ['rb_title', 'rooms_count_title'])
 
     def get_old_cons_all_rb(self) -> Dict:
         """Полученние стат. данных общей сводки общей статистики
@@ -234,7 +172,7 @@ class DataParser(DataParserRoot):
         Returns:
             Dict: стат. данные общей сводки общей статистики
         """
-        return self.set_common_attrs({}, self.__old_data_current_day, self.__old_data_previous_day)
+        return next(iter(self.get_stat_data('old', [])), {})
 
     def get_old_cons_each_count_flats(self) -> List[Dict]:
         """Получение стат. данных общей статистики в разрезе типа комнат
@@ -242,9 +180,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные общей статистики в разрезе типа комнат
         """
-        return self.generate_stat_data(self.__old_data_current_day,
-                                       self.__old_data_previous_day,
-                                       ['rooms_count_title'])
+        return self.get_stat_data('old', ['rooms_count_title'])
 
     def get_old_cons_each_rbs(self) -> List[Dict]:
         """Получение стат. данных общей статистики в разрезе типа ЖК
@@ -252,9 +188,7 @@ class DataParser(DataParserRoot):
         Returns:
             List[Dict]: Стат. данные общей статистики в разрезе типа ЖК
         """
-        return self.generate_stat_data(self.__old_data_current_day,
-                                       self.__old_data_previous_day,
-                                       ['rb_title'])
+        return self.get_stat_data('old', ['rb_title'])
 
     def get_old_cons_each_rb_to_count_flats(self) -> List[Dict]:
         """Получение стат. данных общей статистики в разрезе типа ЖК
@@ -264,6 +198,331 @@ class DataParser(DataParserRoot):
             List[Dict]: Стат. данные общей статистики в разрезе типа ЖК
             по типу комнат
         """
-        return self.generate_stat_data(self.__old_data_current_day,
-                                       self.__old_data_previous_day,
-                                       ['rb_title', 'rooms_count_title'])
+        return self.get_stat_data('old', ['rb_title', 'rooms_count_title'])
+
+
+class DataParser(DataParserRoot, StatData):
+    """Класс для получения и обработки данных из БД
+
+    Args:
+        DataParserRoot (class): Корневой класс для получения и обработки данных из БД
+        StatData (class): Класс получения стат. данных, стат. данные
+        рассчитываются при первом обращении
+    """
+
+    def __init__(self, db_config):
+        logging.debug('Инициализация')
+        DataParserRoot.__init__(self, db_config)
+        # Рассчитанные стат. данные по типу статистики и группировке
+        # сбрасываются в методах init_data() и init_common_stat_data()
+        StatData.__init__(self, {})
+        # Срез новых записей данных за текущий день
+        self.__new_data_current_day: DataFrame = pd.DataFrame({})
+
+        # Срез старых записей данных за текущий день
+        self.__old_data_current_day: DataFrame = pd.DataFrame({})
+
+        # Срез старых записей данных за предыдущий день
+        self.__old_data_previous_day: DataFrame = pd.DataFrame({})
+
+        # Срез проданных записей данных за текущий день
+        self.__sell_data_current_day: DataFrame = pd.DataFrame({})
+
+        # Срез данных за текущий день
+        self.data_current_day: DataFrame = pd.DataFrame({})
+
+        # Срез данных за предыдущий день
+        self.data_previous_day: DataFrame = pd.DataFrame({})
+
+        # Кубы стат. данных по типам статистики, строятся при первом обращении
+        # сбрасываются в методе init_data()
+        self.__stat_cubes: Dict[str, Dict] = {}
+        # Куб дневных стат. данных для сравнения произвольных промежутков,
+        # строится при первом обращении, сбрасывается в методе init_data()
+        self.__daily_stat_cube: Optional[Dict] = None
+
+        # Агрегаты общей статистики, посчитанные в БД
+        # устанавливается в методе init_common_stat_data()
+        self.__common_stat_data: Optional[DataFrame] = None
+
+    def init_data(self, sql_query: str = '', file_path: str = '', data: Optional[DataFrame] = None) -> None:
+        """Инициализация данных для последующих обработки и получения
+
+        Args:
+            sql_query (str): SQL-запрос для полученния данных из БД
+            file_path (str): The path to the file contained data
+            data (Optional[DataFrame]): Уже полученный набор данных,
+            например срез окружения из общего набора по всем окружениям
+        """
+        logging.info('Инициализация значений для последующей обработки')
+
+        if not sql_query and not file_path and data is None:
+            raise Exception('The sql_query param, the file_path param or the data param must be provided')
+
+        # Получаем данные для обработки
+        if data is not None:
+            logging.debug('Получение основного набора данных из переданного DataFrame')
+            self.data = data
+        elif sql_query:
+            logging.debug(f'Получение основного набора данных по запросу: \n {sql_query}')
+            self.data = self.db_wrapper.execute_select_pd(sql_query)
+            # self.data.to_csv('data.csv', encoding='utf-8')
+        elif file_path.endswith(DAY_STORE_DIR_EXT):
+            logging.debug(f'Getting data from the day store: \n {file_path}')
+            self.data = DayStore(file_path).read_data()
+        elif file_path.endswith(SNAPSHOT_FILE_EXT):
+            logging.debug(f'Getting data from the snapshot file: \n {file_path}')
+            self.data = pd.read_feather(file_path)
+        else:
+            logging.debug(f'Getting data from the file: \n {file_path}')
+            self.data = pd.read_csv(file_path, encoding='utf-8', parse_dates=['price_actual_date'])
+
+        logging.debug(f'Записей получено: {len(self.data)}')
+        # Приводим основной набор данных к компактной схеме
+        self.set_compact_dtypes()
+        # Общая статистика снова считается по основному набору данных
+        self.__common_stat_data = None
+        self.__stat_cubes = {}
+        self.stat_data = {}
+        self.__daily_stat_cube = None
+
+        # Сортируем данные по дате для получения срезов по дням без копирования
+        self.set_data_days_offsets()
+        # Строим матрицу присутствия записей по дням
+        self.set_data_presence()
+
+        # Получаем текущую дату 'сегодня' из данных, последний день отсортированного массива дней
+        self.current_date = self.data_days[-1].item()
+        logging.debug(f'Текущая дата определена: {self.current_date}')
+
+        # Устанавливаем дату предыдущего дня
+        self.previous_date = self.current_date + timedelta(days=-1)
+        logging.debug(f'Предыдущая дата: {self.previous_date}')
+
+        # Устанавливаем срез данных за текущий день
+        self.data_current_day = self.get_days_data(self.current_date, self.current_date)
+        logging.debug(
+            f'Количество записей в срезе за дату {self.current_date}: {len(self.data_current_day)}')
+        # Устанавливаем срез данных за предыдущий день
+        self.data_previous_day = self.get_days_data(self.previous_date, self.previous_date)
+        logging.debug(
+            f'Количество записей в срезе за дату {self.previous_date}: {len(self.data_previous_day)}')
+
+        self.__old_data_current_day = self.get_old_data(
+            self.current_date + timedelta(days=-30), self.current_date)
+        logging.debug(
+            f'Количество старых записей за текущую дату {self.current_date}: {len(self.__old_data_current_day)}')
+
+        self.__old_data_previous_day = self.get_old_data(
+            self.previous_date + timedelta(days=-30), self.previous_date)
+        logging.debug(
+            f'Количество старых записей за предыдущую дату: {len(self.__old_data_previous_day)}')
+
+        self.__new_data_current_day = self.get_show_data(self.current_date)
+        logging.debug(
+            f'Количество новых записей за текущую дату: {len(self.__new_data_current_day)}')
+
+        self.__sell_data_current_day = self.get_sell_data(self.previous_date, self.current_date)
+        logging.debug(
+            f'Количество проданных записей за текущую дату: {len(self.__sell_data_current_day)}')
+
+    def init_common_stat_data(self, sql_query: str) -> None:
+        """Инициализация агрегатов общей статистики, посчитанных в БД.
+        После нее стат. данные общей статистики берутся из агрегатов,
+        а не из основного набора данных
+
+        Args:
+            sql_query (str): SQL-запрос агрегатов по GROUPING SETS
+            с колонками grouping_id, price_actual_date, количеством записей,
+            агрегатами STAT_AGGS для текущей и предыдущей даты
+            и количеством уникальных id_custome
+        """
+        logging.debug(f'Получение агрегатов общей статистики по запросу: \n {sql_query}')
+        self.__common_stat_data = self.db_wrapper.execute_select_pd(sql_query)
+        self.stat_data = {}
+        logging.debug(f'Агрегатов получено: {len(self.__common_stat_data)}')
+
+        current_dates = self.__common_stat_data['price_actual_date'].dropna()
+        if not current_dates.empty:
+            self.current_date = pd.Timestamp(current_dates.iloc[0]).date()
+            self.previous_date = self.current_date + timedelta(days=-1)
+
+    def set_compact_dtypes(self) -> None:
+        """Приведение основного набора данных к компактной схеме:
+        целочисленные id, категориальные наименования, int32 или float32
+        для числовых колонок, если значения при этом не меняются
+        """
+        compact_dtypes: Dict = {}
+        for column in DATA_ID_COLUMNS:
+            compact_dtypes[column] = self.__get_compact_int_dtype(self.data[column])
+        for column in DATA_CATEGORY_COLUMNS:
+            compact_dtypes[column] = 'category'
+        for column in DATA_NUMERIC_COLUMNS:
+            values = self.data[column].to_numpy()
+            if self.__get_compact_int_dtype(self.data[column]) == 'int32':
+                compact_dtypes[column] = 'int32'
+            elif np.array_equal(values.astype('float32').astype(values.dtype), values):
+                compact_dtypes[column] = 'float32'
+        compact_dtypes = {column: dtype for column, dtype in compact_dtypes.items()
+                          if dtype is not None and self.data[column].dtype != dtype}
+        if compact_dtypes:
+            self.data = self.data.astype(compact_dtypes)
+        logging.debug(f'Типы колонок основного набора данных: {self.data.dtypes.to_dict()}')
+
+    def get_memory_report(self) -> Dict:
+        """Получение отчета о памяти, занимаемой основным набором данных
+        и срезами, полученными из него в init_data()
+
+        Returns:
+            Dict: Байты по каждой колонке основного набора данных,
+            всего по основному набору данных и всего по срезам
+        """
+        report = {column: int(size) for column, size in self.data.memory_usage(index=False, deep=True).items()}
+        report['data_total'] = int(self.data.memory_usage(deep=True).sum())
+        report['slices_total'] = int(sum(slice_data.memory_usage(deep=True).sum() for slice_data in (
+            self.__new_data_current_day, self.__old_data_current_day,
+            self.__old_data_previous_day, self.__sell_data_current_day)))
+        return report
+
+    def __get_compact_int_dtype(self, column: pd.Series) -> Optional[str]:
+        """Получение наименьшего из int32 и int64 целочисленного типа,
+        в котором значения колонки хранятся без изменений
+
+        Args:
+            column (pd.Series): Колонка
+
+        Returns:
+            Optional[str]: Тип колонки или None, если значения не целые
+        """
+        values = column.to_numpy()
+        if not np.issubdtype(values.dtype, np.number) or not np.all(np.mod(values, 1) == 0):
+            return None
+        if not len(values) or (values.min() >= np.iinfo('int32').min and values.max() <= np.iinfo('int32').max):
+            return 'int32'
+        return 'int64'
+
+    def dump_data(self, file_path: str) -> None:
+        """Сохранение основного набора данных в колоночный снимок (Feather / Arrow IPC)
+        с категориальными наименованиями и нативной датой.
+        Если путь с расширением DAY_STORE_DIR_EXT, то данные сохраняются
+        в хранилище по дням
+
+        Args:
+            file_path (str): Путь до файла снимка или директории хранилища
+        """
+        if file_path.endswith(DAY_STORE_DIR_EXT):
+            # В хранилище по дням строки разных дней лежат по дням,
+            # порядок строк внутри дня исходный
+            DayStore(file_path).write_data(self.data)
+            return
+
+        # Данные уже в компактной схеме с категориальными наименованиями,
+        # строки сохраняются в исходном порядке
+        self.data.iloc[np.argsort(self.data_source_rows)].reset_index(drop=True).to_feather(file_path)
+        logging.info(f'{file_path} dumped')
+
+    def get_all_stat_data(self) -> Dict[Tuple[str, Tuple[str, ...]], List[Dict]]:
+        """Полученние стат. данных всех типов статистики по всем группировкам.
+        Через StatData по ним можно получать стат. данные
+        уже без основного набора данных, например при отложенном рендеринге
+
+        Returns:
+            Dict[Tuple[str, Tuple[str, ...]], List[Dict]]: Стат. данные
+            по типу статистики и группировке
+        """
+        for stat_type in STAT_TYPES:
+            for group_rows in STAT_GROUPINGS:
+                self.get_stat_data(stat_type, group_rows)
+        return self.stat_data
+
+    def get_period_stat_data(self, cur_from_date: date, cur_to_date: date,
+                             prev_from_date: date, prev_to_date: date, group_rows: List[str]) -> List[Dict]:
+        """Полученние стат. данных сравнения промежутка с cur_from_date по cur_to_date
+        с промежутком с prev_from_date по prev_to_date по всем записям промежутков.
+        Считаются по накопленным дневным агрегатам без прохода по основному набору данных,
+        поэтому средние на границе округления могут отличаться в последнем знаке
+        от посчитанных по самим записям
+
+        Args:
+            cur_from_date (date): Начало текущего промежутка
+            cur_to_date (date): Конец текущего промежутка
+            prev_from_date (date): Начало предыдущего промежутка
+            prev_to_date (date): Конец предыдущего промежутка
+            group_rows (List[str]): Список из строк группировки данных,
+            пустой список - общая сводка
+
+        Returns:
+            List[Dict]: Рассчитанные стат. данные
+        """
+        if self.__daily_stat_cube is None:
+            self.__daily_stat_cube = self.generate_daily_stat_cube()
+        stat_data = self.rollup_stat_cube(
+            self.get_period_stat_cube(self.__daily_stat_cube, cur_from_date, cur_to_date,
+                                      prev_from_date, prev_to_date),
+            group_rows)
+        for row in stat_data:
+            row['pd_price_actual_date'] = prev_to_date
+            row['price_actual_date'] = cur_to_date
+        return stat_data
+
+    def get_last_days_stat_data(self, days_count: int, group_rows: List[str]) -> List[Dict]:
+        """Полученние стат. данных сравнения последних days_count дней по текущую дату
+        с предыдущими days_count днями: 1 - день к дню, 7 - неделя к неделе.
+        Основной набор данных охватывает 31 день, поэтому полностью
+        сравниваются промежутки не длиннее 15 дней
+
+        Args:
+            days_count (int): Количество дней в промежутке
+            group_rows (List[str]): Список из строк группировки данных,
+            пустой список - общая сводка
+
+        Returns:
+            List[Dict]: Рассчитанные стат. данные
+        """
+        cur_from_date = self.current_date + timedelta(days=-(days_count - 1))
+        return self.get_period_stat_data(
+            cur_from_date, self.current_date,
+            cur_from_date + timedelta(days=-days_count), cur_from_date + timedelta(days=-1),
+            group_rows)
+
+    def get_stat_data(self, stat_type: str, group_rows: List[str]) -> List[Dict]:
+        """Получение стат. данных по типу статистики и группировке.
+        Стат. данные рассчитываются один раз после init_data(),
+        повторные обращения рендера получают уже рассчитанные
+
+        Args:
+            stat_type (str): Тип статистики: common, new, sell или old
+            group_rows (List[str]): Список из строк группировки данных,
+            пустой список - общая сводка
+
+        Returns:
+            List[Dict]: Рассчитанные стат. данные
+        """
+        stat_key = (stat_type, tuple(group_rows))
+        if stat_key not in self.stat_data:
+            if stat_type == 'common' and self.__common_stat_data is not None:
+                self.stat_data[stat_key] = self.generate_pushdown_stat_data(self.__common_stat_data, group_rows)
+            else:
+                self.stat_data[stat_key] = self.rollup_stat_cube(self.__get_stat_cube(stat_type), group_rows)
+        return self.stat_data[stat_key]
+
+    def __get_stat_cube(self, stat_type: str) -> Dict:
+        """Получение куба стат. данных по типу статистики.
+        Куб строится по срезам данных один раз после init_data(),
+        все группировки типа статистики получаются из него
+
+        Args:
+            stat_type (str): Тип статистики: common, new, sell или old
+
+        Returns:
+            Dict: Куб стат. данных, см. generate_stat_cube()
+        """
+        if stat_type not in self.__stat_cubes:
+            cur_data, prev_data = {
+                'common': (self.data_current_day, self.data_previous_day),
+                'new': (self.__new_data_current_day, self.__old_data_current_day),
+                'sell': (self.__sell_data_current_day, self.__old_data_current_day),
+                'old': (self.__old_data_current_day, self.__old_data_previous_day),
+            }[stat_type]
+            self.__stat_cubes[stat_type] = self.generate_stat_cube(cur_data, prev_data)
+        return self.__stat_cubes[stat_type]
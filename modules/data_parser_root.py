@@ -3,7 +3,7 @@
 import logging
 # from logging import Logger
 from datetime import date, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -13,6 +13,22 @@ import modules.support_functions as sup_f
 
 from .db_wrapper import DBWrapper
 
+# Значения GROUPING(rb_title, rooms_count_title) для каждой группировки
+# агрегатов, посчитанных в БД
+STAT_PUSHDOWN_GROUPINGS: Dict[Tuple[str, ...], int] = {
+    (): 3,
+    ('rooms_count_title',): 2,
+    ('rb_title',): 1,
+    ('rb_title', 'rooms_count_title'): 0,
+}
+# Средние и суммы групп текущих (cur_) и предыдущих (prev_) данных, по которым
+# считаются стат. данные помимо количества записей cur_count и prev_count
+STAT_AGGS = ('avg_total_area', 'avg_price', 'sum_price', 'sum_total_area')
+# Колонки самой детальной группировки куба стат. данных
+STAT_CUBE_GROUP_ROWS = ['rb_title', 'rooms_count_title']
+# Колонки, суммы которых хранятся в кубе стат. данных
+STAT_CUBE_COLUMNS = ['total_area', 'price']
+
 
 class DataParserRoot():
     """Корневой класс для получения и обработки данных из БД
@@ -26,6 +42,36 @@ class DataParserRoot():
         # для обработки
         # устанавливается в методе set_data()
         self.data: DataFrame = pd.DataFrame({})
+        # Дни основного набора данных в виде отсортированного массива datetime64[D]
+        # устанавливается в методе set_data_days_offsets()
+        self.data_days: np.ndarray = np.array([], dtype='datetime64[D]')
+        # Номера первых строк каждого дня в отсортированном по дате основном
+        # наборе данных, последний элемент - количество строк
+        # устанавливается в методе set_data_days_offsets()
+        self.data_days_offsets: np.ndarray = np.array([0])
+        # Номер строки в исходном порядке основного набора данных для каждой строки
+        # отсортированного по дате набора
+        # устанавливается в методе set_data_days_offsets()
+        self.data_source_rows: np.ndarray = np.array([], dtype=int)
+        # Уникальные id_custome основного набора данных
+        # устанавливается в методе set_data_presence()
+        self.data_ids: np.ndarray = np.array([])
+        # Номер id_custome из data_ids для каждой строки основного набора данных
+        # устанавливается в методе set_data_presence()
+        self.data_id_codes: np.ndarray = np.array([], dtype=int)
+        # Матрица присутствия id_custome из data_ids по дням из data_days
+        # устанавливается в методе set_data_presence()
+        self.data_presence: np.ndarray = np.zeros((0, 0), dtype=bool)
+        # Пары (номер id_custome из data_ids, номер дня с 1970-01-01) присутствия записей,
+        # отсортированные по id_custome и дню
+        # устанавливается в методе set_data_presence()
+        self.data_presence_ids: np.ndarray = np.array([], dtype=int)
+        self.data_presence_days: np.ndarray = np.array([], dtype=int)
+        # Количество записей каждого id_custome из data_ids за дни скользящего окна
+        # и номера первого дня окна и дня после окна в массиве дней data_days
+        # сбрасываются в методе set_data_presence(), сдвигаются в методе get_window_presence()
+        self.data_window_presence: np.ndarray = np.array([], dtype=np.int32)
+        self.data_window_indexes: Tuple[int, int] = (0, 0)
         # Вспомогательная переменная для обозначения пустых данных
         self.df_empty_row = pd.DataFrame({'id_custome': []})
 
@@ -33,21 +79,33 @@ class DataParserRoot():
         # что считаем за 'сегодня'
         # устанавливается в методе set_data()
         self.current_date: date = date(1970, 1, 1)
-        self.current_date_str: str = ""
 
         # Предыдущая дата отсчета обработки данных
         # что считаем за 'вчера'
         # устанавливается в методе set_data()
         self.previous_date: date = date(1970, 1, 1)
-        self.previous_date_str: str = ""
 
         logging.info('Инициализация выполнена')
 
-    def set_common_attrs(self, agg_data: Dict, data_cur_date: DataFrame, data_prev_date: DataFrame) -> Dict:
-        """Вычисление общих стат. значений для каждой записи атрибутов
+    def set_common_agg_attrs(self, agg_data: Dict, cur_agg: Dict, prev_agg: Dict,
+                             count_show: int, count_hide: int) -> Dict:
+        """Вычисление общих стат. значений для записи атрибутов по уже
+        посчитанным агрегатам текущей и предыдущей даты
+
+        Args:
+            agg_data (Dict): Запись атрибутов для заполнения
+            cur_agg (Dict): Агрегаты текущей даты: count - количество записей,
+            avg_total_area, avg_price - средние площадь и цена,
+            sum_price, sum_total_area - суммы цен и площадей
+            prev_agg (Dict): Агрегаты предыдущей даты, как у cur_agg
+            count_show (int): Количество появившихся записей в текущую дату
+            count_hide (int): Количество пропавших записей в текущую дату
+
+        Returns:
+            Dict: Заполненная запись атрибутов
         """
-        prev_count = data_prev_date['id_custome'].count()
-        cur_count = data_cur_date['id_custome'].count()
+        prev_count = prev_agg['count']
+        cur_count = cur_agg['count']
         # Если данных за пред. и текущее значение нет
         if not prev_count and not cur_count:
             # Возвращаем пустой словарь
@@ -58,10 +116,10 @@ class DataParserRoot():
         if prev_count != 0:
             # Предыдущие значения присутствуют
             # Расчитываем стат. данные
-            agg_data['pd_avg_flat_total_area'] = sup_f.round_area(data_prev_date['total_area'].mean())
-            agg_data['pd_avg_flat_price'] = sup_f.round_million(data_prev_date['price'].mean())
+            agg_data['pd_avg_flat_total_area'] = sup_f.round_area(prev_agg['avg_total_area'])
+            agg_data['pd_avg_flat_price'] = sup_f.round_million(prev_agg['avg_price'])
             agg_data['pd_avg_flat_price_per_metr'] = sup_f.round_thousand(
-                data_prev_date['price'].sum() / data_prev_date['total_area'].sum())
+                prev_agg['sum_price'] / prev_agg['sum_total_area'])
         else:
             # Предыдущие значения отсутствуют
             # Заполняем стат. данные нулями
@@ -74,10 +132,10 @@ class DataParserRoot():
         if cur_count != 0:
             # Текущие значения присутствуют
             # Расчитываем стат. данные
-            agg_data['avg_flat_total_area'] = sup_f.round_area(data_cur_date['total_area'].mean())
-            agg_data['avg_flat_price'] = sup_f.round_million(data_cur_date['price'].mean())
+            agg_data['avg_flat_total_area'] = sup_f.round_area(cur_agg['avg_total_area'])
+            agg_data['avg_flat_price'] = sup_f.round_million(cur_agg['avg_price'])
             agg_data['avg_flat_price_per_metr'] = sup_f.round_thousand(
-                data_cur_date['price'].sum() / data_cur_date['total_area'].sum())
+                cur_agg['sum_price'] / cur_agg['sum_total_area'])
         else:
             # Текущие значения отсутствуют
             # Заполняем стат. данные нулями
@@ -103,9 +161,9 @@ class DataParserRoot():
         agg_data['ch_count_flats'] = agg_data['count_flats'] - agg_data['pd_count_flats']
 
         # Заполняем количество появившихся записей в текущую дату по id_custome
-        agg_data['count_show'] = np.setdiff1d(data_cur_date['id_custome'], data_prev_date['id_custome']).size
+        agg_data['count_show'] = count_show
         # Заполняем количество пропавших записей в текущую дату по id_custome
-        agg_data['count_hide'] = np.setdiff1d(data_prev_date['id_custome'], data_cur_date['id_custome']).size
+        agg_data['count_hide'] = count_hide
 
         return agg_data
 
@@ -121,71 +179,385 @@ class DataParserRoot():
         Returns:
             List[Dict]: Рассчитанные стат. данные
         """
-        # Группируем наборы данных по указанным ключам
-        cur_grouped = cur_data.groupby(group_rows)
-        prev_grouped = prev_data.groupby(group_rows)
-        # Получаем наименования групп
-        cur_group_names = np.array(list(cur_grouped.groups.keys()))
-        prev_group_names = np.array(list(prev_grouped.groups.keys()))
-        # Общие групы для обоих массивов данных
-        common_group_names = sup_f.merge_np_lists(cur_group_names, prev_group_names)
-        logging.debug(f"common_group_names = {common_group_names}")
-        # Группы только для массива данных текущей даты
-        only_cur_group_names = sup_f.diff_np_lists(cur_group_names, prev_group_names)
-        logging.debug(f"only_cur_group_names = {only_cur_group_names}")
-        # Группы только для массива данных предыдущей даты
-        only_prev_group_names = sup_f.diff_np_lists(prev_group_names, cur_group_names)
-        logging.debug(f"only_prev_group_names = {only_prev_group_names}")
+        return self.rollup_stat_cube(self.generate_stat_cube(cur_data, prev_data, group_rows), group_rows)
 
-        output_data = []
-        # Генерируем стат. данные по общим группам
-        for group_name in common_group_names:
-
-            if len(group_rows) > 1:
-                # Дополняем вывод кастомными полями
-                # {'rb_title': 'Аквилон Парк', 'rooms_count_title': '1'}
-                agg_row_data = {value: group_name[key] for (key, value) in enumerate(group_rows)}
-                group_name = tuple(group_name)
-            else:
-                # Дополняем вывод кастомными полями
-                # {'rooms_count_title': '1'}
-                agg_row_data = {group_rows[0]: group_name}
-
-            # Получаем значения по имени групп
-            cur_group = cur_grouped.get_group(group_name)
-            prev_group = prev_grouped.get_group(group_name)
-            # Генерируем стат. данные по этим данным из групп
-            agg_row_data = self.set_common_attrs(agg_row_data, cur_group, prev_group)
-            output_data.append(agg_row_data)
-
-        for group_name in only_cur_group_names:
-            if len(group_rows) > 1:
-                # {'rb_title': 'Аквилон Парк', 'rooms_count_title': '1'}
-                agg_row_data = {value: group_name[key] for (key, value) in enumerate(group_rows)}
-                group_name = tuple(group_name)
-            else:
-                # {'rooms_count_title': '1'}
-                agg_row_data = {group_rows[0]: group_name}
-
-            cur_group = cur_grouped.get_group(group_name)
-            agg_row_data = self.set_common_attrs(agg_row_data, cur_group, self.df_empty_row)
-            output_data.append(agg_row_data)
-
-        for group_name in only_prev_group_names:
-            if len(group_rows) > 1:
-                # {'rb_title': 'Аквилон Парк', 'rooms_count_title': '1'}
-                agg_row_data = {value: group_name[key] for (key, value) in enumerate(group_rows)}
-                group_name = tuple(group_name)
-            else:
-                # {'rooms_count_title': '1'}
-                agg_row_data = {group_rows[0]: group_name}
-
-            prev_group = prev_grouped.get_group(group_name)
-            agg_row_data = self.set_common_attrs(agg_row_data, self.df_empty_row, prev_group)
-            output_data.append(agg_row_data)
+    def generate_stat_cube(self, cur_data: DataFrame, prev_data: DataFrame,
+                           group_rows: Optional[List[str]] = None) -> Dict:
+        """Генерация куба стат. данных: аддитивные агрегаты двух наборов данных
+        в ячейках самой детальной группировки, из которых через rollup_stat_cube()
+        получаются стат. данные по ней и по любой более общей группировке
+        без повторного прохода по строкам наборов
+
+        Args:
+            cur_data (DataFrame): Данные, относительно которых
+            считать изменения
+            prev_data (DataFrame): Данные по которым считаются изменения
+            group_rows (Optional[List[str]]): Список из строк самой детальной группировки,
+            по умолчанию STAT_CUBE_GROUP_ROWS
+
+        Returns:
+            Dict: Куб стат. данных:
+            'keys' - значения группировки каждой ячейки по колонкам группировки,
+            'cells' - количество записей, суммы и количество значений колонок STAT_CUBE_COLUMNS
+            по ячейкам с префиксами cur_ и prev_,
+            'ids_pairs' - уникальные пары (ячейка, id_custome) каждого набора
+            в виде номер ячейки * 'ids_count' + номер id_custome
+        """
+        if group_rows is None:
+            group_rows = STAT_CUBE_GROUP_ROWS
+        # Общие номера ячеек строк обоих наборов
+        row_cell_codes, cells_keys = self.get_group_codes(
+            [np.concatenate([cur_data[group_row].to_numpy(), prev_data[group_row].to_numpy()])
+             for group_row in group_rows])
+        cells_count = len(cells_keys[0]) if group_rows else int(len(row_cell_codes) > 0)
+
+        # Общие номера id_custome обоих наборов
+        id_codes, ids_uniques = pd.factorize(
+            np.concatenate([cur_data['id_custome'].to_numpy(), prev_data['id_custome'].to_numpy()]))
+        ids_count = max(len(ids_uniques), 1)
+
+        cells: Dict = {}
+        ids_pairs = {}
+        for prefix, data, rows in [('cur_', cur_data, slice(0, len(cur_data))),
+                                   ('prev_', prev_data, slice(len(cur_data), None))]:
+            cell_codes = row_cell_codes[rows]
+            is_counted = (cell_codes >= 0) & (id_codes[rows] >= 0)
+            cells[f'{prefix}count'] = np.bincount(cell_codes[is_counted], minlength=cells_count)
+            for column in STAT_CUBE_COLUMNS:
+                cells[f'{prefix}sum_{column}'], cells[f'{prefix}values_{column}'] = self.__sum_by_groups(
+                    data[column].to_numpy(), cell_codes, cells_count)
+            ids_pairs[prefix] = np.unique(self.encode_int64_keys(
+                [cell_codes[is_counted], id_codes[rows][is_counted]], [cells_count, ids_count]))
+
+        return {
+            'keys': dict(zip(group_rows, cells_keys)),
+            'cells': cells,
+            'ids_pairs': ids_pairs,
+            'ids_count': ids_count,
+        }
+
+    def rollup_stat_cube(self, stat_cube: Dict, group_rows: List[str]) -> List[Dict]:
+        """Получение стат. данных по группировке из куба стат. данных
+        сложением ячеек куба, см. generate_stat_cube()
+
+        Args:
+            stat_cube (Dict): Куб стат. данных
+            group_rows (List[str]): Список из строк группировки данных, подмножество
+            колонок группировки куба. Пустой список - итог по всем ячейкам
 
+        Returns:
+            List[Dict]: Рассчитанные стат. данные
+        """
+        cells_count = len(stat_cube['cells']['cur_count'])
+        if group_rows:
+            # Номер группы каждой ячейки куба
+            cell_group_codes, groups_keys = self.get_group_codes(
+                [stat_cube['keys'][group_row] for group_row in group_rows])
+            groups_count = len(groups_keys[0])
+        else:
+            cell_group_codes, groups_keys = np.zeros(cells_count, dtype='int64'), []
+            groups_count = int(cells_count > 0)
+
+        agg_rows: Dict = dict(zip(group_rows, groups_keys))
+        cells = stat_cube['cells']
+        for prefix in ['cur_', 'prev_']:
+            agg_rows[f'{prefix}count'] = np.bincount(
+                cell_group_codes, weights=cells[f'{prefix}count'], minlength=groups_count).astype('int64')
+            for column in STAT_CUBE_COLUMNS:
+                sums = np.bincount(cell_group_codes, weights=cells[f'{prefix}sum_{column}'], minlength=groups_count)
+                values_count = np.bincount(
+                    cell_group_codes, weights=cells[f'{prefix}values_{column}'], minlength=groups_count)
+                agg_rows[f'{prefix}sum_{column}'] = sums
+                agg_rows[f'{prefix}avg_{column}'] = sums / np.maximum(values_count, 1)
+
+        # Пары (группа, id_custome) из пар (ячейка, id_custome) каждого набора
+        ids_count = stat_cube['ids_count']
+        ids_pairs = {}
+        for prefix, pairs in stat_cube['ids_pairs'].items():
+            pairs_cell_codes, pairs_id_codes = self.decode_int64_keys(pairs, [cells_count, ids_count])
+            ids_pairs[prefix] = np.unique(self.encode_int64_keys(
+                [cell_group_codes[pairs_cell_codes], pairs_id_codes], [groups_count, ids_count]))
+        agg_rows['count_show'], agg_rows['count_hide'] = self.get_ids_changes_counts(
+            ids_pairs['cur_'], ids_pairs['prev_'], ids_count, groups_count)
+
+        return self.generate_agg_stat_data(pd.DataFrame(agg_rows), group_rows)
+
+    def get_ids_changes_counts(self, cur_ids_pairs: np.ndarray, prev_ids_pairs: np.ndarray,
+                               ids_count: int, groups_count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Подсчет появившихся и пропавших id_custome сразу по всем группам
+        одним пересечением отсортированных пар (группа, id_custome)
+
+        Args:
+            cur_ids_pairs (np.ndarray): Уникальные пары текущего набора, ключи
+            encode_int64_keys() по номеру группы и номеру id_custome, без -1
+            prev_ids_pairs (np.ndarray): Уникальные пары предыдущего набора
+            ids_count (int): Количество номеров id_custome
+            groups_count (int): Количество групп
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Количество id_custome только текущего набора
+            (count_show) и только предыдущего набора (count_hide) по группам
+        """
+        common_ids_pairs = np.intersect1d(cur_ids_pairs, prev_ids_pairs, assume_unique=True)
+        # Количество пар каждой группы по номеру группы из ключа пары
+        common_ids_count, cur_ids_count, prev_ids_count = [
+            np.bincount(self.decode_int64_keys(ids_pairs, [groups_count, ids_count])[0], minlength=groups_count)
+            for ids_pairs in [common_ids_pairs, cur_ids_pairs, prev_ids_pairs]]
+        return cur_ids_count - common_ids_count, prev_ids_count - common_ids_count
+
+    def get_group_codes(self, columns: List[np.ndarray]) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Получение номеров групп строк по значениям колонок группировки.
+        Коды значений колонок кодируются одним ключом int64 на строку,
+        группы находятся одним np.unique по ключам
+
+        Args:
+            columns (List[np.ndarray]): Значения колонок группировки
+
+        Returns:
+            Tuple[np.ndarray, List[np.ndarray]]: Номер группы каждой строки,
+            -1 - строка с пустым значением группировки, и значения колонок
+            группировки каждой группы
+        """
+        is_grouped = np.ones(len(columns[0]) if columns else 0, dtype=bool)
+        columns_codes = []
+        columns_uniques = []
+        for column in columns:
+            column_codes, column_uniques = pd.factorize(column)
+            is_grouped &= column_codes >= 0
+            columns_codes.append(column_codes)
+            columns_uniques.append(column_uniques)
+        sizes = [len(column_uniques) for column_uniques in columns_uniques]
+        group_keys, grouped_codes = np.unique(
+            self.encode_int64_keys([column_codes[is_grouped] for column_codes in columns_codes], sizes),
+            return_inverse=True)
+        row_group_codes = np.full(len(is_grouped), -1, dtype='int64')
+        row_group_codes[is_grouped] = grouped_codes
+
+        groups_keys = [column_uniques[column_codes] for column_uniques, column_codes
+                       in zip(columns_uniques, self.decode_int64_keys(group_keys, sizes))]
+        return row_group_codes, groups_keys
+
+    def encode_int64_keys(self, columns_codes: List[np.ndarray], sizes: List[int]) -> np.ndarray:
+        """Кодирование строк из кодов нескольких колонок одним числом int64:
+        код колонки умножается на произведение количеств кодов следующих колонок.
+        Операции над множествами строк (np.unique, np.intersect1d) выполняются
+        по одномерному массиву ключей без кортежей
+
+        Args:
+            columns_codes (List[np.ndarray]): Коды колонок, от 0 до количества кодов колонки - 1
+            sizes (List[int]): Количество кодов каждой колонки
+
+        Returns:
+            np.ndarray: Ключи строк, порядок ключей совпадает с порядком строк по колонкам
+        """
+        if np.prod([max(size, 1) for size in sizes], dtype='float64') >= 2 ** 63:
+            raise Exception(f'The keys of columns with {sizes} codes do not fit into int64')
+        keys = np.zeros(len(columns_codes[0]) if columns_codes else 0, dtype='int64')
+        for column_codes, size in zip(columns_codes, sizes):
+            keys = keys * max(size, 1) + column_codes
+        return keys
+
+    def decode_int64_keys(self, keys: np.ndarray, sizes: List[int]) -> List[np.ndarray]:
+        """Получение кодов колонок из ключей строк, см. encode_int64_keys()
+
+        Args:
+            keys (np.ndarray): Ключи строк
+            sizes (List[int]): Количество кодов каждой колонки
+
+        Returns:
+            List[np.ndarray]: Коды колонок
+        """
+        columns_codes = []
+        for size in reversed(sizes):
+            columns_codes.append(keys % max(size, 1))
+            keys = keys // max(size, 1)
+        return columns_codes[::-1]
+
+    def __sum_by_groups(self, values: np.ndarray, group_codes: np.ndarray,
+                        groups_count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Суммы и количество значений без NaN по группам одним проходом np.bincount.
+        Значения каждой группы складываются последовательно в порядке строк,
+        поэтому сумма группы может отличаться от попарной суммы Series.sum()
+        в последних битах, как и суммы в rollup_stat_cube()
+
+        Args:
+            values (np.ndarray): Значения колонки
+            group_codes (np.ndarray): Номер группы каждой строки, -1 - строка вне групп
+            groups_count (int): Количество групп
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Суммы и количество значений по группам
+        """
+        values = values.astype('float64')
+        is_counted = (group_codes >= 0) & ~np.isnan(values)
+        sums = np.bincount(group_codes[is_counted], weights=values[is_counted], minlength=groups_count)
+        counts = np.bincount(group_codes[is_counted], minlength=groups_count)
+        return sums, counts
+
+    def generate_agg_stat_data(self, agg_rows: DataFrame, group_rows: List[str]) -> List[Dict]:
+        """Генерация стат. данных по уже посчитанным агрегатам групп
+
+        Args:
+            agg_rows (DataFrame): Колонки группировки, количество записей cur_count
+            и prev_count, агрегаты STAT_AGGS с префиксами cur_ и prev_,
+            количество появившихся и пропавших id_custome count_show и count_hide
+            group_rows (List[str]): Список из строк группировки данных
+
+        Returns:
+            List[Dict]: Рассчитанные стат. данные
+        """
+        output_data = []
+        for row in agg_rows.to_dict('records'):
+            # Средние и суммы приводятся к numpy типам, как при расчете по DataFrame,
+            # иначе round() на границе округления (56.55) дает другой результат
+            agg_row_data = self.set_common_agg_attrs(
+                {group_row: row[group_row] for group_row in group_rows},
+                {'count': row['cur_count'], **{key: np.float64(row[f'cur_{key}']) for key in STAT_AGGS}},
+                {'count': row['prev_count'], **{key: np.float64(row[f'prev_{key}']) for key in STAT_AGGS}},
+                row['count_show'],
+                row['count_hide'])
+            if agg_row_data:
+                output_data.append(agg_row_data)
+
+        if not group_rows:
+            return output_data
         return sup_f.sorted_data(output_data)
 
+    def generate_pushdown_stat_data(self, stat_data: DataFrame, group_rows: List[str]) -> List[Dict]:
+        """Генерация стат. данных по агрегатам, посчитанным в БД
+        по GROUPING SETS (см. STAT_PUSHDOWN_GROUPINGS)
+
+        Args:
+            stat_data (DataFrame): Агрегаты текущей и предыдущей даты по всем группировкам
+            group_rows (List[str]): Список из строк группировки данных
+
+        Returns:
+            List[Dict]: Рассчитанные стат. данные
+        """
+        agg_rows = stat_data[stat_data['grouping_id'] == STAT_PUSHDOWN_GROUPINGS[tuple(group_rows)]].copy()
+        # id_custome только текущей даты и только предыдущей даты
+        # через количество уникальных id_custome обеих дат
+        agg_rows['count_show'] = agg_rows['all_ids_count'] - agg_rows['prev_ids_count']
+        agg_rows['count_hide'] = agg_rows['all_ids_count'] - agg_rows['cur_ids_count']
+        return self.generate_agg_stat_data(agg_rows, group_rows)
+
+    def set_data_days_offsets(self) -> None:
+        """Сортировка основного набора данных по дате и расчет границ
+        строк каждого дня для получения срезов по дням без фильтрации.
+        Дата price_actual_date приводится к дню datetime64[D] один раз здесь,
+        дальше срезы получаются поиском по массиву дней без сравнения колонки с датой.
+        Исходный порядок строк сохраняется в data_source_rows
+        """
+        self.data_source_rows = np.argsort(self.data['price_actual_date'].to_numpy(), kind='mergesort')
+        self.data = self.data.take(self.data_source_rows).reset_index(drop=True)
+        days = self.data['price_actual_date'].values.astype('datetime64[D]')
+        self.data_days, starts = np.unique(days, return_index=True)
+        self.data_days_offsets = np.append(starts, len(days))
+
+    def set_data_presence(self) -> None:
+        """Построение матрицы присутствия записей по дням: строка матрицы - id_custome,
+        колонка - день из data_days, значение - есть ли записи id_custome за день,
+        по байту на ячейку. Количество записей id_custome нужно только скользящему окну
+        в get_window_presence(), оно считается по data_id_codes.
+        По ней старые, новые и проданные записи получаются векторными операциями
+        над колонками матрицы без повторных проходов по данным.
+        Вызывается после set_data_days_offsets()
+        """
+        self.data_ids, self.data_id_codes = np.unique(self.data['id_custome'].to_numpy(), return_inverse=True)
+        # Номер дня из data_days для каждой строки отсортированного по дате набора данных
+        day_codes = np.repeat(np.arange(len(self.data_days)), np.diff(self.data_days_offsets))
+        self.data_presence = np.zeros((len(self.data_ids), len(self.data_days)), dtype=bool)
+        self.data_presence[self.data_id_codes, day_codes] = True
+        # Ненулевые элементы матрицы идут по id_custome, внутри по дню
+        self.data_presence_ids, presence_day_codes = np.nonzero(self.data_presence)
+        self.data_presence_days = self.data_days.astype('int64')[presence_day_codes]
+        # Пустое скользящее окно
+        self.data_window_presence = np.zeros(len(self.data_ids), dtype=np.int32)
+        self.data_window_indexes = (0, 0)
+
+    def get_day_presence(self, day: date) -> np.ndarray:
+        """Получение присутствия каждого id_custome из data_ids за день
+
+        Args:
+            day (date): День
+
+        Returns:
+            np.ndarray: Маска id_custome, у которых есть записи за день
+        """
+        day_index = np.searchsorted(self.data_days, np.datetime64(day, 'D'))
+        if day_index == len(self.data_days) or self.data_days[day_index] != np.datetime64(day, 'D'):
+            return np.zeros(len(self.data_ids), dtype=bool)
+        return self.data_presence[:, day_index]
+
+    def get_days_data(self, from_date: date, to_date: date) -> DataFrame:
+        """Получение среза основного набора данных за промежуток
+        с from_date по to_date без копирования данных
+
+        Args:
+            from_date (date): Начало промежутка
+            to_date (date): Конец промежутка
+
+        Returns:
+            DataFrame: Срез данных за промежуток
+        """
+        start, stop = self.get_days_bounds(from_date, to_date)
+        return self.data.iloc[start:stop]
+
+    def get_days_bounds(self, from_date: date, to_date: date) -> Tuple[int, int]:
+        """Получение границ строк основного набора данных за промежуток
+        с from_date по to_date
+
+        Args:
+            from_date (date): Начало промежутка
+            to_date (date): Конец промежутка
+
+        Returns:
+            Tuple[int, int]: Номер первой строки и номер строки после промежутка
+        """
+        from_day_index, to_day_index = self.get_days_indexes(from_date, to_date)
+        if from_day_index >= to_day_index:
+            return 0, 0
+        return self.data_days_offsets[from_day_index], self.data_days_offsets[to_day_index]
+
+    def get_days_indexes(self, from_date: date, to_date: date) -> Tuple[int, int]:
+        """Получение номеров первого дня промежутка с from_date по to_date
+        и дня после промежутка в массиве дней data_days
+
+        Args:
+            from_date (date): Начало промежутка
+            to_date (date): Конец промежутка
+
+        Returns:
+            Tuple[int, int]: Номер первого дня и номер дня после промежутка
+        """
+        return (int(np.searchsorted(self.data_days, np.datetime64(from_date, 'D'), side='left')),
+                int(np.searchsorted(self.data_days, np.datetime64(to_date, 'D'), side='right')))
+
+    def get_days_data_by_ids(self, from_date: date, to_date: date, ids_mask: np.ndarray,
+                             is_unique: bool = True) -> DataFrame:
+        """Получение записей основного набора данных за промежуток
+        с from_date по to_date для id_custome из маски по data_ids
+
+        Args:
+            from_date (date): Начало промежутка
+            to_date (date): Конец промежутка
+            ids_mask (np.ndarray): Маска id_custome по data_ids
+            is_unique (bool): Оставить только первую запись каждого id_custome
+            в исходном порядке основного набора данных
+
+        Returns:
+            DataFrame: Записи за промежуток, уникальные записи - в исходном порядке
+        """
+        start, stop = self.get_days_bounds(from_date, to_date)
+        rows = start + np.flatnonzero(ids_mask[self.data_id_codes[start:stop]])
+        if is_unique:
+            # Возвращаем строки в исходный порядок, как до сортировки по дате,
+            # и берем первую строку каждого id_custome
+            rows = rows[np.argsort(self.data_source_rows[rows], kind='mergesort')]
+            _, first_indexes = np.unique(self.data_id_codes[rows], return_index=True)
+            rows = rows[np.sort(first_indexes)]
+        return self.data.iloc[rows]
+
     def get_old_data(self, from_date: date, to_date: date) -> DataFrame:
         """Получение повторяющихся ежедневно записей
         за промежуток от from_date до to_date
@@ -199,21 +571,88 @@ class DataParserRoot():
         """
         # Получем общее количество дней в диапазоне
         len_days = (to_date - from_date).days + 1
-        # Берем срез по диапазону из основного набора данных
-        data_slice = self.data[(self.data.price_actual_date >= str(from_date)) &
-                               (self.data.price_actual_date <= str(to_date))].copy()
-        # Из среза берем только значения id_custome
-        data_slice_min = data_slice[['id_custome']]
-        # Группируем по id_custome и расчитываем количество каждого id_custome
-        data_slice_min_grouped = data_slice_min.groupby('id_custome').agg(
-            counted=pd.NamedAgg(column='id_custome', aggfunc='count'))
-        # Получем срез где id_custome встречаются каждый день в диапазоне
-        old_rows_ids = data_slice_min_grouped[data_slice_min_grouped.counted == len_days]
-        # Переводим в список из уникальных значений id_custome
-        old_ids_list = list(set(old_rows_ids.index.values))
+        # Номера дней диапазона в массиве дней
+        from_day_index, to_day_index = self.get_days_indexes(from_date, to_date)
+        # id_custome, записи которых встречаются в диапазоне столько раз, сколько в нем дней
+        old_ids_mask = self.get_window_presence(from_day_index, to_day_index) == len_days
         # Получем записи которые встречаются каждый день в диапазоне и
         # возвращаем их
-        return data_slice[data_slice['id_custome'].isin(old_ids_list)].drop_duplicates(subset=['id_custome'])
+        return self.get_days_data_by_ids(from_date, to_date, old_ids_mask)
+
+    def get_window_presence(self, from_day_index: int, to_day_index: int) -> np.ndarray:
+        """Получение количества записей каждого id_custome из data_ids
+        за дни data_days с from_day_index по to_day_index - 1.
+        Скользящее окно сдвигается: добавляются записи дней, вошедших в окно,
+        и вычитаются записи дней, вышедших из него, поэтому окно соседнего дня
+        стоит O(записей одного дня). Непересекающееся окно считается заново
+
+        Args:
+            from_day_index (int): Номер первого дня окна
+            to_day_index (int): Номер дня после окна
+
+        Returns:
+            np.ndarray: Количество записей по data_ids, массив окна,
+            меняется при следующем сдвиге
+        """
+        to_day_index = max(from_day_index, to_day_index)
+        window_from_index, window_to_index = self.data_window_indexes
+        if max(from_day_index, window_from_index) >= min(to_day_index, window_to_index):
+            self.data_window_presence = np.zeros(len(self.data_ids), dtype=np.int32)
+            window_from_index = window_to_index = from_day_index
+
+        for start, stop, sign in [(window_to_index, to_day_index, 1), (to_day_index, window_to_index, -1),
+                                  (from_day_index, window_from_index, 1), (window_from_index, from_day_index, -1)]:
+            if start < stop:
+                np.add.at(self.data_window_presence,
+                          self.data_id_codes[self.data_days_offsets[start]:self.data_days_offsets[stop]], sign)
+        self.data_window_indexes = (from_day_index, to_day_index)
+        return self.data_window_presence
+
+    def get_show_data(self, day: date) -> DataFrame:
+        """Получение записей за день, id_custome которых отсутствуют
+        в предыдущем дне
+
+        Args:
+            day (date): День
+
+        Returns:
+            DataFrame: Все записи дня с появившимися id_custome
+        """
+        show_ids_mask = self.get_day_presence(day) & ~self.get_day_presence(day + timedelta(days=-1))
+        return self.get_days_data_by_ids(day, day, show_ids_mask, is_unique=False)
+
+    def get_window_events(self, from_date: date, to_date: date) -> Tuple[np.ndarray, np.ndarray]:
+        """Получение id_custome, записи которых появлялись и пропадали
+        в какой-либо день промежутка с from_date по to_date относительно предыдущего дня.
+        События находятся одним сдвигом по отсортированным парам (id_custome, день),
+        предыдущий день для первого дня промежутка считается пустым
+
+        Args:
+            from_date (date): Начало промежутка
+            to_date (date): Конец промежутка
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Маски по data_ids появлявшихся
+            и пропадавших id_custome
+        """
+        from_day = np.datetime64(from_date, 'D').astype('int64')
+        to_day = np.datetime64(to_date, 'D').astype('int64')
+        in_window = (self.data_presence_days >= from_day) & (self.data_presence_days <= to_day)
+        ids = self.data_presence_ids[in_window]
+        days = self.data_presence_days[in_window]
+
+        # Есть ли у id_custome запись в предыдущий и в следующий день
+        is_prev_day = np.zeros(len(ids), dtype=bool)
+        is_prev_day[1:] = (ids[1:] == ids[:-1]) & (days[1:] == days[:-1] + 1)
+        is_next_day = np.zeros(len(ids), dtype=bool)
+        is_next_day[:-1] = is_prev_day[1:]
+
+        show_ids_mask = np.zeros(len(self.data_ids), dtype=bool)
+        show_ids_mask[ids[~is_prev_day]] = True
+        # Пропажа после последнего дня промежутка в него не входит
+        hide_ids_mask = np.zeros(len(self.data_ids), dtype=bool)
+        hide_ids_mask[ids[~is_next_day & (days < to_day)]] = True
+        return show_ids_mask, hide_ids_mask
 
     def get_new_data(self, from_date: date, to_date: date) -> DataFrame:
         """Получение уникальных записей новых квартир за промежуток
@@ -227,28 +666,9 @@ class DataParserRoot():
         Returns:
             Series: Данные с новыми записями каждый день
         """
-        # Берем срез по диапазону из основного набора данных
-        data_slice = self.data[(self.data.price_actual_date >= str(from_date)) &
-                               (self.data.price_actual_date <= str(to_date))].copy()
-        check_date = from_date
-        diffed_ids = []
-        while check_date <= to_date:
-            # Расчитываем предыдущую дату от текущей
-            prev_check_date = check_date + timedelta(days=-1)
-            # Берем диапазон по предыдущей дате
-            prev_day_slice = data_slice[data_slice.price_actual_date == str(prev_check_date)]
-            # Берем диапазон по текущей дате
-            cur_day_slice = data_slice[data_slice.price_actual_date == str(check_date)]
-            # Получаем id_custome которые есть в наборе текущей даты но
-            # отсутствуеют в наборе по предыдущей даты
-            diffed_ids += list(np.setdiff1d(cur_day_slice['id_custome'], prev_day_slice['id_custome']))
-            # Переходим к следующим текущей и предыдущей датам
-            check_date += timedelta(days=1)
-        # Получаем набор уникальных значений id_custome за диапазон
-        # которые появлялись каждый день относительно предыдущего
-        unique_ids_list = list(set(diffed_ids))
+        new_ids_mask, _ = self.get_window_events(from_date, to_date)
         # Получаем срез по таким id_custome и возвращаем его
-        return data_slice[data_slice['id_custome'].isin(unique_ids_list)].drop_duplicates(subset=['id_custome'])
+        return self.get_days_data_by_ids(from_date, to_date, new_ids_mask)
 
     def get_sell_data(self, from_date: date, to_date: date) -> DataFrame:
         """Получение уникальных записей проданных квартир за промежуток
@@ -262,25 +682,123 @@ class DataParserRoot():
         Returns:
             Series: Данные с пропадающими записями каждый день
         """
-        # Берем срез по диапазону из основного набора данных
-        data_slice = self.data[(self.data.price_actual_date >= str(from_date)) &
-                               (self.data.price_actual_date <= str(to_date))].copy()
-        check_date = from_date
-        diffed_ids = []
-        while check_date <= to_date:
-            # Расчитываем предыдущую дату от текущей
-            prev_check_date = check_date + timedelta(days=-1)
-            # Берем диапазон по предыдущей дате
-            prev_day_slice = data_slice[data_slice.price_actual_date == str(prev_check_date)]
-            # Берем диапазон по текущей дате
-            cur_day_slice = data_slice[data_slice.price_actual_date == str(check_date)]
-            # Получаем id_custome которые есть в наборе предыдущей даты но
-            # отсутствуеют в наборе по текущей даты
-            diffed_ids += list(np.setdiff1d(prev_day_slice['id_custome'], cur_day_slice['id_custome']))
-            # Переходим к следующим текущей и предыдущей датам
-            check_date += timedelta(days=1)
-        # Получаем набор уникальных значений id_custome за диапазон
-        # которые пропадали каждый день относительно предыдущего
-        unique_ids_list = list(set(diffed_ids))
+        _, sell_ids_mask = self.get_window_events(from_date, to_date)
         # Получаем срез по таким id_custome и возвращаем его
-        return data_slice[data_slice['id_custome'].isin(unique_ids_list)].drop_duplicates(subset=['id_custome'])
+        return self.get_days_data_by_ids(from_date, to_date, sell_ids_mask)
+
+    def generate_daily_stat_cube(self, group_rows: Optional[List[str]] = None) -> Dict:
+        """Генерация куба дневных стат. данных основного набора данных:
+        аддитивные агрегаты ячеек самой детальной группировки по каждому дню
+        из data_days, накопленные по дням. По нему через get_period_stat_cube()
+        куб стат. данных любой пары промежутков получается разностью
+        накопленных значений без прохода по строкам набора.
+        Вызывается после set_data_presence()
+
+        Args:
+            group_rows (Optional[List[str]]): Список из строк самой детальной группировки,
+            по умолчанию STAT_CUBE_GROUP_ROWS
+
+        Returns:
+            Dict: Куб дневных стат. данных:
+            'keys' - значения группировки каждой ячейки по колонкам группировки,
+            'cells' - накопленные по дням количество записей, суммы и количество значений
+            колонок STAT_CUBE_COLUMNS, массивы ячейка x (количество дней + 1),
+            'ids_pairs' - уникальные пары (ячейка, id_custome) в виде
+            номер ячейки * 'ids_count' + номер id_custome из data_ids,
+            'ids_presence' - матрица присутствия пар по дням, пара x день, по байту на ячейку,
+            'ids_count'
+        """
+        if group_rows is None:
+            group_rows = STAT_CUBE_GROUP_ROWS
+        row_cell_codes, cells_keys = self.get_group_codes(
+            [self.data[group_row].to_numpy() for group_row in group_rows])
+        cells_count = len(cells_keys[0]) if group_rows else int(len(row_cell_codes) > 0)
+        days_count = len(self.data_days)
+        ids_count = max(len(self.data_ids), 1)
+
+        # Номер дня из data_days для каждой строки отсортированного по дате набора данных
+        day_codes = np.repeat(np.arange(days_count), np.diff(self.data_days_offsets))
+        is_counted = row_cell_codes >= 0
+        # Номер пары (ячейка, день) каждой строки, -1 для строк без ячейки
+        cell_day_codes = np.where(is_counted, row_cell_codes * days_count + day_codes, -1)
+
+        cells: Dict = {
+            'count': np.bincount(cell_day_codes[is_counted], minlength=cells_count * days_count)
+        }
+        # Разности накопленных сумм не совпадают с прямыми суммами до последнего бита,
+        # поэтому здесь достаточно сумм bincount
+        for column in STAT_CUBE_COLUMNS:
+            values = self.data[column].to_numpy().astype('float64')
+            is_value = is_counted & ~np.isnan(values)
+            cells[f'sum_{column}'] = np.bincount(
+                cell_day_codes[is_value], weights=values[is_value], minlength=cells_count * days_count)
+            cells[f'values_{column}'] = np.bincount(
+                cell_day_codes[is_value], minlength=cells_count * days_count)
+        cells = {key: self.__get_days_cumsum(values.reshape(cells_count, days_count))
+                 for key, values in cells.items()}
+
+        ids_pairs, ids_pairs_codes = np.unique(
+            self.encode_int64_keys([row_cell_codes[is_counted], self.data_id_codes[is_counted]],
+                                   [cells_count, ids_count]),
+            return_inverse=True)
+        ids_presence = np.zeros((len(ids_pairs), days_count), dtype=bool)
+        ids_presence[ids_pairs_codes, day_codes[is_counted]] = True
+
+        return {
+            'keys': dict(zip(group_rows, cells_keys)),
+            'cells': cells,
+            'ids_pairs': ids_pairs,
+            'ids_presence': ids_presence,
+            'ids_count': ids_count,
+        }
+
+    def get_period_stat_cube(self, daily_stat_cube: Dict, cur_from_date: date, cur_to_date: date,
+                             prev_from_date: date, prev_to_date: date) -> Dict:
+        """Получение куба стат. данных для сравнения промежутка с cur_from_date
+        по cur_to_date с промежутком с prev_from_date по prev_to_date
+        из куба дневных стат. данных, см. generate_daily_stat_cube().
+        Результат в формате generate_stat_cube() для rollup_stat_cube()
+
+        Args:
+            daily_stat_cube (Dict): Куб дневных стат. данных
+            cur_from_date (date): Начало текущего промежутка
+            cur_to_date (date): Конец текущего промежутка
+            prev_from_date (date): Начало предыдущего промежутка
+            prev_to_date (date): Конец предыдущего промежутка
+
+        Returns:
+            Dict: Куб стат. данных по двум промежуткам
+        """
+        cells: Dict = {}
+        ids_pairs = {}
+        for prefix, from_date, to_date in [('cur_', cur_from_date, cur_to_date),
+                                           ('prev_', prev_from_date, prev_to_date)]:
+            from_day_index, to_day_index = self.get_days_indexes(from_date, to_date)
+            # Пустой промежуток дает нулевые разности
+            to_day_index = max(from_day_index, to_day_index)
+            for key, values in daily_stat_cube['cells'].items():
+                cells[f'{prefix}{key}'] = values[:, to_day_index] - values[:, from_day_index]
+            # Пары, присутствовавшие хотя бы в один день промежутка
+            ids_pairs[prefix] = daily_stat_cube['ids_pairs'][
+                daily_stat_cube['ids_presence'][:, from_day_index:to_day_index].any(axis=1)]
+
+        return {
+            'keys': daily_stat_cube['keys'],
+            'cells': cells,
+            'ids_pairs': ids_pairs,
+            'ids_count': daily_stat_cube['ids_count'],
+        }
+
+    def __get_days_cumsum(self, values: np.ndarray) -> np.ndarray:
+        """Накопление значений по дням с нулевым днем в начале,
+        сумма за дни с i по j - 1 равна values[:, j] - values[:, i]
+
+        Args:
+            values (np.ndarray): Значения, строка - ячейка, колонка - день
+
+        Returns:
+            np.ndarray: Накопленные значения с колонкой на один день больше
+        """
+        output_values = np.zeros((values.shape[0], values.shape[1] + 1), dtype=values.dtype)
+        np.cumsum(values, axis=1, out=output_values[:, 1:])
+        return output_values
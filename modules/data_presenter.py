@@ -1,17 +1,22 @@
+from typing import Any
+
+import modules.support_functions as sup_f
 from modules.data_render import DataRender
 
 
 class DataPresenter():
     def __init__(self, chat_config, db_config):
-        # all aggregated data for displaying
-        self.__data = DataRender(
+        # renderer of data, sections of arounds are rendered on demand if is_lazy_render is enabled
+        self.__data_render = DataRender(
             chat_config=chat_config,
             db_config=db_config
-        ).get_rendered_data()
+        )
+        # all aggregated data for displaying,
+        # loaded from the rendered snapshot without parsing data if is_rendered_snapshot is enabled
+        self.__data = self.__data_render.get_rendered_data()
 
         # current around using for displaying its data
         self.__current_around = ''
-        self.__current_around_data = {}
 
         # current type of stat from main menu
         self.__main_stat_type = ''
@@ -28,89 +33,87 @@ class DataPresenter():
     def get_arounds_names(self) -> list:
         return [row['arround_title'] for row in self.__data['arround_list']]
 
+    # rendered with the around, it does not depend on the main stat type
+    def get_week_report(self) -> str:
+        return next(row['week_report_text'] for row in self.__data['arround_list']
+                    if row['arround_title'] == self.__current_around)
+
     def get_cut_cons_report(self) -> str:
-        return self.__current_around_data[self.__main_stat_type]['cons_report_text_cut']
+        return self.__get_section('cons_report_text_cut')
 
     def get_full_cons_report(self) -> str:
-        return self.__current_around_data[self.__main_stat_type]['cons_report_text_full']
+        return self.__get_section('cons_report_text_full')
 
     def get_count_flats_all_text(self) -> str:
-        return self.__current_around_data[self.__main_stat_type]['count_flats_all_text']
+        return self.__get_header('count_flats_all_text') + '\n' + \
+            sup_f.gen_all_types_text(self.__get_section('count_flats_all_list'))
 
     def get_each_rb_all_text(self) -> str:
-        return self.__current_around_data[self.__main_stat_type]['each_rb_all_text']
+        return self.__get_header('each_rb_all_text') + '\n' + \
+            sup_f.gen_all_types_text(self.__get_section('each_rb_all_list'))
 
     def get_flat_types(self) -> list:
-        return [row['type'] for row in self.__current_around_data[self.__main_stat_type]['count_flats_all_list']]
+        return [row['type'] for row in self.__get_section('count_flats_all_list')['all_types_list']]
 
     def get_rb_names(self) -> list:
-        return [row['type'] for row in self.__current_around_data[self.__main_stat_type]['each_rb_all_list']]
+        return [row['type'] for row in self.__get_section('each_rb_all_list')['all_types_list']]
 
     def get_all_using_flat_types(self) -> list:
-        all_types = []
-        for around in self.__data['arround_list']:
-            all_types += [row['type'] for row in around['new_stat']['count_flats_all_list']] + \
-                         [row['type'] for row in around['old_stat']['count_flats_all_list']] + \
-                         [row['type'] for row in around['sell_stat']['count_flats_all_list']]
-        return list(set(all_types))
+        return self.__get_all_using_types('count_flats_all_list')
 
     def get_all_using_rb_names(self) -> list:
-        all_types = []
-        for around in self.__data['arround_list']:
-            all_types += [row['type'] for row in around['new_stat']['each_rb_all_list']] + \
-                         [row['type'] for row in around['old_stat']['each_rb_all_list']] + \
-                         [row['type'] for row in around['sell_stat']['each_rb_all_list']]
-        return list(set(all_types))
+        return self.__get_all_using_types('each_rb_all_list')
 
     def get_selected_flat_type_data(self) -> str:
-        for row in self.__current_around_data[self.__main_stat_type]['count_flats_all_list']:
+        for row in self.__get_section('count_flats_all_list')['all_types_list']:
             if row['type'] == self.__flat_type:
-                return row['text']
+                return sup_f.gen_type_text(self.__get_header('count_flats_type_text'), row['head'], row['body'])
 
     def get_selected_rb_name_data(self) -> str:
-        for row in self.__current_around_data[self.__main_stat_type]['each_rb_all_list']:
+        for row in self.__get_section('each_rb_all_list')['all_types_list']:
             if row['type'] == self.__rb_name:
-                return row['text']
+                return sup_f.gen_type_text(self.__get_header('each_rb_type_text'), row['head'], row['body'])
 
     def get_rb_names_by_selected_flat_type(self):
-        for row in self.__current_around_data[self.__main_stat_type]['each_flats_rb_list']:
+        for row in self.__get_section('each_flats_rb_list'):
             if row['rooms_count_title'] == self.__flat_type:
                 return [sub_row['type'] for sub_row in row['all_types_list']]
 
     def get_flat_types_by_selected_rb_name(self):
-        for row in self.__current_around_data[self.__main_stat_type]['each_rb_flats_list']:
+        for row in self.__get_section('each_rb_flats_list'):
             if row['rb_title'] == self.__rb_name:
                 return [sub_row['type'] for sub_row in row['all_types_list']]
 
     def get_rb_data_by_flat_type(self, flat_type: str) -> str:
-        for row in self.__current_around_data[self.__main_stat_type]['each_flats_rb_list']:
+        for row in self.__get_section('each_flats_rb_list'):
             if row['rooms_count_title'] == self.__flat_type:
                 for sub_row in row['all_types_list']:
                     if sub_row['type'] == flat_type:
-                        return sub_row['text']
+                        return sup_f.gen_type_text(self.__get_header('each_flats_rb_type_text', flat_type),
+                                                   row['type_head'], sub_row['body'])
 
     def get_flat_type_data_by_rb_name(self, rb_name: str) -> str:
-        for row in self.__current_around_data[self.__main_stat_type]['each_rb_flats_list']:
+        for row in self.__get_section('each_rb_flats_list'):
             if row['rb_title'] == self.__rb_name:
                 for sub_row in row['all_types_list']:
                     if sub_row['type'] == rb_name:
-                        return sub_row['text']
+                        return sup_f.gen_type_text(self.__get_header('each_rb_flats_text', row['rb_title']),
+                                                   sub_row['head'], sub_row['body'])
 
     def get_each_rb_data_by_flat_type(self) -> str:
-        for row in self.__current_around_data[self.__main_stat_type]['each_flats_rb_list']:
+        for row in self.__get_section('each_flats_rb_list'):
             if row['rooms_count_title'] == self.__flat_type:
-                return row['all_types_text']
+                return self.__get_header('each_flats_rb_text', row['rooms_count_title']) + '\n' + \
+                    sup_f.gen_all_types_text(row)
 
     def get_each_flat_type_by_rb_name(self) -> str:
-        for row in self.__current_around_data[self.__main_stat_type]['each_rb_flats_list']:
+        for row in self.__get_section('each_rb_flats_list'):
             if row['rb_title'] == self.__rb_name:
-                return row['all_types_text']
+                return self.__get_header('each_rb_flats_text', row['rb_title']) + '\n' + \
+                    sup_f.gen_all_types_text(row)
 
     def set_current_around(self, arround_title: str) -> None:
         self.__current_around = arround_title
-        for row in self.__data['arround_list']:
-            if row['arround_title'] == arround_title:
-                self.__current_around_data = row
 
     def set_main_stat_type(self, main_menu_item: str) -> None:
         self.__main_stat_type = main_menu_item
@@ -120,3 +123,21 @@ class DataPresenter():
 
     def set_rb_name(self, rb_name) -> None:
         self.__rb_name = rb_name
+
+    def get_render_cache_stats(self) -> dict:
+        return self.__data_render.get_render_cache_stats()
+
+    def __get_section(self, section: str) -> Any:
+        return self.__data_render.get_rendered_section(self.__current_around, self.__main_stat_type, section)
+
+    # headers are not stored in rendered sections and are added when a message is sent
+    def __get_header(self, message: str, group_title: str = '') -> str:
+        return self.__data_render.get_message_header(self.__current_around, self.__main_stat_type,
+                                                     message, group_title)
+
+    # built from the types index of every around, sections are not rendered for it
+    def __get_all_using_types(self, section: str) -> list:
+        all_types = []
+        for row in self.__data['arround_list']:
+            all_types += row['using_types'][section]
+        return list(set(all_types))
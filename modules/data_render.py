@@ -1,32 +1,77 @@
 """Модуль рендеринга данных в текстовый вид для вывода в боте
 """
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, timedelta
-from typing import Dict, List
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
+from pandas import DataFrame
 from typing_extensions import Literal
 
 import modules.support_functions as sup_f
 
 from .constants import RenderConsts
-from .data_parser import DataParser
+from .data_parser import DAY_STORE_DIR_EXT, SNAPSHOT_FILE_EXT, DataParser, StatData
+from .day_store import DayStore
 from .db_wrapper import DBWrapper
 
+# Ключи типов статистики в отрендеренных данных окружения
+RENDER_STAT_TYPES = {
+    # Данные по общей статистике
+    'summary_stat': RenderConsts.TYPE_SUMMARY_STAT,
+    # Данные только по новым
+    'new_stat': RenderConsts.TYPE_NEW_STAT,
+    # Данные только по старым
+    'old_stat': RenderConsts.TYPE_OLD_STAT,
+    # Данные только по проданным
+    'sell_stat': RenderConsts.TYPE_SELL_STAT,
+}
+
+# Количество дней промежутков сравнения неделя к неделе
+WEEK_REPORT_DAYS = 7
+
+# Путь до снимка отрендеренных данных, загружаемого при запуске
+RENDERED_SNAPSHOT_FILE_PATH = '.\\data\\rendered_data.pickle'
+# Версия формата снимка, увеличивается при изменении структуры отрендеренных данных
+RENDERED_SNAPSHOT_VERSION = 3
+# Настройки чат-бота, которые не влияют на отрендеренные данные снимка
+RENDERED_SNAPSHOT_IGNORED_OPTIONS = ('token', 'is_rendered_snapshot', 'render_cache_size',
+                                     'is_parallel_render', 'render_workers')
+
 
 class DataRender():
     """Класс для перевода данных в текстовый вид для вывода в боте
     """
 
-    def __init__(self, chat_config, db_config):
+    def __init__(self, chat_config, db_config, is_render_on_init: bool = True):
+        """
+        Args:
+            chat_config: Настройки чат-бота
+            db_config: Настройки подключения к БД
+            is_render_on_init (bool): Рендерить данные всех окружений при инициализации,
+            выключается в процессах параллельного рендеринга, см. render_arround()
+        """
         logging.debug('Инициализация')
+        self.__db_config = db_config
 
         self.__chat_config = chat_config
 
-        # Инициализация обертки для работы с БД
-        self.__db_wrapper = DBWrapper(db_config)
-        # Инициализация парсера данных из БД
-        self.__data_parser = DataParser(db_config)
+        # Обертка для работы с БД и парсер данных из БД создаются при первом обращении,
+        # при загрузке из снимка отрендеренных данных они не нужны
+        self.__db_wrapper: Optional[DBWrapper] = None
+        self.__data_parser: Optional[DataParser] = None
+        # Стат. данные окружения для отложенного рендеринга разделов,
+        # без них разделы рендерятся по стат. данным парсера
+        self.__stat_data: Optional[StatData] = None
         # Cегодняшняя дата для шапки
         self.__current_date: date = date(1970, 1, 1)
         # Предыдущая дата для шапки
@@ -67,190 +112,157 @@ class DataRender():
             title=arround_titles[i]
         ) for i in range(0, len(arround_ids))]
 
-        self.__render_data(is_load_from_dump=bool(int(self.__chat_config['is_load_from_dump'])))
+        # Сохранять дампы данных в хранилища по дням вместо колоночных снимков
+        self.__is_dump_to_day_store = bool(int(self.__chat_config.get('is_dump_to_day_store', '0')))
+        # Получать из БД только дни новее последнего дня в хранилище по дням
+        self.__is_incremental_ingest = bool(int(self.__chat_config.get('is_incremental_ingest', '0')))
+        # Считать общую статистику агрегатами в БД и получать только строки агрегатов
+        self.__is_stat_pushdown = bool(int(self.__chat_config.get('is_stat_pushdown', '0')))
+        # Рендерить тексты окружений при первом запросе, а не при запуске
+        self.__is_lazy_render = bool(int(self.__chat_config.get('is_lazy_render', '0')))
+        # Рендерить окружения параллельно в пуле процессов
+        self.__is_parallel_render = bool(int(self.__chat_config.get('is_parallel_render', '0')))
+        # Количество процессов пула, 0 - по количеству ядер
+        self.__render_workers = int(self.__chat_config.get('render_workers', '0')) or os.cpu_count() or 1
+        # Загружать отрендеренные данные из снимка, если исходные данные и настройки не изменились
+        self.__is_rendered_snapshot = bool(int(self.__chat_config.get('is_rendered_snapshot', '0')))
+
+        # Функции рендеринга разделов каждого типа статистики окружения
+        self.__section_renders: Dict[str, Callable[[Dict, Any], Any]] = {
+            # Текст общая сводка в урезанный
+            'cons_report_text_cut': self.__get_cons_report_text_cut,
+            # Текст общая сводка в полный
+            'cons_report_text_full': self.__get_cons_report_text_full,
+            # Фрагменты по каждому типу квартир
+            'count_flats_all_list': self.__get_count_flats_all_types_list,
+            # Фрагменты по каждому ЖК
+            'each_rb_all_list': self.__get_each_rb_all_list,
+            # Фрагменты в разрезе ЖК по типу комнат
+            'each_rb_flats_list': self.__get_each_rb_flats_list,
+            # Фрагменты в разрезе типа комнат по ЖК
+            'each_flats_rb_list': self.__get_each_flats_rb_list,
+        }
+        # Функции заголовков сообщений, собираемых из фрагментов разделов при выводе
+        self.__message_headers: Dict[str, Callable[[Dict, Any, str], str]] = {
+            # Текст по всем типам квартир
+            'count_flats_all_text': self.__get_count_flats_all_header,
+            # Текст по одному типу квартир
+            'count_flats_type_text': self.__get_count_flats_type_header,
+            # Текст по всем ЖК
+            'each_rb_all_text': self.__get_each_rb_all_header,
+            # Текст по одному ЖК
+            'each_rb_type_text': self.__get_each_rb_type_header,
+            # Тексты по одному ЖК по типам квартир, group_title - описание ЖК
+            'each_rb_flats_text': self.__get_each_rb_flats_header,
+            # Текст по одному типу квартир всех ЖК, group_title - описание типа квартир
+            'each_flats_rb_text': self.__get_each_flats_rb_header,
+            # Текст по одному типу квартир одного ЖК, group_title - описание ЖК
+            'each_flats_rb_type_text': self.__get_each_flats_rb_type_header,
+        }
+        # Стат. данные окружений по наименованию для отложенного рендеринга
+        # устанавливаются в методе __render_data()
+        self.__arrounds_stat_data: Dict[str, Dict] = {}
+        # LRU-кеш отрендеренных разделов по (окружение, тип статистики, раздел)
+        self.__render_cache: OrderedDict = OrderedDict()
+        # Максимальное количество разделов в LRU-кеше
+        self.__render_cache_size = int(self.__chat_config.get('render_cache_size', '256'))
+        # Количество попаданий и промахов LRU-кеша
+        self.__render_cache_hits = 0
+        self.__render_cache_misses = 0
+
+        if is_render_on_init:
+            is_load_from_dump = bool(int(self.__chat_config['is_load_from_dump']))
+            snapshot_key = self.__get_rendered_snapshot_key(is_load_from_dump) if self.__is_rendered_snapshot else ''
+            if not snapshot_key or not self.__load_rendered_snapshot(snapshot_key):
+                self.__render_data(
+                    is_load_from_dump=is_load_from_dump,
+                    is_partition_in_memory=bool(int(self.__chat_config.get('is_partition_in_memory', '0'))))
+                if snapshot_key:
+                    self.__dump_rendered_snapshot(snapshot_key)
+                logging.debug(f'Статистика пула подключений к БД: {self.__get_db_wrapper().get_pool_stats()}')
 
         logging.info('Инициализация выполнена')
 
-    def __render_data(self, is_load_from_dump: bool = False) -> None:
+    def __render_data(self, is_load_from_dump: bool = False, is_partition_in_memory: bool = False) -> None:
         """Рендер словаря со текстовым предствалением данных для чат-бота
 
         Args:
             is_load_from_dump (bool): Загрузить данные из дамп файла
+            is_partition_in_memory (bool): Получить данные один раз по всем окружениям
+            и строить срез каждого окружения в памяти
         """
         arround_ids = ','.join([x['id'] for x in self.__arround_list])
+        # Агрегаты считаются в БД, поэтому при загрузке из дамп файла не используются
+        is_stat_pushdown = self.__is_stat_pushdown and not is_load_from_dump
 
-        dump_file_path = f'.\\data\\{arround_ids}.csv'
-        if is_load_from_dump:
-            self.__data_parser.init_data(file_path=dump_file_path)
+        # id ЖК каждого окружения
+        arround_rb_ids: Optional[Dict[str, List[int]]] = None
+        if is_partition_in_memory:
+            arround_rb_ids = self.__get_arround_rb_ids(arround_ids, is_load_from_dump)
+            is_partition_in_memory = arround_rb_ids is not None
+
+        if is_partition_in_memory or not is_stat_pushdown:
+            self.__init_parser_data(arround_ids, is_load_from_dump)
         else:
-            self.__data_parser.init_data(self.__get_data_select(arround_ids))
-            self.__data_parser.data.to_csv(dump_file_path, encoding='utf-8')
+            # Основной набор данных по всем окружениям не получается и не сохраняется,
+            # поэтому устаревший дамп удаляется, чтобы его не загрузить при is_load_from_dump
+            self.__remove_dumps(arround_ids)
+        if is_stat_pushdown:
+            # Для общей сводки по всем окружениям достаточно агрегатов
+            self.__get_data_parser().init_common_stat_data(self.__get_common_stat_select(arround_ids))
+
+        if is_partition_in_memory:
+            # Общий набор данных по всем окружениям, из которого строятся срезы окружений
+            all_arrounds_data = self.__get_data_parser().data
+            # В дампах, сохраненных до появления rb_id, срезы по id ЖК построить нельзя
+            if 'rb_id' not in all_arrounds_data or all_arrounds_data['rb_id'].isna().any():
+                logging.error(f'В данных окружений {arround_ids} нет rb_id, '
+                              'данные каждого окружения будут получены отдельно')
+                is_partition_in_memory = False
 
         self.__rendered_data['cons_report_text_cut'] = self.__get_cons_report_text_cut_all_arounds()
 
-        for arround in self.__arround_list:
-            logging.info(f"Рендеринг текстового вывода для окружения {arround['title']}")
-            arroud_data: Dict = {
-                # Наименование окружения
-                'arround_title': arround['title'],
-                # Данные по общей статистике
-                'summary_stat': {
-                    # Текст общая сводка в урезанный
-                    'cons_report_text_cut': '',
-                    # Текст общая сводка в полный
-                    'cons_report_text_full': '',
-                    # Текст по всем типам квартир
-                    'count_flats_all_text': '',
-                    # Список текстов по каждому типу квартир
-                    'count_flats_all_list': [],
-                    # Текст по каждому ЖК
-                    'each_rb_all_text': '',
-                    # Список текстов по каждому ЖК
-                    'each_rb_all_list': [],
-                    # Список в разрезе ЖК по типу комнат
-                    'each_rb_flats_list': [],
-                    # Список в разрезе типа комнат по ЖК
-                    'each_flats_rb_list': [],
-                },
-                # Данные только по новым
-                'new_stat': {
-                    # Текст общая сводка в урезанный
-                    'cons_report_text_cut': '',
-                    # Текст общая сводка в полный
-                    'cons_report_text_full': '',
-                    # Текст по всем типам квартир
-                    'count_flats_all_text': '',
-                    # Список текстов по каждому типу квартир
-                    'count_flats_all_list': [],
-                    # Текст по каждому ЖК
-                    'each_rb_all_text': '',
-                    # Список текстов по каждому ЖК
-                    'each_rb_all_list': [],
-                    # Список в разрезе ЖК по типу комнат
-                    'each_rb_flats_list': [],
-                    # Список в разрезе типа комнат по ЖК
-                    'each_flats_rb_list': [],
-                },
-                # Данные только по старым
-                'old_stat': {
-                    # Текст общая сводка в урезанный
-                    'cons_report_text_cut': '',
-                    # Текст общая сводка в полный
-                    'cons_report_text_full': '',
-                    # Текст по всем типам квартир
-                    'count_flats_all_text': '',
-                    # Список текстов по каждому типу квартир
-                    'count_flats_all_list': [],
-                    # Текст по каждому ЖК
-                    'each_rb_all_text': '',
-                    # Список текстов по каждому ЖК
-                    'each_rb_all_list': [],
-                    # Список в разрезе ЖК по типу комнат
-                    'each_rb_flats_list': [],
-                    # Список в разрезе типа комнат по ЖК
-                    'each_flats_rb_list': [],
-                },
-                # Данные только по проданным
-                'sell_stat': {
-                    # Текст общая сводка в урезанный
-                    'cons_report_text_cut': '',
-                    # Текст общая сводка в полный
-                    'cons_report_text_full': '',
-                    # Текст по всем типам квартир
-                    'count_flats_all_text': '',
-                    # Список текстов по каждому типу квартир
-                    'count_flats_all_list': [],
-                    # Текст по каждому ЖК
-                    'each_rb_all_text': '',
-                    # Список текстов по каждому ЖК
-                    'each_rb_all_list': [],
-                    # Список в разрезе ЖК по типу комнат
-                    'each_rb_flats_list': [],
-                    # Список в разрезе типа комнат по ЖК
-                    'each_flats_rb_list': [],
-                }
-
-            }
-
-            dump_file_path = f".\\data\\{arround['id']}.csv"
-            if is_load_from_dump:
-                self.__data_parser.init_data(file_path=dump_file_path)
-            else:
-                self.__data_parser.init_data(self.__get_data_select(arround['id']))
-                self.__data_parser.data.to_csv(f".\\data\\{arround['id']}.csv", encoding='utf-8')
-
-            # Заполнеяем текстовые данные для Общей статистики
-            arroud_data['summary_stat']['cons_report_text_cut'] = self.__get_cons_report_text_cut(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['cons_report_text_full'] = self.__get_cons_report_text_full(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['count_flats_all_text'] = self.__get_count_flats_all_text(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['count_flats_all_list'] = self.__get_count_flats_all_types_list(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['each_rb_all_text'] = self.__get_each_rb_all_text(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['each_rb_all_list'] = self.__get_each_rb_all_list(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['each_rb_flats_list'] = self.__get_each_rb_flats_list(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-            arroud_data['summary_stat']['each_flats_rb_list'] = self.__get_each_flats_rb_list(
-                arround, RenderConsts.TYPE_SUMMARY_STAT)
-
-            # Заполнеяем текстовые данные для Только по новым за 1 день
-            arroud_data['new_stat']['cons_report_text_cut'] = self.__get_cons_report_text_cut(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['cons_report_text_full'] = self.__get_cons_report_text_full(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['count_flats_all_text'] = self.__get_count_flats_all_text(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['count_flats_all_list'] = self.__get_count_flats_all_types_list(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['each_rb_all_text'] = self.__get_each_rb_all_text(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['each_rb_all_list'] = self.__get_each_rb_all_list(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['each_rb_flats_list'] = self.__get_each_rb_flats_list(
-                arround, RenderConsts.TYPE_NEW_STAT)
-            arroud_data['new_stat']['each_flats_rb_list'] = self.__get_each_flats_rb_list(
-                arround, RenderConsts.TYPE_NEW_STAT)
-
-            # Заполнеяем текстовые данные для Только по старым за 1 день
-            arroud_data['old_stat']['cons_report_text_cut'] = self.__get_cons_report_text_cut(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['cons_report_text_full'] = self.__get_cons_report_text_full(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['count_flats_all_text'] = self.__get_count_flats_all_text(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['count_flats_all_list'] = self.__get_count_flats_all_types_list(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['each_rb_all_text'] = self.__get_each_rb_all_text(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['each_rb_all_list'] = self.__get_each_rb_all_list(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['each_rb_flats_list'] = self.__get_each_rb_flats_list(
-                arround, RenderConsts.TYPE_OLD_STAT)
-            arroud_data['old_stat']['each_flats_rb_list'] = self.__get_each_flats_rb_list(
-                arround, RenderConsts.TYPE_OLD_STAT)
-
-            # Заполняем текстовые данные для Только по проданным за 1 день
-            arroud_data['sell_stat']['cons_report_text_cut'] = self.__get_cons_report_text_cut(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['cons_report_text_full'] = self.__get_cons_report_text_full(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['count_flats_all_text'] = self.__get_count_flats_all_text(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['count_flats_all_list'] = self.__get_count_flats_all_types_list(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['each_rb_all_text'] = self.__get_each_rb_all_text(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['each_rb_all_list'] = self.__get_each_rb_all_list(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['each_rb_flats_list'] = self.__get_each_rb_flats_list(
-                arround, RenderConsts.TYPE_SELL_STAT)
-            arroud_data['sell_stat']['each_flats_rb_list'] = self.__get_each_flats_rb_list(
-                arround, RenderConsts.TYPE_SELL_STAT)
-
+        def get_arround_data(arround: Dict) -> Optional[DataFrame]:
+            # Срез данных окружения при построении в памяти
+            if not is_partition_in_memory or arround_rb_ids is None:
+                return None
+            return all_arrounds_data[all_arrounds_data.rb_id.isin(arround_rb_ids.get(arround['id'], []))]
+
+        arrounds_count = len(self.__arround_list)
+        if self.__is_parallel_render and arrounds_count > 1:
+            workers = min(self.__render_workers, arrounds_count)
+            logging.info(f'Параллельный рендеринг окружений в {workers} процессах')
+            # spawn, чтобы процессы не наследовали подключения пула БД родителя
+            mp_context = multiprocessing.get_context('spawn')
+            # Процессы spawn не наследуют настройку логирования, их записи
+            # передаются через очередь в хендлеры корневого логгера родителя
+            root_logger = logging.getLogger()
+            log_queue = mp_context.Queue()
+            log_listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+            log_listener.start()
+            try:
+                with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                         initializer=_init_process_logging,
+                                         initargs=(log_queue, root_logger.level)) as executor:
+                    arrounds_results = list(executor.map(
+                        _render_arround_in_process,
+                        [self.__chat_config] * arrounds_count,
+                        [self.__db_config] * arrounds_count,
+                        self.__arround_list,
+                        [is_load_from_dump] * arrounds_count,
+                        [is_stat_pushdown] * arrounds_count,
+                        [get_arround_data(arround) for arround in self.__arround_list]))
+            finally:
+                log_listener.stop()
+        else:
+            arrounds_results = [
+                self.render_arround(arround, is_load_from_dump, is_stat_pushdown, get_arround_data(arround))
+                for arround in self.__arround_list
+            ]
+
+        for arround, (arroud_data, arround_stat_data) in zip(self.__arround_list, arrounds_results):
+            if arround_stat_data is not None:
+                self.__arrounds_stat_data[arround['title']] = arround_stat_data
             self.__rendered_data['arround_list'].append(arroud_data)
 
         file_dump = ".\\data\\rendered_data.json"
@@ -261,6 +273,282 @@ class DataRender():
     def get_rendered_data(self):
         return self.__rendered_data
 
+    def __get_db_wrapper(self) -> DBWrapper:
+        """Получение обертки для работы с БД, создается при первом обращении
+
+        Returns:
+            DBWrapper: Обертка для работы с БД
+        """
+        if self.__db_wrapper is None:
+            self.__db_wrapper = DBWrapper(self.__db_config)
+        return self.__db_wrapper
+
+    def __get_data_parser(self) -> DataParser:
+        """Получение парсера данных из БД, создается при первом обращении
+
+        Returns:
+            DataParser: Парсер данных из БД
+        """
+        if self.__data_parser is None:
+            self.__data_parser = DataParser(self.__db_config)
+        return self.__data_parser
+
+    def __get_stat_data(self) -> StatData:
+        """Получение стат. данных, по которым рендерятся разделы: сохраненных
+        стат. данных окружения при отложенном рендеринге или парсера
+
+        Returns:
+            StatData: Стат. данные
+        """
+        if self.__stat_data is not None:
+            return self.__stat_data
+        return self.__get_data_parser()
+
+    def __get_rendered_snapshot_key(self, is_load_from_dump: bool = False) -> str:
+        """Получение ключа снимка отрендеренных данных: хеша версии снимка,
+        текущей даты, окружений, настроек чат-бота и отпечатка исходных данных.
+        Отпечаток дамп файлов строится по их размерам и времени изменения,
+        отпечаток данных в БД - по количеству и хешу записей каждого дня основного массива данных
+        и хешам наименований ЖК и типов комнат
+
+        Args:
+            is_load_from_dump (bool): Данные загружаются из дамп файлов
+
+        Returns:
+            str: Ключ снимка
+        """
+        arround_ids = ','.join([x['id'] for x in self.__arround_list])
+        if is_load_from_dump:
+            dump_paths = [self.__get_dump_file_path(arround_ids, is_load_from_dump),
+                          f'.\\data\\around_rb_list_{arround_ids}.json']
+            dump_paths += [self.__get_dump_file_path(arround['id'], is_load_from_dump)
+                           for arround in self.__arround_list]
+            source_fingerprint: Any = [self.__get_file_fingerprint(path) for path in dump_paths]
+        else:
+            source_fingerprint = self.__get_db_wrapper().execute_select(
+                self.__get_source_fingerprint_select(arround_ids))
+
+        snapshot_key_data = {
+            'version': RENDERED_SNAPSHOT_VERSION,
+            'current_data_date': self.__current_data_date,
+            'arround_list': self.__arround_list,
+            'chat_config': {key: value for key, value in self.__chat_config.items()
+                            if key not in RENDERED_SNAPSHOT_IGNORED_OPTIONS},
+            'source': source_fingerprint,
+        }
+        snapshot_key = hashlib.sha256(
+            json.dumps(snapshot_key_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        logging.debug(f'Ключ снимка отрендеренных данных: {snapshot_key}')
+        return snapshot_key
+
+    def __get_file_fingerprint(self, path: str) -> List:
+        """Получение отпечатка файла или директории хранилища по дням:
+        размеров и времени изменения файлов
+
+        Args:
+            path (str): Путь до файла или директории
+
+        Returns:
+            List: Имена, размеры и время изменения файлов, пустой список, если пути нет
+        """
+        if os.path.isdir(path):
+            return [[file_name] + self.__get_file_fingerprint(os.path.join(path, file_name))
+                    for file_name in sorted(os.listdir(path))]
+        if not os.path.exists(path):
+            return []
+        file_stat = os.stat(path)
+        return [file_stat.st_size, file_stat.st_mtime_ns]
+
+    def __load_rendered_snapshot(self, snapshot_key: str) -> bool:
+        """Загрузка отрендеренных данных из снимка, если ключ снимка совпадает
+
+        Args:
+            snapshot_key (str): Ключ снимка по текущим исходным данным и настройкам
+
+        Returns:
+            bool: Данные загружены из снимка
+        """
+        if not os.path.exists(RENDERED_SNAPSHOT_FILE_PATH):
+            logging.info(f'Снимок {RENDERED_SNAPSHOT_FILE_PATH} не найден')
+            return False
+        try:
+            with open(RENDERED_SNAPSHOT_FILE_PATH, 'rb') as file:
+                snapshot = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            logging.warning(f'Снимок {RENDERED_SNAPSHOT_FILE_PATH} не прочитан', exc_info=True)
+            return False
+        if snapshot.get('version') != RENDERED_SNAPSHOT_VERSION or snapshot.get('key') != snapshot_key:
+            logging.info(f'Снимок {RENDERED_SNAPSHOT_FILE_PATH} устарел')
+            return False
+
+        self.__rendered_data = snapshot['rendered_data']
+        self.__arrounds_stat_data = snapshot['arrounds_stat_data']
+        logging.info(f'Отрендеренные данные загружены из снимка {RENDERED_SNAPSHOT_FILE_PATH}')
+        return True
+
+    def __dump_rendered_snapshot(self, snapshot_key: str) -> None:
+        """Сохранение снимка отрендеренных данных. Снимок пишется во временный файл
+        и заменяет предыдущий, чтобы при падении не оставался недописанный снимок
+
+        Args:
+            snapshot_key (str): Ключ снимка по текущим исходным данным и настройкам
+        """
+        snapshot = {
+            'version': RENDERED_SNAPSHOT_VERSION,
+            'key': snapshot_key,
+            'rendered_data': self.__rendered_data,
+            # Стат. данные окружений нужны для отложенного рендеринга
+            'arrounds_stat_data': self.__arrounds_stat_data,
+        }
+        tmp_file_path = RENDERED_SNAPSHOT_FILE_PATH + '.tmp'
+        with open(tmp_file_path, 'wb') as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file_path, RENDERED_SNAPSHOT_FILE_PATH)
+        logging.info(f'{RENDERED_SNAPSHOT_FILE_PATH} dumped')
+
+    def render_arround(
+            self,
+            arround: Dict,
+            is_load_from_dump: bool = False,
+            is_stat_pushdown: bool = False,
+            arround_data: Optional[DataFrame] = None) -> Tuple[Dict, Optional[Dict]]:
+        """Рендер текстового представления данных одного окружения.
+        Использует только состояние парсера, поэтому окружения можно рендерить
+        в отдельных процессах
+
+        Args:
+            arround (Dict): Данные окружения
+            is_load_from_dump (bool): Загрузить данные из дамп файла
+            is_stat_pushdown (bool): Считать общую статистику агрегатами в БД,
+            данные окружения все равно получаются для статистики новых, старых и проданных записей
+            arround_data (Optional[DataFrame]): Срез данных окружения, если данные построены в памяти
+
+        Returns:
+            Tuple[Dict, Optional[Dict]]: Отрендеренные данные окружения и
+            стат. данные окружения для отложенного рендеринга
+        """
+        logging.info(f"Рендеринг текстового вывода для окружения {arround['title']}")
+        if arround_data is not None:
+            self.__get_data_parser().init_data(data=arround_data)
+        else:
+            self.__init_parser_data(arround['id'], is_load_from_dump)
+        if is_stat_pushdown:
+            self.__get_data_parser().init_common_stat_data(self.__get_common_stat_select(arround['id']))
+        logging.info(f"Память данных окружения {arround['title']}: {self.__get_data_parser().get_memory_report()}")
+
+        arroud_data: Dict = {
+            # Наименование окружения
+            'arround_title': arround['title'],
+            # Описания для меню типов квартир и ЖК по новым, старым и проданным записям
+            'using_types': self.__get_arround_using_types(),
+            # Сравнение последней недели с предыдущей, небольшой текст рендерится всегда
+            'week_report_text': self.__get_week_report_text(arround),
+        }
+        if self.__is_lazy_render:
+            # Тексты окружения рендерятся при запросе в get_rendered_section()
+            return arroud_data, self.__get_data_parser().get_all_stat_data()
+
+        for stat_key, type_stat in RENDER_STAT_TYPES.items():
+            arroud_data[stat_key] = {
+                section: render_section(arround, type_stat)
+                for section, render_section in self.__section_renders.items()
+            }
+        return arroud_data, None
+
+    def __get_arround_using_types(self) -> Dict[str, List[str]]:
+        """Получение описаний для меню типов квартир и ЖК, по которым есть
+        стат. данные новых, старых и проданных записей окружения.
+        Описания берутся из ключей групп стат. данных парсера без рендеринга текстов
+
+        Returns:
+            Dict[str, List[str]]: Описания по разделам count_flats_all_list и each_rb_all_list
+        """
+        flat_types: Set[str] = set()
+        for rows in [self.__get_stat_data().get_new_cons_each_count_flats(),
+                     self.__get_stat_data().get_old_cons_each_count_flats(),
+                     self.__get_stat_data().get_sell_cons_each_count_flats()]:
+            flat_types.update(sup_f.get_rooms_count_descs(row['rooms_count_title'])[1] for row in rows)
+        rb_names: Set[str] = set()
+        for rows in [self.__get_stat_data().get_new_cons_each_rbs(),
+                     self.__get_stat_data().get_old_cons_each_rbs(),
+                     self.__get_stat_data().get_sell_cons_each_rbs()]:
+            rb_names.update(sup_f.get_rb_title_desc(row['rb_title']) for row in rows)
+        return {'count_flats_all_list': sorted(flat_types), 'each_rb_all_list': sorted(rb_names)}
+
+    def get_rendered_section(self, arround_title: str, stat_key: str, section: str) -> Any:
+        """Получение отрендеренного раздела типа статистики окружения.
+        При отложенном рендеринге раздел рендерится из стат. данных окружения
+        при первом запросе и хранится в LRU-кеше
+
+        Args:
+            arround_title (str): Наименование окружения
+            stat_key (str): Тип статистики, ключ RENDER_STAT_TYPES
+            section (str): Раздел, например cons_report_text_cut
+
+        Returns:
+            Any: Текст или список раздела
+        """
+        if not self.__is_lazy_render:
+            for arround_data in self.__rendered_data['arround_list']:
+                if arround_data['arround_title'] == arround_title:
+                    return arround_data[stat_key][section]
+            raise Exception(f'Unknown arround_title: {arround_title}')
+
+        cache_key = (arround_title, stat_key, section)
+        if cache_key in self.__render_cache:
+            self.__render_cache_hits += 1
+            self.__render_cache.move_to_end(cache_key)
+            return self.__render_cache[cache_key]
+
+        self.__render_cache_misses += 1
+        if arround_title not in self.__arrounds_stat_data:
+            raise Exception(f'Unknown arround_title: {arround_title}')
+        arround = next(arround for arround in self.__arround_list if arround['title'] == arround_title)
+        # Раздел рендерится по сохраненным стат. данным, парсер при этом не создается
+        self.__stat_data = StatData(self.__arrounds_stat_data[arround_title])
+        try:
+            rendered_section = self.__section_renders[section](arround, RENDER_STAT_TYPES[stat_key])
+        finally:
+            self.__stat_data = None
+
+        self.__render_cache[cache_key] = rendered_section
+        if len(self.__render_cache) > self.__render_cache_size:
+            self.__render_cache.popitem(last=False)
+        logging.debug(f'Раздел {cache_key} отрендерен, статистика кеша: {self.get_render_cache_stats()}')
+        return rendered_section
+
+    def get_message_header(self, arround_title: str, stat_key: str, message: str, group_title: str = '') -> str:
+        """Получение заголовка сообщения, которое собирается из фрагментов
+        разделов при выводе в чат-бот
+
+        Args:
+            arround_title (str): Наименование окружения
+            stat_key (str): Тип статистики, ключ RENDER_STAT_TYPES
+            message (str): Сообщение, например count_flats_all_text
+            group_title (str): Описание ЖК или типа квартир для сообщений по ним
+
+        Returns:
+            str: Заголовок сообщения
+        """
+        for arround in self.__arround_list:
+            if arround['title'] == arround_title:
+                return self.__message_headers[message](arround, RENDER_STAT_TYPES[stat_key], group_title)
+        raise Exception(f'Unknown arround_title: {arround_title}')
+
+    def get_render_cache_stats(self) -> Dict:
+        """Получение статистики LRU-кеша отрендеренных разделов
+
+        Returns:
+            Dict: Количество разделов в кеше, максимальное количество,
+            количество попаданий и промахов
+        """
+        return {
+            'size': len(self.__render_cache),
+            'max_size': self.__render_cache_size,
+            'hits': self.__render_cache_hits,
+            'misses': self.__render_cache_misses,
+        }
+
     def __get_cons_report_text_cut(
             self,
             arround: Dict,
@@ -276,25 +564,25 @@ class DataRender():
         """
 
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            text_inner = sup_f.get_cons_all_rb(self.__data_parser.get_common_cons_all_rb())
+            text_inner = sup_f.get_cons_all_rb(self.__get_stat_data().get_common_cons_all_rb())
             return f"📊 📃 The general summary for {arround['title']} from " \
                    f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:' \
                    '\n' + text_inner
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            text_inner = sup_f.get_cons_all_rb(self.__data_parser.get_new_cons_all_rb())
+            text_inner = sup_f.get_cons_all_rb(self.__get_stat_data().get_new_cons_all_rb())
             return f"📊 📃 The general summary of new flats relative to old ones in {arround['title']} on " \
                    f'{sup_f.datetime_to_str(self.__current_date)}:' \
                    '\n' + text_inner
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            text_inner = sup_f.get_cons_all_rb(self.__data_parser.get_old_cons_all_rb())
+            text_inner = sup_f.get_cons_all_rb(self.__get_stat_data().get_old_cons_all_rb())
             return f"📊 📃 The general summary old flats in {arround['title']} from " \
                    f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:' \
                    '\n' + text_inner
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            text_inner = sup_f.get_cons_all_rb(self.__data_parser.get_sell_cons_all_rb())
+            text_inner = sup_f.get_cons_all_rb(self.__get_stat_data().get_sell_cons_all_rb())
             return f"📊 📃 The general summary of old flats relative to old ones in {arround['title']} on " \
                    f'{sup_f.datetime_to_str(self.__current_date)}:' \
                    '\n' + text_inner
@@ -337,320 +625,357 @@ class DataRender():
             self,
             arround: Dict,
             type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> List:
-        """Генерация текстового вывода по всем типам ЖК по типам квартир
+        """Генерация фрагментов по всем типам ЖК по типам квартир
 
         Args:
             arround (Dict): Данные окружения
             type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
         Returns:
-            List: Текстовый вывод по всем типам ЖК по типам квартир
+            List: Фрагменты по всем типам ЖК по типам квартир,
+            см. sup_f.gen_cons_each_rb_to_count_flats()
         """
 
         data_each_rb_flats_list = []
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            data_each_rb_flats_list = self.__data_parser.get_common_cons_each_rb_to_count_flats()
+            data_each_rb_flats_list = self.__get_stat_data().get_common_cons_each_rb_to_count_flats()
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            data_each_rb_flats_list = self.__data_parser.get_new_cons_each_rb_to_count_flats()
+            data_each_rb_flats_list = self.__get_stat_data().get_new_cons_each_rb_to_count_flats()
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            data_each_rb_flats_list = self.__data_parser.get_old_cons_each_rb_to_count_flats()
+            data_each_rb_flats_list = self.__get_stat_data().get_old_cons_each_rb_to_count_flats()
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            data_each_rb_flats_list = self.__data_parser.get_sell_cons_each_rb_to_count_flats()
+            data_each_rb_flats_list = self.__get_stat_data().get_sell_cons_each_rb_to_count_flats()
 
-        o_list = sup_f.gen_cons_each_rb_to_count_flats(data_each_rb_flats_list)['each_rb_flats_list']
+        return sup_f.gen_cons_each_rb_to_count_flats(data_each_rb_flats_list)['each_rb_flats_list']
 
-        for rb_row in o_list:
-            header = ''
+    def __get_each_flats_rb_list(
+            self,
+            arround: Dict,
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> List:
+        """Генерация фрагментов по всем типам квартир в разрезе ЖК
 
-            if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-                header = f"📊 🔢 The changes by number of rooms in {rb_row['rb_title']} of {arround['title']} " \
-                         f'from {sup_f.datetime_to_str(self.__previous_date)} ' \
-                         f'to {sup_f.datetime_to_str(self.__current_date)}:'
+        Args:
+            arround (Dict): Данные окружения
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
+        Returns:
+            List: Фрагменты по всем типам квартир в разрезе ЖК,
+            см. sup_f.gen_cons_each_count_flats_to_rb()
+        """
+        data_each_count_flats_to_rb = []
+        if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
+            data_each_count_flats_to_rb = self.__get_stat_data().get_common_cons_each_rb_to_count_flats()
 
-            elif type_stat == RenderConsts.TYPE_NEW_STAT:
-                header = f"📊 🔢 The changes of new flats relative to old ones by number of rooms in {rb_row['rb_title']}" \
-                         f" of {arround['title']} on " \
-                         f'{sup_f.datetime_to_str(self.__current_date)}:'
+        elif type_stat == RenderConsts.TYPE_NEW_STAT:
+            data_each_count_flats_to_rb = self.__get_stat_data().get_new_cons_each_rb_to_count_flats()
 
-            elif type_stat == RenderConsts.TYPE_OLD_STAT:
-                header = f"📊 🔢 The changes of old flats by number of rooms in {rb_row['rb_title']}" \
-                         f" of {arround['title']} from " \
-                         f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
+        elif type_stat == RenderConsts.TYPE_OLD_STAT:
+            data_each_count_flats_to_rb = self.__get_stat_data().get_old_cons_each_rb_to_count_flats()
 
-            elif type_stat == RenderConsts.TYPE_SELL_STAT:
-                header = f"📊 🔢 The changes of sold flats relative to old ones by number of rooms " \
-                         f"in {rb_row['rb_title']} in {arround['title']} on " \
-                         f'{sup_f.datetime_to_str(self.__current_date)}:'
+        elif type_stat == RenderConsts.TYPE_SELL_STAT:
+            data_each_count_flats_to_rb = self.__get_stat_data().get_sell_cons_each_rb_to_count_flats()
 
-            if not 'all_types_text' in rb_row or not 'all_types_list' in rb_row:
-                continue
+        return sup_f.gen_cons_each_count_flats_to_rb(data_each_count_flats_to_rb)['each_flats_rb_list']
 
-            for row in rb_row['all_types_list']:
-                row['text'] = header + '\n' + row['text']
+    def __get_each_rb_all_list(
+            self,
+            arround: Dict,
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> Dict:
+        """Получение фрагментов по каждому типу ЖК
 
-            rb_row['all_types_text'] = header + '\n' + rb_row['all_types_text']
+        Args:
+            arround (Dict): Данные окружения
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
+        Returns:
+            Dict: Фрагменты по каждому типу ЖК, см. sup_f.gen_cons_each_rb()
+        """
+        data_each_rbs = []
+        if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
+            data_each_rbs = self.__get_stat_data().get_common_cons_each_rbs()
 
-        return o_list
+        elif type_stat == RenderConsts.TYPE_NEW_STAT:
+            data_each_rbs = self.__get_stat_data().get_new_cons_each_rbs()
 
-    def __get_each_flats_rb_list(
+        elif type_stat == RenderConsts.TYPE_OLD_STAT:
+            data_each_rbs = self.__get_stat_data().get_old_cons_each_rbs()
+
+        elif type_stat == RenderConsts.TYPE_SELL_STAT:
+            data_each_rbs = self.__get_stat_data().get_sell_cons_each_rbs()
+
+        return sup_f.gen_cons_each_rb(data_each_rbs, False)
+
+    def __get_count_flats_all_types_list(
             self,
             arround: Dict,
-            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> List:
-        """Генерация текстового вывода по всем типам квартир в разрезе ЖК
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> Dict:
+        """Получение фрагментов по каждому типу квартир
 
         Args:
             arround (Dict): Данные окружения
             type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
+
         Returns:
-            List: Текстовый вывод по всем типам квартир в разрезе ЖК
+            Dict: Фрагменты по каждому типу квартир, см. sup_f.gen_cons_each_count_flats()
         """
-        o_list = []
-        data_each_count_flats_to_rb = []
+        data_each_count_flats = []
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            data_each_count_flats_to_rb = self.__data_parser.get_common_cons_each_rb_to_count_flats()
+            data_each_count_flats = self.__get_stat_data().get_common_cons_each_count_flats()
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            data_each_count_flats_to_rb = self.__data_parser.get_new_cons_each_rb_to_count_flats()
+            data_each_count_flats = self.__get_stat_data().get_new_cons_each_count_flats()
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            data_each_count_flats_to_rb = self.__data_parser.get_old_cons_each_rb_to_count_flats()
+            data_each_count_flats = self.__get_stat_data().get_old_cons_each_count_flats()
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            data_each_count_flats_to_rb = self.__data_parser.get_sell_cons_each_rb_to_count_flats()
+            data_each_count_flats = self.__get_stat_data().get_sell_cons_each_count_flats()
 
-        o_list = sup_f.gen_cons_each_count_flats_to_rb(data_each_count_flats_to_rb)['each_flats_rb_list']
+        return sup_f.gen_cons_each_count_flats(data_each_count_flats, False)
 
-        for flat_row in o_list:
-            if not 'all_types_text' in flat_row or not 'all_types_list' in flat_row:
-                continue
-            for row in flat_row['all_types_list']:
-                header = ''
-                if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-                    header = f"📊 🔢 The changes by number of rooms in {row['type']} of {arround['title']} " \
-                             f'from {sup_f.datetime_to_str(self.__previous_date)} ' \
-                             f'to {sup_f.datetime_to_str(self.__current_date)}:'
-
-                elif type_stat == RenderConsts.TYPE_NEW_STAT:
-                    header = f"📊 🔢 The changes of new flats relative to old ones by number of rooms " \
-                             f"in {row['type']} of {arround['title']} on " \
-                             f'{sup_f.datetime_to_str(self.__current_date)}:'
-
-                elif type_stat == RenderConsts.TYPE_OLD_STAT:
-                    header = f"📊 🔢 The changes of old flats by number of rooms in {row['type']}" \
-                             f"of {arround['title']} from {sup_f.datetime_to_str(self.__previous_date)}" \
-                             f"to {sup_f.datetime_to_str(self.__current_date)}:"
-
-                elif type_stat == RenderConsts.TYPE_SELL_STAT:
-                    header = f"📊 🔢 The changes of sold flats relative to old ones by number of rooms " \
-                             f"in {row['type']} of {arround['title']} on " \
-                             f'{sup_f.datetime_to_str(self.__current_date)}:'
-
-                row['text'] = header + '\n' + row['text']
-            header = ''
-            if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-                header = f"📊 🏘 The changes by {flat_row['rooms_count_title']} in {arround['title']} from " \
-                         f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                         f'{sup_f.datetime_to_str(self.__current_date)}:'
-            elif type_stat == RenderConsts.TYPE_NEW_STAT:
-                header = f"📊 🏘 The changes of new flats relative to old ones by {flat_row['rooms_count_title']} " \
-                         f"in {arround['title']} on " \
-                         f'{sup_f.datetime_to_str(self.__current_date)}:'
-            elif type_stat == RenderConsts.TYPE_OLD_STAT:
-                header = f"📊 🏘 The changes of old flats by {flat_row['rooms_count_title']} " \
-                         f"in {arround['title']} from " \
-                         f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                         f'{sup_f.datetime_to_str(self.__current_date)}:'
-            elif type_stat == RenderConsts.TYPE_SELL_STAT:
-                header = f"📊 🏘 The changes of sold flats relative to old ones by {flat_row['rooms_count_title']} " \
-                         f"in {arround['title']} on " \
-                         f'{sup_f.datetime_to_str(self.__current_date)}:'
-
-            flat_row['all_types_text'] = header + '\n' + flat_row['all_types_text']
-        return o_list
-
-    def __get_each_rb_all_list(
+    def __get_each_rb_flats_header(
             self,
             arround: Dict,
-            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> List:
-        """Получение списка текста по каждому типу ЖК
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            rb_title: str) -> str:
+        """Заголовок сообщений по ЖК по типам квартир
 
         Args:
             arround (Dict): Данные окружения
-            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            rb_title (str): Описание ЖК
         Returns:
-            List: текст по каждому типу ЖК
+            str: Заголовок
         """
-        o_list = []
-        header = ''
-
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            o_list = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_common_cons_each_rbs(), False)['all_types_list']
-            header = f"📊 🔢 The changes in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
+            return f"📊 🔢 The changes by number of rooms in {rb_title} of {arround['title']} " \
+                   f'from {sup_f.datetime_to_str(self.__previous_date)} ' \
+                   f'to {sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            o_list = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_new_cons_each_rbs(), False)['all_types_list']
-            header = f"📊 🔢 The changes of new flats relative to old ones by residential complex " \
-                     f"in {arround['title']} on " \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
+            return f"📊 🔢 The changes of new flats relative to old ones by number of rooms in {rb_title}" \
+                   f" of {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            o_list = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_old_cons_each_rbs(), False)['all_types_list']
-            header = f"📊 🔢 The changes of old flats by residential complex in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
+            return f"📊 🔢 The changes of old flats by number of rooms in {rb_title}" \
+                   f" of {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            o_list = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_sell_cons_each_rbs(), False)['all_types_list']
-            header = f"📊 🔢 The changes of sold flats relative to old ones by residential complex " \
-                     f"in {arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
+            return f"📊 🔢 The changes of sold flats relative to old ones by number of rooms " \
+                   f"in {rb_title} in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
-        for row in o_list:
-            row['text'] = header + '\n' + row['text']
-        return o_list
+        raise Exception(f'Unknown type_stat: {type_stat}')
 
-    def __get_each_rb_all_text(
-            self, arround: Dict,
-            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> str:
-        """Получения текста изменений по всем типам ЖК
+    def __get_each_flats_rb_type_header(
+            self,
+            arround: Dict,
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            rb_title: str) -> str:
+        """Заголовок сообщения по типу квартир в одном ЖК
 
         Args:
             arround (Dict): Данные окружения
-            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            rb_title (str): Описание ЖК
         Returns:
-            str: текст изменений по всем типам ЖК
+            str: Заголовок
         """
-        o_text = ''
-        text_inner = ''
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            o_text = f"📊 🔢 The changes by residential complex in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
-            text_inner = sup_f.gen_cons_each_rb(self.__data_parser.get_common_cons_each_rbs(), False)['all_types_text']
+            return f"📊 🔢 The changes by number of rooms in {rb_title} of {arround['title']} " \
+                   f'from {sup_f.datetime_to_str(self.__previous_date)} ' \
+                   f'to {sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            o_text = f"📊 🔢 The changes of new flats relative to old ones by residential complex " \
-                     f"in {arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
-
-            text_inner = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_new_cons_each_rbs(), False)['all_types_text']
+            return f"📊 🔢 The changes of new flats relative to old ones by number of rooms " \
+                   f"in {rb_title} of {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            o_text = f"📊 🔢 The changes of old flats by residential complex in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
-            text_inner = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_old_cons_each_rbs(), False)['all_types_text']
+            return f"📊 🔢 The changes of old flats by number of rooms in {rb_title}" \
+                   f"of {arround['title']} from {sup_f.datetime_to_str(self.__previous_date)}" \
+                   f"to {sup_f.datetime_to_str(self.__current_date)}:"
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            o_text = f"📊 🔢 The changes of sold flats relative to old ones by residential complex in" \
-                     f" {arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
-
-            text_inner = sup_f.gen_cons_each_rb(
-                self.__data_parser.get_sell_cons_each_rbs(), False)['all_types_text']
+            return f"📊 🔢 The changes of sold flats relative to old ones by number of rooms " \
+                   f"in {rb_title} of {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
-        o_text += '\n' + text_inner
-        return o_text
+        raise Exception(f'Unknown type_stat: {type_stat}')
 
-    def __get_count_flats_all_types_list(
+    def __get_each_flats_rb_header(
             self,
             arround: Dict,
-            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> List:
-        """Получение списка текста по каждому типу квартир
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            rooms_count_title: str) -> str:
+        """Заголовок сообщения по типу квартир по всем ЖК
 
         Args:
             arround (Dict): Данные окружения
-            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
-
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            rooms_count_title (str): Описание типа квартир для меню
         Returns:
-            List: текст по каждому типу квартир
+            str: Заголовок
         """
-        o_list = []
-        header = ''
+        if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
+            return f"📊 🏘 The changes by {rooms_count_title} in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+        elif type_stat == RenderConsts.TYPE_NEW_STAT:
+            return f"📊 🏘 The changes of new flats relative to old ones by {rooms_count_title} " \
+                   f"in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+        elif type_stat == RenderConsts.TYPE_OLD_STAT:
+            return f"📊 🏘 The changes of old flats by {rooms_count_title} " \
+                   f"in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+        elif type_stat == RenderConsts.TYPE_SELL_STAT:
+            return f"📊 🏘 The changes of sold flats relative to old ones by {rooms_count_title} " \
+                   f"in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+
+        raise Exception(f'Unknown type_stat: {type_stat}')
+
+    def __get_each_rb_type_header(
+            self,
+            arround: Dict,
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            group_title: str = '') -> str:
+        """Заголовок сообщения по одному ЖК
 
+        Args:
+            arround (Dict): Данные окружения
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            group_title (str): Не используется
+        Returns:
+            str: Заголовок
+        """
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            header = f"📊 🔢 The changes by number of rooms in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
-            o_list = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_common_cons_each_count_flats(), False)['all_types_list']
+            return f"📊 🔢 The changes in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            header = f"📊 🔢 The changes of new flats relative to old ones by number of rooms in" \
-                     f"{arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
-
-            o_list = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_new_cons_each_count_flats(), False)['all_types_list']
+            return f"📊 🔢 The changes of new flats relative to old ones by residential complex " \
+                   f"in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            header = f"📊 🔢 The changes of old flats by number of rooms in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
+            return f"📊 🔢 The changes of old flats by residential complex in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+
+        elif type_stat == RenderConsts.TYPE_SELL_STAT:
+            return f"📊 🔢 The changes of sold flats relative to old ones by residential complex " \
+                   f"in {arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
+
+        raise Exception(f'Unknown type_stat: {type_stat}')
+
+    def __get_each_rb_all_header(
+            self,
+            arround: Dict,
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            group_title: str = '') -> str:
+        """Заголовок сообщения по всем типам ЖК
+
+        Args:
+            arround (Dict): Данные окружения
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            group_title (str): Не используется
+        Returns:
+            str: Заголовок
+        """
+        if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
+            return f"📊 🔢 The changes by residential complex in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
-            o_list = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_old_cons_each_count_flats(), False)['all_types_list']
+        elif type_stat == RenderConsts.TYPE_NEW_STAT:
+            return f"📊 🔢 The changes of new flats relative to old ones by residential complex " \
+                   f"in {arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
+
+        elif type_stat == RenderConsts.TYPE_OLD_STAT:
+            return f"📊 🔢 The changes of old flats by residential complex in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            header = f"📊 🔢 The changes of sold flats relative to old ones by number of rooms" \
-                     f" in {arround['title']} on " \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
-            o_list = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_sell_cons_each_count_flats(), False)['all_types_list']
+            return f"📊 🔢 The changes of sold flats relative to old ones by residential complex in" \
+                   f" {arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
 
-        for row in o_list:
-            row['text'] = header + '\n' + row['text']
-        return o_list
+        raise Exception(f'Unknown type_stat: {type_stat}')
 
-    def __get_count_flats_all_text(
+    def __get_count_flats_type_header(
             self,
             arround: Dict,
-            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS]) -> str:
-        """Получения текста изменений по всем типам квартир
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            group_title: str = '') -> str:
+        """Заголовок сообщения по одному типу квартир
 
         Args:
             arround (Dict): Данные окружения
-            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики для генерации
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            group_title (str): Не используется
         Returns:
-            str: текст изменений по всем типам квартир
+            str: Заголовок
         """
-        o_text = ''
-        text_inner = ''
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            o_text = f"📊 🔢 The changes by number of rooms in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
-            text_inner = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_common_cons_each_count_flats(), False)['all_types_text']
+            return f"📊 🔢 The changes by number of rooms in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            o_text = f"📊 🔢 The changes of new flats relative to old ones by number of rooms" \
-                     f" in {arround['title']} on " \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
-            text_inner = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_new_cons_each_count_flats(), False)['all_types_text']
+            return f"📊 🔢 The changes of new flats relative to old ones by number of rooms in" \
+                   f"{arround['title']} on {sup_f.datetime_to_str(self.__current_date)}:"
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            o_text = f"📊 🔢 The changes of old flats by number of rooms" \
-                     f" in {arround['title']} from " \
-                     f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
+            return f"📊 🔢 The changes of old flats by number of rooms in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
+
+        elif type_stat == RenderConsts.TYPE_SELL_STAT:
+            return f"📊 🔢 The changes of sold flats relative to old ones by number of rooms" \
+                   f" in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+
+        raise Exception(f'Unknown type_stat: {type_stat}')
 
-            text_inner = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_old_cons_each_count_flats(), False)['all_types_text']
+    def __get_count_flats_all_header(
+            self,
+            arround: Dict,
+            type_stat: Literal[RenderConsts.ALLOWED_TYPES_STATS],
+            group_title: str = '') -> str:
+        """Заголовок сообщения по всем типам квартир
+
+        Args:
+            arround (Dict): Данные окружения
+            type_stat (Literal[RenderConsts.ALLOWED_TYPES_STATS]): Тип статистики
+            group_title (str): Не используется
+        Returns:
+            str: Заголовок
+        """
+        if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
+            return f"📊 🔢 The changes by number of rooms in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to ' \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+
+        elif type_stat == RenderConsts.TYPE_NEW_STAT:
+            return f"📊 🔢 The changes of new flats relative to old ones by number of rooms" \
+                   f" in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
+
+        elif type_stat == RenderConsts.TYPE_OLD_STAT:
+            return f"📊 🔢 The changes of old flats by number of rooms" \
+                   f" in {arround['title']} from " \
+                   f'{sup_f.datetime_to_str(self.__previous_date)} to {sup_f.datetime_to_str(self.__current_date)}:'
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            o_text = f"📊 🔢 The changes of sold flats relative to old ones by number of rooms" \
-                     f" in {arround['title']} on " \
-                     f'{sup_f.datetime_to_str(self.__current_date)}:'
-            text_inner = sup_f.gen_cons_each_count_flats(
-                self.__data_parser.get_sell_cons_each_count_flats(), False)['all_types_text']
+            return f"📊 🔢 The changes of sold flats relative to old ones by number of rooms" \
+                   f" in {arround['title']} on " \
+                   f'{sup_f.datetime_to_str(self.__current_date)}:'
 
-        o_text += '\n' + text_inner
-        return o_text
+        raise Exception(f'Unknown type_stat: {type_stat}')
 
     def __generate_general_changes_body(
             self,
@@ -669,34 +994,71 @@ class DataRender():
         data_each_count_flats = []
         data_each_rbs = []
         if type_stat == RenderConsts.TYPE_SUMMARY_STAT:
-            data_all_rb = self.__data_parser.get_common_cons_all_rb()
-            data_each_count_flats = self.__data_parser.get_common_cons_each_count_flats()
-            data_each_rbs = self.__data_parser.get_common_cons_each_rbs()
+            data_all_rb = self.__get_stat_data().get_common_cons_all_rb()
+            data_each_count_flats = self.__get_stat_data().get_common_cons_each_count_flats()
+            data_each_rbs = self.__get_stat_data().get_common_cons_each_rbs()
 
         elif type_stat == RenderConsts.TYPE_NEW_STAT:
-            data_all_rb = self.__data_parser.get_new_cons_all_rb()
-            data_each_count_flats = self.__data_parser.get_new_cons_each_count_flats()
-            data_each_rbs = self.__data_parser.get_new_cons_each_rbs()
+            data_all_rb = self.__get_stat_data().get_new_cons_all_rb()
+            data_each_count_flats = self.__get_stat_data().get_new_cons_each_count_flats()
+            data_each_rbs = self.__get_stat_data().get_new_cons_each_rbs()
 
         elif type_stat == RenderConsts.TYPE_OLD_STAT:
-            data_all_rb = self.__data_parser.get_old_cons_all_rb()
-            data_each_count_flats = self.__data_parser.get_old_cons_each_count_flats()
-            data_each_rbs = self.__data_parser.get_old_cons_each_rbs()
+            data_all_rb = self.__get_stat_data().get_old_cons_all_rb()
+            data_each_count_flats = self.__get_stat_data().get_old_cons_each_count_flats()
+            data_each_rbs = self.__get_stat_data().get_old_cons_each_rbs()
 
         elif type_stat == RenderConsts.TYPE_SELL_STAT:
-            data_all_rb = self.__data_parser.get_sell_cons_all_rb()
-            data_each_count_flats = self.__data_parser.get_sell_cons_each_count_flats()
-            data_each_rbs = self.__data_parser.get_sell_cons_each_rbs()
+            data_all_rb = self.__get_stat_data().get_sell_cons_all_rb()
+            data_each_count_flats = self.__get_stat_data().get_sell_cons_each_count_flats()
+            data_each_rbs = self.__get_stat_data().get_sell_cons_each_rbs()
+
+        return self.__generate_changes_body(data_all_rb, data_each_count_flats, data_each_rbs)
 
+    def __generate_changes_body(self, data_all_rb: Dict, data_each_count_flats: List[Dict],
+                                data_each_rbs: List[Dict]) -> str:
+        """Генерация части текста полной общей сводки по стат. данным общей сводки,
+        типов квартир и ЖК
+
+        Args:
+            data_all_rb (Dict): Стат. данные общей сводки
+            data_each_count_flats (List[Dict]): Стат. данные по типам квартир
+            data_each_rbs (List[Dict]): Стат. данные по ЖК
+
+        Returns:
+            str: Тескст части текста полной общей сводки
+        """
         text_inner_all_rb = sup_f.get_cons_all_rb(data_all_rb)
         text_inner_each_count_flats = sup_f.gen_cons_each_count_flats(data_each_count_flats, True)
         text_inner_each_rbs = sup_f.gen_cons_each_rb(data_each_rbs, True)
 
         o_text = '📊 📃 The general summary:' + '\n' + text_inner_all_rb
         o_text += 2 * '\n' + '📊 🔢 The significant changes by number of rooms:' + \
-                  '\n' + text_inner_each_count_flats['all_types_text']
+                  '\n' + sup_f.gen_all_types_text(text_inner_each_count_flats)
         o_text += 2 * '\n' + '📊 🏘 The significant changes by residential complex:' + '\n' + \
-                  text_inner_each_rbs['all_types_text']
+                  sup_f.gen_all_types_text(text_inner_each_rbs)
+        return o_text
+
+    def __get_week_report_text(self, arround: Dict) -> str:
+        """Генерация текста сравнения последних WEEK_REPORT_DAYS дней по текущую дату
+        с предыдущими WEEK_REPORT_DAYS днями
+
+        Args:
+            arround (Dict): Данные окружения
+
+        Returns:
+            str: текст сравнения неделя к неделе
+        """
+        cur_from_date = self.__current_date + timedelta(days=-(WEEK_REPORT_DAYS - 1))
+        prev_from_date = cur_from_date + timedelta(days=-WEEK_REPORT_DAYS)
+        o_text = f"📅 The changes in {arround['title']} from " \
+                 f'{sup_f.datetime_to_str(prev_from_date)} - ' \
+                 f'{sup_f.datetime_to_str(cur_from_date + timedelta(days=-1))} to ' \
+                 f'{sup_f.datetime_to_str(cur_from_date)} - {sup_f.datetime_to_str(self.__current_date)}:'
+        o_text += '\n' + self.__generate_changes_body(
+            next(iter(self.__get_data_parser().get_last_days_stat_data(WEEK_REPORT_DAYS, [])), {}),
+            self.__get_data_parser().get_last_days_stat_data(WEEK_REPORT_DAYS, ['rooms_count_title']),
+            self.__get_data_parser().get_last_days_stat_data(WEEK_REPORT_DAYS, ['rb_title']))
         return o_text
 
     def __get_cons_report_text_cut_all_arounds(self) -> str:
@@ -711,16 +1073,151 @@ class DataRender():
         o_text += '\n' + self.__generate_general_changes_body(RenderConsts.TYPE_SUMMARY_STAT)
         return o_text
 
-    def __get_data_select(self, arround_ids: str) -> str:
+    def __init_parser_data(self, arround_ids: str, is_load_from_dump: bool = False) -> None:
+        """Инициализация данных парсера по окружениям из дамп файла или из БД
+        с сохранением дампа
+
+        Args:
+            arround_ids (str): Окружения через запятую
+            is_load_from_dump (bool): Загрузить данные из дамп файла
+        """
+        dump_file_path = self.__get_dump_file_path(arround_ids, is_load_from_dump)
+        if is_load_from_dump:
+            if not os.path.exists(dump_file_path):
+                raise Exception(f'There is no dump {dump_file_path}, the data must be loaded from DB '
+                                'with is_load_from_dump = 0 and without is_stat_pushdown '
+                                'or with is_partition_in_memory')
+            self.__get_data_parser().init_data(file_path=dump_file_path)
+        elif self.__is_incremental_ingest:
+            self.__init_parser_data_incremental(arround_ids, dump_file_path)
+        else:
+            self.__get_data_parser().init_data(self.__get_data_select(arround_ids))
+            self.__get_data_parser().dump_data(dump_file_path)
+
+    def __init_parser_data_incremental(self, arround_ids: str, store_path: str) -> None:
+        """Инициализация данных парсера за 31 день с получением из БД только
+        последнего дня в хранилище по дням и дней новее него.
+        Дни вне окна из 31 дня удаляются из хранилища
+
+        Args:
+            arround_ids (str): Окружения через запятую
+            store_path (str): Путь до директории хранилища по дням
+        """
+        def get_data(from_date: date) -> DataFrame:
+            return self.__get_db_wrapper().execute_select_pd(self.__get_data_select(arround_ids, from_date))
+
+        window_from_date = self.__current_data_date + timedelta(days=-30)
+        self.__get_data_parser().init_data(
+            data=DayStore(store_path).update_data(get_data, window_from_date, self.__current_data_date))
+
+    def __get_dump_file_path(self, dump_name: str, is_load_from_dump: bool = False) -> str:
+        """Получение пути до дамп файла с данными.
+        Дамп сохраняется колоночным снимком или хранилищем по дням,
+        при загрузке допускается ранее сохраненный CSV дамп, если снимка нет
+
+        Args:
+            dump_name (str): Наименование дампа, окружения через запятую
+            is_load_from_dump (bool): Путь нужен для загрузки данных из дамп файла
+
+        Returns:
+            str: Путь до дамп файла
+        """
+        if self.__is_dump_to_day_store or self.__is_incremental_ingest:
+            return f'.\\data\\{dump_name}{DAY_STORE_DIR_EXT}'
+
+        snapshot_file_path = f'.\\data\\{dump_name}{SNAPSHOT_FILE_EXT}'
+        csv_file_path = f'.\\data\\{dump_name}.csv'
+        if is_load_from_dump and not os.path.exists(snapshot_file_path) and os.path.exists(csv_file_path):
+            return csv_file_path
+        return snapshot_file_path
+
+    def __remove_dumps(self, dump_name: str) -> None:
+        """Удаление дампов с данными во всех форматах:
+        колоночного снимка, хранилища по дням и CSV дампа
+
+        Args:
+            dump_name (str): Наименование дампа, окружения через запятую
+        """
+        for dump_file_path in [f'.\\data\\{dump_name}{SNAPSHOT_FILE_EXT}',
+                               f'.\\data\\{dump_name}{DAY_STORE_DIR_EXT}',
+                               f'.\\data\\{dump_name}.csv']:
+            if os.path.isdir(dump_file_path):
+                shutil.rmtree(dump_file_path)
+            elif os.path.exists(dump_file_path):
+                os.remove(dump_file_path)
+            else:
+                continue
+            logging.info(f'{dump_file_path} removed')
+
+    def __get_arround_rb_ids(self, arround_ids: str, is_load_from_dump: bool = False) -> Optional[Dict[str, List[int]]]:
+        """Получение id ЖК по каждому окружению из around_rb_list
+
+        Args:
+            arround_ids (str): Окружения через запятую
+            is_load_from_dump (bool): Загрузить данные из дамп файла
+
+        Returns:
+            Optional[Dict[str, List[int]]]: id ЖК по id окружения,
+            None, если дампа принадлежности ЖК нет или он сохранен без rb_id
+        """
+        dump_file_path = f'.\\data\\around_rb_list_{arround_ids}.json'
+        if is_load_from_dump:
+            if not os.path.exists(dump_file_path):
+                logging.error(f'Нет дамп файла {dump_file_path}, данные каждого окружения будут получены отдельно')
+                return None
+            with open(dump_file_path, 'r', encoding='utf-8') as file:
+                arround_rb_rows = json.load(file)
+        else:
+            arround_rb_rows = self.__get_db_wrapper().execute_select(self.__get_arround_rb_select(arround_ids))
+            with open(dump_file_path, 'w', encoding='utf-8') as file:
+                json.dump(arround_rb_rows, file)
+                logging.info(f'{dump_file_path} dumped')
+
+        if any('rb_id' not in row for row in arround_rb_rows):
+            logging.error(f'В дамп файле {dump_file_path} нет rb_id, данные каждого окружения будут получены отдельно')
+            return None
+
+        arround_rb_ids: Dict[str, List[int]] = {}
+        for row in arround_rb_rows:
+            arround_rb_ids.setdefault(str(row['around_id']), []).append(row['rb_id'])
+        logging.debug(f'ЖК по окружениям: {arround_rb_ids}')
+        return arround_rb_ids
+
+    def __get_arround_rb_select(self, arround_ids: str) -> str:
+        """Генерация SELECT SQL-запроса для получения принадлежности
+        ЖК к окружениям
+
+        Args:
+            arround_ids (str): Окружения через запятую
+
+        Returns:
+            str: SELECT SQL-запрос
+        """
+        query = f"""
+        SELECT
+            arl.around_id,
+            arl.rb_id,
+            rl.title as rb_title
+        FROM public.around_rb_list arl
+        inner join public.rb_list rl on rl.id = arl.rb_id
+        where arl.around_id in ({arround_ids});
+        """
+        return query
+
+    def __get_data_select(self, arround_ids: str, from_date: Optional[date] = None) -> str:
         """Генерация SELECT SQL-запроса для получения основного массива
         данных для обработки
 
         Args:
             arround_ids (str): Окружения через запятую
+            from_date (Optional[date]): Дата начала получения данных,
+            по умолчанию текущая дата минус 30 дней
 
         Returns:
             str: SELECT SQL-запрос
         """
+        from_date_sql = f"'{from_date}'::date" if from_date \
+            else f"('{self.__current_data_date}'::date - interval '30' day)"
         query = f"""
         SELECT 
             fp.id_custome,
@@ -730,12 +1227,127 @@ class DataRender():
             else fp.price
             end as price,
             fp.price_actual_date, 
+            fp.rb_id,
             rl.title as rb_title
         FROM public.flat_prices fp
         inner join public.flat_room_count_types frct on frct.id = fp.rooms_count_id
         inner join public.rb_list rl on rl.id = fp.rb_id
         where  fp.price_actual_date <= '{self.__current_data_date}'::date 
-        and fp.price_actual_date >= ('{self.__current_data_date}'::date - interval '30' day)
+        and fp.price_actual_date >= {from_date_sql}
         and fp.rb_id in (select rb_id from public.around_rb_list where around_id in ({arround_ids}));
         """
         return query
+
+    def __get_source_fingerprint_select(self, arround_ids: str) -> str:
+        """Генерация SELECT SQL-запроса отпечатка исходных данных снимка: количества
+        и хеша записей каждого дня основного массива данных. Хеш дня - сумма
+        первых 60 бит md5 колонок flat_prices, из которых рендерятся тексты,
+        поэтому он не зависит от порядка записей и меняется при изменении цен
+        в уже загруженных записях. Наименования ЖК и типов комнат приходят
+        из соединений основного запроса, поэтому их хеши добавляются к каждому дню.
+        Записи дня читаются из flat_prices без соединений
+
+        Args:
+            arround_ids (str): Окружения через запятую
+
+        Returns:
+            str: SELECT SQL-запрос
+        """
+        query = f"""
+        SELECT
+            fp.price_actual_date,
+            count(*) AS rows_count,
+            sum(('x' || substr(md5(concat_ws('|', fp.id_custome, fp.rooms_count_id, fp.total_area,
+                                              fp.price, fp.discount_price, fp.rb_id)), 1, 15))::bit(60)::bigint)
+                AS rows_hash,
+            (SELECT md5(string_agg(rl.id || '|' || rl.title, '|' ORDER BY rl.id))
+             FROM public.rb_list rl
+             where rl.id in (select rb_id from public.around_rb_list where around_id in ({arround_ids})))
+                AS rb_titles_hash,
+            (SELECT md5(string_agg(frct.id || '|' || frct.title, '|' ORDER BY frct.id))
+             FROM public.flat_room_count_types frct) AS rooms_count_titles_hash
+        FROM public.flat_prices fp
+        where  fp.price_actual_date <= '{self.__current_data_date}'::date
+        and fp.price_actual_date >= ('{self.__current_data_date}'::date - interval '30' day)
+        and fp.rb_id in (select rb_id from public.around_rb_list where around_id in ({arround_ids}))
+        GROUP BY fp.price_actual_date
+        ORDER BY fp.price_actual_date;
+        """
+        return query
+
+    def __get_common_stat_select(self, arround_ids: str) -> str:
+        """Генерация SELECT SQL-запроса агрегатов общей статистики за текущую
+        и предыдущую даты по GROUPING SETS: по всем записям, по типу комнат,
+        по ЖК и по ЖК и типу комнат.
+        id_custome только одной из дат считаются через количество
+        уникальных id_custome обеих дат
+
+        Args:
+            arround_ids (str): Окружения через запятую
+
+        Returns:
+            str: SELECT SQL-запрос
+        """
+        data_select = self.__get_data_select(arround_ids).strip().rstrip(';')
+        cur_filter = 'FILTER (WHERE f.price_actual_date = cd.price_actual_date)'
+        prev_filter = 'FILTER (WHERE f.price_actual_date < cd.price_actual_date)'
+        query = f"""
+        WITH flats AS ({data_select}),
+        current_day AS (SELECT max(price_actual_date) AS price_actual_date FROM flats)
+        SELECT
+            GROUPING(f.rb_title, f.rooms_count_title) AS grouping_id,
+            f.rb_title,
+            f.rooms_count_title,
+            max(cd.price_actual_date) AS price_actual_date,
+            count(f.id_custome) {cur_filter} AS cur_count,
+            avg(f.total_area) {cur_filter}::float8 AS cur_avg_total_area,
+            avg(f.price) {cur_filter}::float8 AS cur_avg_price,
+            sum(f.price) {cur_filter}::float8 AS cur_sum_price,
+            sum(f.total_area) {cur_filter}::float8 AS cur_sum_total_area,
+            count(f.id_custome) {prev_filter} AS prev_count,
+            avg(f.total_area) {prev_filter}::float8 AS prev_avg_total_area,
+            avg(f.price) {prev_filter}::float8 AS prev_avg_price,
+            sum(f.price) {prev_filter}::float8 AS prev_sum_price,
+            sum(f.total_area) {prev_filter}::float8 AS prev_sum_total_area,
+            count(DISTINCT f.id_custome) AS all_ids_count,
+            count(DISTINCT f.id_custome) {cur_filter} AS cur_ids_count,
+            count(DISTINCT f.id_custome) {prev_filter} AS prev_ids_count
+        FROM flats f
+        inner join current_day cd on f.price_actual_date >= cd.price_actual_date - 1
+        GROUP BY GROUPING SETS ((), (f.rooms_count_title), (f.rb_title), (f.rb_title, f.rooms_count_title));
+        """
+        return query
+
+
+def _init_process_logging(log_queue: Any, logging_level: int) -> None:
+    """Настройка логирования процесса пула: записи корневого логгера
+    передаются в очередь, которую читает QueueListener родителя
+
+    Args:
+        log_queue (Any): Очередь multiprocessing для записей логов
+        logging_level (int): Уровень корневого логгера родителя
+    """
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(logging_level)
+
+
+def _render_arround_in_process(
+        chat_config: Dict,
+        db_config: Dict,
+        arround: Dict,
+        is_load_from_dump: bool,
+        is_stat_pushdown: bool,
+        arround_data: Optional[DataFrame]) -> Tuple[Dict, Optional[Dict]]:
+    """Рендер окружения в процессе пула со своими парсером и подключением к БД,
+    см. DataRender.render_arround()
+    """
+    try:
+        data_render = DataRender(chat_config, db_config, is_render_on_init=False)
+        return data_render.render_arround(arround, is_load_from_dump, is_stat_pushdown, arround_data)
+    except Exception as e:
+        logging.error(f"Rendering of arround {arround['id']} ({arround['title']}) has been failed",
+                      exc_info=sys.exc_info())
+        raise Exception(f"Rendering of arround {arround['id']} ({arround['title']}) has been failed: {e}")
@@ -0,0 +1,152 @@
+"""Модуль хранилища основного набора данных по дням
+"""
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional
+
+import pyarrow as pa
+from pandas import DataFrame
+from pyarrow import feather
+
+# Расширение файла с данными одного дня
+DAY_FILE_EXT = '.arrow'
+
+
+class DayStore():
+    """Хранилище основного набора данных, в котором данные каждого дня
+    price_actual_date лежат в отдельном колоночном файле Arrow IPC.
+    С диска читаются только нужные дни, а дни можно перезаписывать по отдельности.
+    Прочитанные дни переводятся в один pandas DataFrame с копированием,
+    поэтому пиковая память при чтении сопоставима с загрузкой CSV дампа
+    """
+
+    def __init__(self, store_dir: str) -> None:
+        logging.debug('Инициализация')
+        # Директория хранилища, создается при первой записи
+        self.__store_dir = store_dir
+        logging.info('Инициализация выполнена')
+
+    def get_dates(self) -> List[date]:
+        """Получение дат, данные за которые есть в хранилище
+
+        Returns:
+            List[date]: Отсортированный список дат, пустой, если хранилища нет
+        """
+        if not os.path.isdir(self.__store_dir):
+            return []
+        return sorted(
+            datetime.strptime(file_name[:-len(DAY_FILE_EXT)], '%Y-%m-%d').date()
+            for file_name in os.listdir(self.__store_dir) if file_name.endswith(DAY_FILE_EXT)
+        )
+
+    def write_data(self, data: DataFrame) -> None:
+        """Запись данных в хранилище, данные каждого дня в отдельный файл.
+        Файлы дней, которые есть в data, перезаписываются
+
+        Args:
+            data (DataFrame): Данные для записи
+        """
+        os.makedirs(self.__store_dir, exist_ok=True)
+        # Категориальные колонки пишутся строками, чтобы схемы файлов
+        # разных дней совпадали независимо от набора категорий
+        category_columns = data.select_dtypes('category').columns
+        for day, day_data in data.groupby(data['price_actual_date'].dt.normalize()):
+            day_data = day_data.astype({column: 'object' for column in category_columns})
+            # Без сжатия, чтобы чтение дня не тратило время на распаковку
+            feather.write_feather(day_data.reset_index(drop=True),
+                                  self.__get_day_file_path(day.date()),
+                                  compression='uncompressed')
+        logging.info(f'{self.__store_dir} dumped')
+
+    def read_data(self, from_date: Optional[date] = None, to_date: Optional[date] = None) -> DataFrame:
+        """Чтение данных за промежуток с from_date по to_date.
+        Без указания границ читаются все дни хранилища
+
+        Args:
+            from_date (Optional[date]): Начало промежутка
+            to_date (Optional[date]): Конец промежутка
+
+        Returns:
+            DataFrame: Данные за промежуток, отсортированные по дате
+        """
+        days = [day for day in self.get_dates()
+                if (from_date is None or day >= from_date) and (to_date is None or day <= to_date)]
+        if not days:
+            raise Exception(f'There is no data in the store {self.__store_dir} from {from_date} to {to_date}')
+
+        tables = [feather.read_table(self.__get_day_file_path(day)) for day in days]
+        # Дни могли быть записаны в разные загрузки с разными типами и набором колонок,
+        # приводим их к схеме последнего дня
+        schema = tables[-1].schema
+        table = pa.concat_tables(
+            [day_table if day_table.schema.equals(schema) else self.__conform_table(day_table, schema)
+             for day_table in tables])
+        # Таблицы дней больше не нужны, чтобы колонки общей таблицы
+        # освобождались по мере перевода в pandas
+        del tables
+        return table.to_pandas(strings_to_categorical=True, split_blocks=True, self_destruct=True)
+
+    def update_data(self, get_data: Callable[[date], DataFrame], from_date: date, to_date: date) -> DataFrame:
+        """Обновление хранилища за промежуток с from_date по to_date и чтение данных промежутка.
+        Дни вне промежутка удаляются. Последний сохраненный день мог быть сохранен
+        неполным, поэтому данные получаются заново начиная с него
+
+        Args:
+            get_data (Callable[[date], DataFrame]): Получение данных источника начиная с даты
+            from_date (date): Начало промежутка
+            to_date (date): Конец промежутка
+
+        Returns:
+            DataFrame: Данные за промежуток, отсортированные по дате
+        """
+        self.remove_dates_outside(from_date, to_date)
+        stored_dates = self.get_dates()
+        update_from_date = stored_dates[-1] if stored_dates else from_date
+        logging.debug(f'Дни в хранилище {self.__store_dir}: {len(stored_dates)}, '
+                      f'получение данных начиная с {update_from_date}')
+
+        new_data = get_data(update_from_date)
+        logging.debug(f'Записей получено за обновляемые дни: {len(new_data)}')
+        # Обновляемые дни перезаписываются целиком, в том числе дни, за которые данных больше нет
+        self.remove_dates_outside(from_date, update_from_date - timedelta(days=1))
+        self.write_data(new_data)
+        return self.read_data(from_date, to_date)
+
+    def remove_dates_outside(self, from_date: date, to_date: date) -> None:
+        """Удаление из хранилища данных за дни вне промежутка с from_date по to_date
+
+        Args:
+            from_date (date): Первый сохраняемый день
+            to_date (date): Последний сохраняемый день
+        """
+        for day in self.get_dates():
+            if not from_date <= day <= to_date:
+                os.remove(self.__get_day_file_path(day))
+                logging.debug(f'Из хранилища {self.__store_dir} удален день {day}')
+
+    def __conform_table(self, table: pa.Table, schema: pa.Schema) -> pa.Table:
+        """Приведение данных дня к схеме: колонки, которых не было при записи дня,
+        заполняются пустыми значениями, лишние колонки отбрасываются
+
+        Args:
+            table (pa.Table): Данные дня
+            schema (pa.Schema): Схема
+
+        Returns:
+            pa.Table: Данные дня в схеме
+        """
+        columns = [table.column(field.name) if field.name in table.column_names else pa.nulls(len(table), field.type)
+                   for field in schema]
+        return pa.Table.from_arrays(columns, names=schema.names).cast(schema)
+
+    def __get_day_file_path(self, day: date) -> str:
+        """Получение пути до файла с данными дня
+
+        Args:
+            day (date): День
+
+        Returns:
+            str: Путь до файла
+        """
+        return os.path.join(self.__store_dir, f'{day}{DAY_FILE_EXT}')
@@ -1,13 +1,54 @@
 """Модуль для подключения к БД Postgres для выполнения запросов
 """
 import logging
+import os
 import sys
-from typing import List
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-import psycopg2
 from pandas import DataFrame
-from sqlalchemy import create_engine
+from pandas.api.types import union_categoricals
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+# Параметры обертки из конфиг файла, которые не передаются в psycopg2.connect
+DB_WRAPPER_OPTIONS = ('is_streaming_select', 'streaming_chunk_size', 'is_trace_ingest_memory',
+                      'is_copy_select', 'pool_size', 'pool_max_overflow', 'pool_recycle', 'pool_pre_ping')
+# Параметры подключения, которые входят в строку подключения sqlalchemy
+DB_URL_PARAMS = ('user', 'password', 'host', 'port', 'database')
+
+# Общие для процесса engine sqlalchemy по строкам подключения.
+# Пул подключений engine используется всеми объектами DBWrapper
+# и для запросов в pandas, и для запросов со строками-словарями
+SHARED_ENGINES: Dict[str, Engine] = {}
+# Счетчики использования пулов подключений по строкам подключения
+SHARED_POOLS_COUNTERS: Dict[str, Dict[str, int]] = {}
+
+# OID типов Postgres по видам колонок при потоковой загрузке
+PG_INT_OIDS = (20, 21, 23)
+PG_FLOAT_OIDS = (700, 701, 1700)
+PG_DATE_OIDS = (1082,)
+PG_TEXT_OIDS = (25, 1042, 1043)
+# Типы numpy колонок по видам, у текстовых колонок хранятся коды категорий
+COLUMN_KIND_DTYPES: Dict[str, Any] = {
+    'int': np.int64,
+    'float': np.float64,
+    'date': 'datetime64[D]',
+    'text': np.int32,
+    'object': object,
+}
+# Типы колонок pandas по видам при разборе CSV потока COPY.
+# Тип целочисленных колонок определяет парсер: int64 или float64 с NaN,
+# если в колонке есть NULL, как и в pd.read_sql_query
+COPY_CSV_DTYPES: Dict[str, Any] = {
+    'float': 'float64',
+    'text': 'category',
+    'object': object,
+}
 
 
 class DBWrapper():
@@ -17,15 +58,26 @@ class DBWrapper():
     def __init__(self, db_config):
         logging.debug('Инициализация')
         # Получение конфигурационных параметров для подключения к БД
-        self.__db_config = db_config
+        self.__db_config = {key: value for key, value in db_config.items() if key not in DB_WRAPPER_OPTIONS}
+        # Загружать результат SELECT SQL-запроса в pandas DataFrame потоково
+        # через серверный курсор
+        self.__is_streaming_select = bool(int(db_config.get('is_streaming_select', '0')))
+        # Количество строк, получаемых из серверного курсора за раз
+        self.__streaming_chunk_size = int(db_config.get('streaming_chunk_size', '50000'))
+        # Замерять пиковое потребление памяти при потоковой загрузке через tracemalloc
+        self.__is_trace_ingest_memory = bool(int(db_config.get('is_trace_ingest_memory', '0')))
+        # Загружать результат SELECT SQL-запроса в pandas DataFrame через COPY
+        self.__is_copy_select = bool(int(db_config.get('is_copy_select', '0')))
+        # Статистика последней потоковой загрузки
+        self.__ingest_stats: Dict = {}
         # Конструирование engine sqlalchemy строки подключения
-        engine_string = f"postgresql+psycopg2://{self.__db_config['user']}:{self.__db_config['password']}@" \
-                        f"{self.__db_config['host']}:{self.__db_config['port']}/{self.__db_config['database']}"
+        self.__engine_string = f"postgresql+psycopg2://{self.__db_config['user']}:{self.__db_config['password']}@" \
+                               f"{self.__db_config['host']}:{self.__db_config['port']}/{self.__db_config['database']}"
 
         # Проверяем подключение к БД
         # self.__test_connection()
-        # Создание sqlalchemy engine
-        self.__engine = create_engine(engine_string)
+        # Получение общего для процесса sqlalchemy engine с пулом подключений
+        self.__engine = self.__get_shared_engine(db_config)
 
         logging.info('Инициализация выполнена')
 
@@ -39,8 +91,135 @@ class DBWrapper():
         Returns:
             DataFrame: pandas DataFrame из таблицы результата запроса
         """
+        if self.__is_copy_select:
+            return self.execute_select_pd_copy(str_query)
+        if self.__is_streaming_select:
+            return self.execute_select_pd_stream(str_query)
         return pd.read_sql_query(str_query, con=self.__engine, parse_dates={'price_actual_date': '%Y-%m-%d'})
 
+    def execute_select_pd_stream(self, str_query: str) -> DataFrame:
+        """Потоковое выполнение SELECT SQL-запроса через серверный курсор.
+        Строки получаются частями, каждая часть сразу переводится в колонки
+        numpy с уменьшенными типами, текст кодируется в категории.
+        Части складываются в заранее выделенные колонки итогового DataFrame
+
+        Args:
+            str_query (str): SELECT SQL-запрос на выполнение
+
+        Returns:
+            DataFrame: pandas DataFrame из таблицы результата запроса
+        """
+        is_tracing, start_time = self.__start_ingest_stats()
+
+        connection = None
+        try:
+            connection = self.__engine.raw_connection()
+            # Именованный курсор создается на стороне сервера и не передает
+            # весь результат запроса клиенту сразу
+            cursor = connection.cursor(name='execute_select_pd_stream')
+            cursor.itersize = self.__streaming_chunk_size
+            cursor.execute(str_query)
+
+            columns_chunks: List[List[np.ndarray]] = []
+            # Словари кодов категорий текстовых колонок
+            columns_categories: List[Dict[str, int]] = []
+            colnames: List[str] = []
+            column_kinds: List[str] = []
+            rows_count = 0
+            while True:
+                rows = cursor.fetchmany(self.__streaming_chunk_size)
+                if not colnames:
+                    colnames = [desc[0] for desc in cursor.description]
+                    column_kinds = [self.__get_column_kind(desc[1]) for desc in cursor.description]
+                    columns_chunks = [[] for _ in colnames]
+                    columns_categories = [{} for _ in colnames]
+                if not rows:
+                    break
+                rows_count += len(rows)
+                for i, values in enumerate(zip(*rows)):
+                    columns_chunks[i].append(
+                        self.__convert_column_chunk(values, column_kinds[i], columns_categories[i]))
+            cursor.close()
+        except Exception as e:
+            logging.error('Executing SQL query has been failed', exc_info=sys.exc_info())
+            raise Exception(e)
+        finally:
+            # Возвращаем подключение в пул
+            if connection is not None:
+                connection.close()
+                logging.debug('PostgreSQL подключение возвращено в пул')
+
+        output_columns = {}
+        for i, colname in enumerate(colnames):
+            output_columns[colname] = self.__concat_column_chunks(
+                columns_chunks[i], column_kinds[i], columns_categories[i], rows_count)
+            # Освобождаем части колонки сразу после переноса в итоговую колонку
+            columns_chunks[i] = []
+        output_data = pd.DataFrame(output_columns, columns=colnames)
+
+        self.__set_ingest_stats(output_data, is_tracing, start_time)
+        return output_data
+
+    def execute_select_pd_copy(self, str_query: str) -> DataFrame:
+        """Выполнение SELECT SQL-запроса через COPY (SELECT ...) TO STDOUT в формате CSV.
+        Поток COPY передается через канал (pipe) и разбирается C-парсером pandas
+        частями по streaming_chunk_size строк сразу в типизированные колонки,
+        текст кодируется в категории. Весь CSV текст результата в памяти не хранится,
+        части колонок освобождаются по мере сборки итоговых колонок
+
+        Args:
+            str_query (str): SELECT SQL-запрос на выполнение
+
+        Returns:
+            DataFrame: pandas DataFrame из таблицы результата запроса
+        """
+        is_tracing, start_time = self.__start_ingest_stats()
+        # COPY принимает запрос без завершающей ';'
+        select_query = str_query.strip().rstrip(';')
+
+        connection = None
+        try:
+            connection = self.__engine.raw_connection()
+            cursor = connection.cursor()
+            # Получаем типы колонок результата запроса без получения строк
+            cursor.execute(f'SELECT * FROM ({select_query}) AS copy_select LIMIT 0')
+            column_kinds = {desc[0]: self.__get_column_kind(desc[1]) for desc in cursor.description}
+            chunks = self.__read_copy_chunks(
+                cursor, f'COPY ({select_query}) TO STDOUT WITH (FORMAT csv, HEADER true)', column_kinds)
+            cursor.close()
+        except Exception as e:
+            logging.error('Executing SQL query has been failed', exc_info=sys.exc_info())
+            raise Exception(e)
+        finally:
+            # Возвращаем подключение в пул
+            if connection is not None:
+                connection.close()
+                logging.debug('PostgreSQL подключение возвращено в пул')
+
+        output_columns = {}
+        for colname, column_kind in column_kinds.items():
+            # Забираем колонку из частей, чтобы части освобождались по мере сборки
+            column_chunks = [chunk.pop(colname) for chunk in chunks]
+            if column_kind == 'text':
+                output_columns[colname] = pd.Series(union_categoricals(column_chunks, sort_categories=True))
+            else:
+                output_columns[colname] = pd.concat(column_chunks, ignore_index=True)
+        output_data = pd.DataFrame(output_columns, columns=list(column_kinds))
+
+        self.__set_ingest_stats(output_data, is_tracing, start_time)
+        return output_data
+
+    def get_ingest_stats(self) -> Dict:
+        """Получение статистики последней потоковой загрузки или загрузки через COPY:
+        rows - количество строк, seconds - время загрузки,
+        rows_per_sec - строк в секунду, frame_bytes - размер итогового DataFrame,
+        peak_bytes - пиковое потребление памяти, если включен is_trace_ingest_memory
+
+        Returns:
+            Dict: Статистика последней потоковой загрузки
+        """
+        return self.__ingest_stats
+
     def execute_select(self, str_query: str) -> List[dict]:
         """Выполнение SELECT SQL-запроса к БД
 
@@ -53,7 +232,7 @@ class DBWrapper():
         connection = None
         output_data = []
         try:
-            connection = psycopg2.connect(**self.__db_config)
+            connection = self.__engine.raw_connection()
             cursor = connection.cursor()
             cursor.execute(str_query)
             colnames = [desc[0] for desc in cursor.description]
@@ -63,18 +242,238 @@ class DBWrapper():
             logging.error('Executing SQL query has been failed', exc_info=sys.exc_info())
             raise Exception(e)
         finally:
-            # Закрываем подключение к БД
+            # Возвращаем подключение в пул
             if connection is not None:
                 connection.close()
-                logging.debug('PostgreSQL подключение закрыто')
+                logging.debug('PostgreSQL подключение возвращено в пул')
         return output_data
 
+    def get_pool_stats(self) -> Dict:
+        """Получение статистики использования общего пула подключений:
+        size - размер пула, checked_in - свободных подключений в пуле,
+        checked_out - выданных подключений, overflow - подключений сверх размера пула,
+        connects - всего открыто подключений к БД, checkouts - всего выдано подключений
+
+        Returns:
+            Dict: Статистика использования пула подключений
+        """
+        pool: Any = self.__engine.pool
+        return {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            **SHARED_POOLS_COUNTERS[self.__engine_string],
+        }
+
+    def __get_shared_engine(self, db_config: Dict) -> Engine:
+        """Получение общего для процесса sqlalchemy engine по строке подключения.
+        Engine создается при первом обращении с параметрами пула из конфиг файла
+
+        Args:
+            db_config (Dict): Конфигурационные параметры подключения к БД
+
+        Returns:
+            Engine: sqlalchemy engine с пулом подключений
+        """
+        if self.__engine_string in SHARED_ENGINES:
+            return SHARED_ENGINES[self.__engine_string]
+
+        # Остальные параметры подключения, например sslmode, передаются в psycopg2.connect
+        connect_args = {key: value for key, value in self.__db_config.items() if key not in DB_URL_PARAMS}
+        engine = create_engine(
+            self.__engine_string,
+            connect_args=connect_args,
+            pool_size=int(db_config.get('pool_size', '5')),
+            max_overflow=int(db_config.get('pool_max_overflow', '10')),
+            pool_recycle=int(db_config.get('pool_recycle', '-1')),
+            pool_pre_ping=bool(int(db_config.get('pool_pre_ping', '0'))),
+        )
+
+        counters = {'connects': 0, 'checkouts': 0}
+
+        def on_connect(*args: Any) -> None:
+            counters['connects'] += 1
+            logging.debug('PostgreSQL подключение открыто')
+
+        def on_checkout(*args: Any) -> None:
+            counters['checkouts'] += 1
+
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'checkout', on_checkout)
+
+        SHARED_ENGINES[self.__engine_string] = engine
+        SHARED_POOLS_COUNTERS[self.__engine_string] = counters
+        logging.info('Создан общий пул подключений к БД')
+        return engine
+
+    def __start_ingest_stats(self) -> Tuple[bool, float]:
+        """Начало сбора статистики загрузки
+
+        Returns:
+            Tuple[bool, float]: Запущен ли tracemalloc для загрузки и время начала загрузки
+        """
+        is_tracing = self.__is_trace_ingest_memory and not tracemalloc.is_tracing()
+        if is_tracing:
+            tracemalloc.start()
+        return is_tracing, time.perf_counter()
+
+    def __set_ingest_stats(self, output_data: DataFrame, is_tracing: bool, start_time: float) -> None:
+        """Завершение сбора статистики загрузки
+
+        Args:
+            output_data (DataFrame): Загруженные данные
+            is_tracing (bool): Запущен ли tracemalloc для загрузки
+            start_time (float): Время начала загрузки
+        """
+        seconds = time.perf_counter() - start_time
+        self.__ingest_stats = {
+            'rows': len(output_data),
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(len(output_data) / seconds) if seconds else 0,
+            'frame_bytes': int(output_data.memory_usage(deep=True).sum()),
+            'peak_bytes': tracemalloc.get_traced_memory()[1] if is_tracing else None,
+        }
+        if is_tracing:
+            tracemalloc.stop()
+        logging.info(f'Загрузка выполнена: {self.__ingest_stats}')
+
+    def __read_copy_chunks(self, cursor: Any, copy_query: str, column_kinds: Dict[str, str]) -> List[DataFrame]:
+        """Разбор потока COPY частями: COPY пишет CSV в канал в отдельном потоке,
+        а pandas читает CSV из канала по streaming_chunk_size строк
+
+        Args:
+            cursor (Any): Курсор psycopg2
+            copy_query (str): COPY SQL-запрос
+            column_kinds (Dict[str, str]): Виды колонок результата запроса
+
+        Returns:
+            List[DataFrame]: Части результата запроса
+        """
+        read_fd, write_fd = os.pipe()
+        reader = os.fdopen(read_fd, 'rb')
+        writer = os.fdopen(write_fd, 'wb')
+        copy_errors: List[Exception] = []
+
+        def copy_to_pipe() -> None:
+            try:
+                cursor.copy_expert(copy_query, writer)
+            except Exception as e:
+                copy_errors.append(e)
+            finally:
+                # Закрытие канала завершает чтение CSV
+                writer.close()
+
+        copy_thread = threading.Thread(target=copy_to_pipe, daemon=True)
+        copy_thread.start()
+        chunks: List[DataFrame] = []
+        parse_error: Optional[Exception] = None
+        try:
+            # Тип целочисленных колонок определяет парсер в каждой части,
+            # при сборке части с NULL приводят всю колонку к float64
+            chunks = list(pd.read_csv(
+                reader,
+                encoding='utf-8',
+                chunksize=self.__streaming_chunk_size,
+                dtype={name: COPY_CSV_DTYPES[kind] for name, kind in column_kinds.items() if kind in COPY_CSV_DTYPES},
+                parse_dates=[name for name, kind in column_kinds.items() if kind == 'date']))
+        except Exception as e:
+            parse_error = e
+        finally:
+            # Закрытие канала при ошибке разбора прерывает COPY
+            reader.close()
+            copy_thread.join()
+        # Ошибка COPY важнее ошибки разбора оборванного CSV
+        if copy_errors:
+            raise copy_errors[0]
+        if parse_error is not None:
+            raise parse_error
+        return chunks
+
+    def __get_column_kind(self, type_code: int) -> str:
+        """Определение вида колонки по OID типа Postgres
+
+        Args:
+            type_code (int): OID типа колонки из cursor.description
+
+        Returns:
+            str: Вид колонки: int, float, date, text или object
+        """
+        if type_code in PG_INT_OIDS:
+            return 'int'
+        if type_code in PG_FLOAT_OIDS:
+            return 'float'
+        if type_code in PG_DATE_OIDS:
+            return 'date'
+        if type_code in PG_TEXT_OIDS:
+            return 'text'
+        return 'object'
+
+    def __convert_column_chunk(self, values: tuple, column_kind: str, categories: Dict[str, int]) -> np.ndarray:
+        """Перевод значений колонки из части строк в массив numpy
+
+        Args:
+            values (tuple): Значения колонки
+            column_kind (str): Вид колонки
+            categories (Dict[str, int]): Словарь кодов категорий текстовой колонки,
+            пополняется новыми значениями
+
+        Returns:
+            np.ndarray: Массив значений части колонки
+        """
+        if column_kind == 'int':
+            if None in values:
+                # Как и pd.read_sql_query, колонку с NULL значениями получаем float64 с NaN,
+                # при сборке колонки из частей она вся приводится к float64
+                return np.array(values, dtype=np.float64)
+            chunk = np.array(values, dtype=COLUMN_KIND_DTYPES['int'])
+            # Уменьшаем тип до минимального, вмещающего значения части
+            if chunk.size and np.iinfo(np.int32).min <= chunk.min() and chunk.max() <= np.iinfo(np.int32).max:
+                return chunk.astype(np.int32)
+            return chunk
+        if column_kind == 'text':
+            return np.fromiter(
+                (-1 if value is None else categories.setdefault(value, len(categories)) for value in values),
+                dtype=COLUMN_KIND_DTYPES['text'], count=len(values))
+        return np.array(values, dtype=COLUMN_KIND_DTYPES[column_kind])
+
+    def __concat_column_chunks(
+            self,
+            chunks: List[np.ndarray],
+            column_kind: str,
+            categories: Dict[str, int],
+            rows_count: int) -> Any:
+        """Сборка колонки из частей в заранее выделенный массив
+
+        Args:
+            chunks (List[np.ndarray]): Части колонки
+            column_kind (str): Вид колонки
+            categories (Dict[str, int]): Словарь кодов категорий текстовой колонки
+            rows_count (int): Общее количество строк
+
+        Returns:
+            Any: Массив numpy или pd.Categorical для текстовой колонки
+        """
+        dtype = np.result_type(*chunks) if chunks else np.dtype(COLUMN_KIND_DTYPES[column_kind])
+        column = np.empty(rows_count, dtype=dtype)
+        offset = 0
+        for chunk in chunks:
+            column[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+        if column_kind == 'date':
+            return column.astype('datetime64[ns]')
+        if column_kind == 'text':
+            # pd.Categorical сам уменьшает тип кодов под количество категорий
+            return pd.Categorical.from_codes(column, categories=list(categories))
+        return column
+
     def __test_connection(self) -> None:
         """Тестирование подключения к БД
         """
         connection = None
         try:
-            connection = psycopg2.connect(**self.__db_config)
+            connection = self.__engine.raw_connection()
 
             cursor = connection.cursor()
             # Выводим PostgreSQL Connection properties
@@ -88,7 +487,7 @@ class DBWrapper():
             logging.error('Testing connection to DB has been failed', exc_info=sys.exc_info())
             raise Exception(e)
         finally:
-            # Закрываем подключение к БД
+            # Возвращаем подключение в пул
             if connection is not None:
                 connection.close()
-                logging.debug('PostgreSQL подключение закрыто')
+                logging.debug('PostgreSQL подключение возвращено в пул')
@@ -4,14 +4,14 @@
 import configparser
 import logging
 from datetime import date, datetime, timedelta
-from functools import cmp_to_key
 from logging.handlers import RotatingFileHandler
 from operator import itemgetter
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
-import numpy as np
 from colorlog import ColoredFormatter
-from pandas import DataFrame
+
+# Ключи сортировки значений rooms_count_title, отличные от самого значения
+ROOMS_COUNT_SORT_KEYS = {'Студия': '0'}
 
 # Common function
 #
@@ -87,46 +87,6 @@ def init_custome_logger(
 #
 
 
-def cmp(x_val: Any, y_val: Any) -> Any:
-    """
-    Replacement for built-in function cmp that was removed in Python 3
-
-    Compare the two objects x and y and return an integer according to
-    the outcome. The return value is negative if x < y, zero if x == y
-    and strictly positive if x > y.
-
-    https://portingguide.readthedocs.io/en/latest/comparisons.html#the-cmp-function
-    """
-    return (x_val > y_val) - (x_val < y_val)
-
-
-def multikeysort(items: List[Dict], columns: List[str]) -> List[Dict]:
-    """Сортировка списка из словарей по ключам
-
-    Args:
-        items (List[Dict]): Список словарей для сортировки
-        columns (List[str]): Список ключей по которым производится сортировка
-
-    Returns:
-        List[Dict]: Отсортированный список словарей
-    """
-    comparers = [
-        ((itemgetter(col[1:].strip()), -1) if col.startswith('-') else (itemgetter(col.strip()), 1))
-        for col in columns
-    ]
-
-    def comparer(left: Any, right: Any) -> Any:
-        """Вспомогательная функция
-        """
-        comparer_iter = (
-            cmp(fn(left), fn(right)) * mult
-            for fn, mult in comparers
-        )
-        return next((result for result in comparer_iter if result), 0)
-
-    return sorted(items, key=cmp_to_key(comparer))
-
-
 def generate_percent(pd_value: float, value: float) -> float:
     """Вычисление процента изменения текущего значения
     относительно предыдущего
@@ -186,83 +146,22 @@ def round_thousand(value: Any) -> float:
     return round(value / 10 ** 3, 2)
 
 
-def merge_np_lists(a_np_array: Any, b_np_array: Any) -> Any:
-    """
-        Получение общих записей в a_np_array и b_np_array
-        intersect1d не отрабатывает корректно
-        при ndim = 1 и ndim > 1
-    """
-
-    if a_np_array.ndim == 1:
-        return np.intersect1d(a_np_array, b_np_array)
-
-    return np.array([x for x in set(tuple(x) for x in a_np_array) & set(tuple(x) for x in b_np_array)])
-    # Падает на ValueError: When changing to a larger dtype,
-    # its size must be a divisor of the total size in bytes of the last axis of the array
-    # ncols = a_np_array.shape[1]
-    # dtype = {'names': ['f{}'.format(i) for i in range(ncols)],
-    #          'formats': ncols * [a_np_array.dtype]}
-    # c_np_array = np.intersect1d(a_np_array.view(dtype), b_np_array.view(dtype))
-    # c_np_array = c_np_array.view(a_np_array.dtype).reshape(-1, ncols)
-    # return c_np_array
-
-
-def diff_np_lists(a_np_array: Any, b_np_array: Any) -> Any:
-    """
-        Уникальные записи в a_np_array
-        относительно b_np_array
-        setdiff1d не отрабатывает корректно
-        при ndim = 1 и ndim > 1
-    """
-    if a_np_array.ndim == 1:
-        return np.setdiff1d(a_np_array, b_np_array)
-    return np.array([x for x in set(tuple(x) for x in a_np_array) if x not in set(tuple(x) for x in b_np_array)])
-    # Падает на ValueError: When changing to a larger dtype,
-    # its size must be a divisor of the total size in bytes of the last axis of the array
-    # ncols = a_np_array.shape[1]
-    # dtype = {'names': ['f{}'.format(i) for i in range(ncols)],
-    #          'formats': ncols * [a_np_array.dtype]}
-    # c_np_array = np.setdiff1d(a_np_array.view(dtype), b_np_array.view(dtype))
-    # c_np_array = c_np_array.view(a_np_array.dtype).reshape(-1, ncols)
-    # return c_np_array
-
-
-def set_studio_to_0(data: List[Dict]) -> List[Dict]:
-    """Установка значения '0' вместо 'Студия' до сортировки
+def get_rooms_count_sort_key(rooms_count_title: str) -> str:
+    """Ключ сортировки значения rooms_count_title:
+    'Студия' сортируется как '0', остальные значения как есть
 
     Args:
-        data (List[Dict]): Список словарей со стат. данными с 'Студия'
-        вместо '0'
+        rooms_count_title (str): Значение rooms_count_title
 
     Returns:
-        List[Dict]: Список словарей со стат. данными с '0'
-        вместо 'Студия'
+        str: Ключ сортировки
     """
-    for row in data:
-        if row['rooms_count_title'] == 'Студия':
-            row['rooms_count_title'] = '0'
-    return data
-
-
-def set_0_to_studio(data: List[Dict]) -> List[Dict]:
-    """Установка значения 'Студия' вместо '0' после сортировки
-
-    Args:
-        data (List[Dict]): Список словарей со стат. данными с '0'
-        вместо 'Студия'
-
-    Returns:
-        List[Dict]: Список словарей со стат. данными с 'Студия'
-        вместо '0'
-    """
-    for row in data:
-        if row['rooms_count_title'] == '0':
-            row['rooms_count_title'] = 'Студия'
-    return data
+    return ROOMS_COUNT_SORT_KEYS.get(rooms_count_title, rooms_count_title)
 
 
 def sorted_data(data: List[Dict]) -> List[Dict]:
     """Сортировка списка словарей со стат. данными
+    по rb_title и rooms_count_title, сами словари не изменяются
 
     Args:
         data (List[Dict]): Список словарей для сортировки
@@ -274,39 +173,15 @@ def sorted_data(data: List[Dict]) -> List[Dict]:
         return data
 
     if 'rb_title' in data[0] and 'rooms_count_title' in data[0]:
-        data = set_studio_to_0(data)
-        data = multikeysort(data, ['rb_title', 'rooms_count_title'])
-
-        data = set_0_to_studio(data)
-        return data
+        return sorted(data, key=lambda row: (row['rb_title'], get_rooms_count_sort_key(row['rooms_count_title'])))
     if 'rooms_count_title' in data[0]:
-        data = set_studio_to_0(data)
-        data = multikeysort(data, ['rooms_count_title'])
-        data = set_0_to_studio(data)
-        return data
+        return sorted(data, key=lambda row: get_rooms_count_sort_key(row['rooms_count_title']))
     if 'rb_title' in data[0]:
-        return multikeysort(data, ['rb_title'])
+        return sorted(data, key=itemgetter('rb_title'))
 
     return data
 
 
-def get_diff_data(first_data: DataFrame, second_data: DataFrame) -> DataFrame:
-    """
-    Получение уникальный записей в first_data
-    относительно second_data
-
-
-    Args:
-        first_data (DataFrame): Где искать уникальные записи
-        second_data (DataFrame): Где искать повторяющиеся записи
-
-    Returns:
-        DataFrame: Уникальные записи из first_data
-    """
-    diffed_ids = np.setdiff1d(first_data['id_custome'], second_data['id_custome'])
-    return first_data[first_data['id_custome'].isin(diffed_ids)]
-
-
 # Вспомогательные функции при рендеринге данных в текстовый вывод для чат-бота
 #
 #
@@ -361,6 +236,96 @@ def get_cons_all_rb(data: Dict, type_only_today: str = '') -> str:
     return body_data
 
 
+def gen_all_types_text(types_data: Dict) -> str:
+    """Сборка текста по всем типам вместе из фрагментов по каждому типу,
+    тексты типов разделяются пустой строкой
+
+    Args:
+        types_data (Dict): Фрагменты по типам, см. gen_cons_each_count_flats()
+
+    Returns:
+        str: Текст по всем типам вместе без заголовка
+    """
+    types_texts = [row['head'] + '\n' + row['body'] for row in types_data['all_types_list']]
+    if not types_texts:
+        return ''
+    all_types_text = '\n\n'.join(types_texts)
+    # Текст, построенный по последней записи данных, не завершается переводом строки,
+    # если он не единственный
+    if len(types_texts) == 1 or not types_data['is_data_end']:
+        all_types_text += '\n'
+    return all_types_text
+
+
+def gen_type_text(header: str, type_head: str, body: str) -> str:
+    """Сборка текста по одному типу
+
+    Args:
+        header (str): Заголовок сообщения
+        type_head (str): Описание типа
+        body (str): Текст со стат. данными типа
+
+    Returns:
+        str: Текст по типу
+    """
+    return header + '\n' + type_head + '\n' + body
+
+
+def get_rooms_count_descs(rooms_count_title: str) -> Tuple[str, str]:
+    """Получение описаний типа квартир для заголовка и для меню
+
+    Args:
+        rooms_count_title (str): Значение rooms_count_title
+
+    Returns:
+        Tuple[str, str]: Описание для заголовка и описание для меню
+    """
+    if rooms_count_title == 'Студия':
+        return 'Studios', 'Studios'
+    return f"{rooms_count_title}-room apartments", f"{rooms_count_title}-room"
+
+
+def get_rb_title_desc(rb_title: str) -> str:
+    """Получение описания ЖК для заголовка и для меню
+
+    Args:
+        rb_title (str): Значение rb_title
+
+    Returns:
+        str: Описание ЖК
+    """
+    return "🏠 " + rb_title
+
+
+def gen_types_data(rows: List[Dict], rows_heads: List[Tuple[str, str]], last_row: Dict,
+                   is_daily_part: bool = False, type_only_today: str = '') -> Dict:
+    """Генерация фрагментов по каждому типу: описания и текста со стат. данными.
+    Заголовки сообщений к фрагментам добавляются при выводе
+
+    Args:
+        rows (List[Dict]): Стат. данные типов
+        rows_heads (List[Tuple[str, str]]): Описание для меню и описание
+        для текста каждого типа
+        last_row (Dict): Последняя запись всех данных
+        is_daily_part (bool, optional): Только критические значения. Defaults to False.
+        type_only_today (str, optional): тип данных сравнимаемых со старыми,
+        если сравниваются данные по текущей даты. Defaults to ''.
+
+    Returns:
+        Dict: 'all_types_list' - фрагменты типов с непустым текстом:
+        'type' - описание для меню, 'head' - описание для текста, 'body' - текст,
+        'is_data_end' - последний фрагмент построен по last_row
+    """
+    all_types_list = []
+    is_data_end = False
+    for row, (type_menu_desc, type_head_desc) in zip(rows, rows_heads):
+        body_text = gen_body_text(row, insignificant_only=is_daily_part, type_only_today=type_only_today)
+        if body_text:
+            all_types_list.append({'type': type_menu_desc, 'head': type_head_desc, 'body': body_text})
+            is_data_end = row is last_row
+    return {'all_types_list': all_types_list, 'is_data_end': is_data_end}
+
+
 def gen_cons_each_count_flats(data: List[Dict],
                               is_daily_part: bool = False,
                               type_only_today: str = '') -> Dict:
@@ -374,49 +339,18 @@ def gen_cons_each_count_flats(data: List[Dict],
         если сравниваются данные по текущей даты. Defaults to ''.
 
     Returns:
-        Dict: Возвращаемое значение, если выбран
-        is_daily_part = True, то расчитываются только критические значения
+        Dict: Фрагменты по каждому типу квартир, см. gen_types_data(),
+        если выбран is_daily_part = True, то расчитываются только критические значения
         Если выбран is_daily_part = False, то расчитываются все значения
     """
     if len(data) == 0:
-        return {'all_types_text': '', 'all_types_list': []}
-
-    # Текст по всем типам вместе
-    all_types_text = ''
-    # Список с текстами по каждому типу отдельно
-    all_types_list = []
-    last_data_index = len(data) - 1
-    for i, row in enumerate(data):
-
-        type_head_desc = ''
-        type_menu_desc = ''
-        if row['rooms_count_title'] == 'Студия':
-            type_head_desc = type_menu_desc = 'Studios'
-        else:
-            type_head_desc = f"{row['rooms_count_title']}-room apartments"
-            type_menu_desc = f"{row['rooms_count_title']}-room"
-
-        if is_daily_part:
-            body_text = gen_body_text(row, insignificant_only=True, type_only_today=type_only_today)
-        else:
-            body_text = gen_body_text(row, insignificant_only=False, type_only_today=type_only_today)
+        return {'all_types_list': [], 'is_data_end': False}
 
-        if body_text:
-            if not all_types_text:
-                all_types_text += type_head_desc + '\n' + body_text + '\n'
-            elif last_data_index != i:
-                all_types_text += '\n' + type_head_desc + '\n' + body_text + '\n'
-            else:
-                all_types_text += '\n' + type_head_desc + '\n' + body_text
-
-            all_types_list.append(
-                {
-                    'type': type_menu_desc,
-                    'text': type_head_desc + '\n' + body_text,
-                }
-            )
-    # [:-1] Вырезаем последний '\n'
-    return {'all_types_text': all_types_text, 'all_types_list': all_types_list}
+    rows_heads = []
+    for row in data:
+        type_head_desc, type_menu_desc = get_rooms_count_descs(row['rooms_count_title'])
+        rows_heads.append((type_menu_desc, type_head_desc))
+    return gen_types_data(data, rows_heads, data[-1], is_daily_part, type_only_today)
 
 
 def gen_cons_each_rb(data: List[Dict],
@@ -432,48 +366,20 @@ def gen_cons_each_rb(data: List[Dict],
         если сравниваются данные по текущей даты. Defaults to ''.
 
     Returns:
-        Dict: Возвращаемое значение, если выбран
-        is_daily_part = True, то расчитываются только критические значения
+        Dict: Фрагменты по каждому ЖК, см. gen_types_data(),
+        если выбран is_daily_part = True, то расчитываются только критические значения
         Если выбран is_daily_part = False, то расчитываются все значения
     """
     if len(data) == 0:
-        return {'all_types_text': '', 'all_types_list': []}
+        return {'all_types_list': [], 'is_data_end': False}
 
-    # Текст по всем типам вместе
-    all_types_text = ''
-    # Список с текстами по каждому типу отдельно
-    all_types_list = []
-
-    last_data_index = len(data) - 1
-    for i, row in enumerate(data):
-
-        type_head_desc = type_menu_desc = "🏠 " + row['rb_title']
-
-        if is_daily_part:
-            body_text = gen_body_text(row, insignificant_only=True, type_only_today=type_only_today)
-        else:
-            body_text = gen_body_text(row, insignificant_only=False, type_only_today=type_only_today)
-
-        if body_text:
-            if not all_types_text:
-                all_types_text += type_head_desc + '\n' + body_text + '\n'
-            elif last_data_index != i:
-                all_types_text += '\n' + type_head_desc + '\n' + body_text + '\n'
-            else:
-                all_types_text += '\n' + type_head_desc + '\n' + body_text
-
-            all_types_list.append(
-                {
-                    'type': type_menu_desc,
-                    'text': type_head_desc + '\n' + body_text,
-                }
-            )
-    # [:-1] Вырезаем последний '\n'
-    return {'all_types_text': all_types_text, 'all_types_list': all_types_list}
+    rows_heads = [(get_rb_title_desc(row['rb_title']),) * 2 for row in data]
+    return gen_types_data(data, rows_heads, data[-1], is_daily_part, type_only_today)
 
 
 def gen_cons_each_rb_to_count_flats(data: List[Dict], type_only_today: str = '') -> Dict:
-    """Генерация текстов в разрезе ЖК по типу квартир
+    """Генерация фрагментов в разрезе ЖК по типу квартир.
+    Записи раскладываются по ЖК за один проход, ЖК идут в порядке data
 
     Args:
         data (List[Dict]): Данные для рендеринга
@@ -481,51 +387,34 @@ def gen_cons_each_rb_to_count_flats(data: List[Dict], type_only_today: str = '')
         если сравниваются данные по текущей даты. Defaults to ''.
 
     Returns:
-        Dict: Возвращаемое значение
+        Dict: 'each_rb_flats_list' - по каждому ЖК 'rb_title'
+        и фрагменты по типам квартир, см. gen_types_data()
     """
     o_data: Dict = {'each_rb_flats_list': []}
     if not data:
         return o_data
 
-    # Список уникальных наменований ЖК
-    rb_titles_unic = list(set([x['rb_title'] for x in data]))
-    # Список уникальных типов квартир
-    # rooms_count_titles_unic = list(set([x['rooms_count_title'] for x in data]))
-    for rb_title in rb_titles_unic:
-        one_rb_flats_stat = {'rb_title': "🏠 " + rb_title, 'all_types_list': [], 'all_types_text': ''}
-
-        last_data_index = len(data) - 1
-        for i, row in enumerate(data):
-
-            if row['rb_title'] != rb_title:
-                continue
-
-            if row['rooms_count_title'] == 'Студия':
-                type_head_desc = type_menu_desc = 'Studios'
-            else:
-                type_head_desc = f"{row['rooms_count_title']}-room apartments"
-                type_menu_desc = f"{row['rooms_count_title']}-room"
-
-            body_text = gen_body_text(row, False, type_only_today)
-            if body_text:
-                if not one_rb_flats_stat['all_types_text']:
-                    one_rb_flats_stat['all_types_text'] += type_head_desc + '\n' + body_text + '\n'
-                elif last_data_index != i:
-                    one_rb_flats_stat['all_types_text'] += '\n' + type_head_desc + '\n' + body_text + '\n'
-                else:
-                    one_rb_flats_stat['all_types_text'] += '\n' + type_head_desc + '\n' + body_text
-
-                one_rb_flats_stat['all_types_list'].append(
-                    {
-                        'type': type_menu_desc,
-                        'text': type_head_desc + '\n' + body_text,
-                    })
-        o_data['each_rb_flats_list'].append(one_rb_flats_stat)
+    # Записи каждого ЖК
+    rb_rows: Dict[str, List[Dict]] = {}
+    for row in data:
+        rb_rows.setdefault(row['rb_title'], []).append(row)
+
+    for rb_title, rows in rb_rows.items():
+        rows_heads = []
+        for row in rows:
+            type_head_desc, type_menu_desc = get_rooms_count_descs(row['rooms_count_title'])
+            rows_heads.append((type_menu_desc, type_head_desc))
+        o_data['each_rb_flats_list'].append({
+            'rb_title': get_rb_title_desc(rb_title),
+            **gen_types_data(rows, rows_heads, data[-1], type_only_today=type_only_today),
+        })
     return o_data
 
 
 def gen_cons_each_count_flats_to_rb(data: List[Dict], type_only_today: str = '') -> Dict:
-    """Генерация текстов в разрезе типов квартир по типу ЖК
+    """Генерация фрагментов в разрезе типов квартир по типу ЖК.
+    Записи раскладываются по типам квартир за один проход,
+    типы квартир идут в порядке сортировки rooms_count_title
 
     Args:
         data (List[Dict]): Данные для рендеринга
@@ -533,46 +422,28 @@ def gen_cons_each_count_flats_to_rb(data: List[Dict], type_only_today: str = '')
         если сравниваются данные по текущей даты. Defaults to ''.
 
     Returns:
-        Dict: Возвращаемое значение
+        Dict: 'each_flats_rb_list' - по каждому типу квартир 'rooms_count_title'
+        в виде описания для меню, 'type_head' - описание для текста
+        и фрагменты по ЖК, см. gen_types_data()
     """
     o_data: Dict = {'each_flats_rb_list': []}
     if not data:
         return o_data
 
-    # Список уникальных типов квартир
-    rooms_count_titles_unic = list(set([x['rooms_count_title'] for x in data]))
-    for rooms_count_title in rooms_count_titles_unic:
-        if rooms_count_title == 'Студия':
-            type_head_desc = type_menu_desc = 'Studios'
-        else:
-            type_menu_desc = f"{rooms_count_title}-room"
-            type_head_desc = f"{rooms_count_title}-room apartments"
-
-        one_flat_rbs_stat: Dict = {'rooms_count_title': str, 'all_types_list': List, 'all_types_text': str}
-        one_flat_rbs_stat = {'rooms_count_title': type_menu_desc, 'all_types_list': [], 'all_types_text': ''}
-
-        last_data_index = len(data) - 1
-        for i, row in enumerate(data):
-
-            if row['rooms_count_title'] != rooms_count_title:
-                continue
-
-            body_text = gen_body_text(row, False, type_only_today)
-            if body_text:
-                type_head_rb_title = "🏠 " + row['rb_title']
-                if not one_flat_rbs_stat['all_types_text']:
-                    one_flat_rbs_stat['all_types_text'] += type_head_rb_title + '\n' + body_text + '\n'
-                elif last_data_index != i:
-                    one_flat_rbs_stat['all_types_text'] += '\n' + type_head_rb_title + '\n' + body_text + '\n'
-                else:
-                    one_flat_rbs_stat['all_types_text'] += '\n' + type_head_rb_title + '\n' + body_text
-
-                one_flat_rbs_stat['all_types_list'].append(
-                    {
-                        'type': type_head_rb_title,
-                        'text': type_head_desc + '\n' + body_text,
-                    })
-        o_data['each_flats_rb_list'].append(one_flat_rbs_stat)
+    # Записи каждого типа квартир
+    rooms_rows: Dict[str, List[Dict]] = {}
+    for row in data:
+        rooms_rows.setdefault(row['rooms_count_title'], []).append(row)
+
+    for rooms_count_title in sorted(rooms_rows, key=get_rooms_count_sort_key):
+        type_head_desc, type_menu_desc = get_rooms_count_descs(rooms_count_title)
+        rows = rooms_rows[rooms_count_title]
+        rows_heads = [(get_rb_title_desc(row['rb_title']),) * 2 for row in rows]
+        o_data['each_flats_rb_list'].append({
+            'rooms_count_title': type_menu_desc,
+            'type_head': type_head_desc,
+            **gen_types_data(rows, rows_heads, data[-1], type_only_today=type_only_today),
+        })
     return o_data
 
 
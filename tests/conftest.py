@@ -0,0 +1,251 @@
+"""Общие данные тестов: синтетический набор данных по трем окружениям
+"""
+import json
+import re
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from modules.data_parser import DataParser
+from modules.db_wrapper import DBWrapper
+
+# Текущая дата синтетического набора данных
+CURRENT_DATE = date(2020, 10, 7)
+# Окружения и id их ЖК, ЖК 2 входит в два окружения
+ARROUNDS = [
+    {'id': '13', 'title': 'AA Group', 'rb_ids': [1, 2]},
+    {'id': '3', 'title': 'BB Group', 'rb_ids': [2, 3, 4]},
+    {'id': '14', 'title': 'CC Group', 'rb_ids': [5]},
+]
+RB_TITLES = {1: 'CityMix', 2: 'Innovation', 3: 'Prokshino', 4: 'Salaryevo park', 5: 'Skolkovskiy'}
+ROOMS_COUNT_TITLES = ['Студия', '1', '2', '3', '4']
+# Настройки подключения к БД, подключение в тестах не открывается
+DB_CONFIG = {'user': 'test', 'password': 'test', 'host': 'localhost', 'port': '5432', 'database': 'test'}
+
+
+def generate_flats_data(flats_count: int = 400, days_count: int = 31, seed: int = 0) -> DataFrame:
+    """Генерация основного набора данных за days_count дней по current_date:
+    квартиры появляются, пропадают и возвращаются, цены иногда меняются
+
+    Args:
+        flats_count (int): Количество квартир
+        days_count (int): Количество дней
+        seed (int): Зерно генератора случайных чисел
+
+    Returns:
+        DataFrame: Данные в схеме основного SELECT SQL-запроса, отсортированные по дате
+    """
+    rng = np.random.default_rng(seed)
+    days = [CURRENT_DATE + timedelta(days=day - days_count + 1) for day in range(days_count)]
+    rows = []
+    for flat_id in range(1000, 1000 + flats_count):
+        rb_id = int(rng.integers(1, len(RB_TITLES) + 1))
+        rooms_count_title = ROOMS_COUNT_TITLES[int(rng.integers(len(ROOMS_COUNT_TITLES)))]
+        total_area = round(float(rng.uniform(20, 120)), 1)
+        price = int(rng.integers(30, 200)) * 100000 + int(rng.integers(0, 100000))
+        first_day = int(rng.integers(-5, days_count))
+        last_day = int(rng.integers(first_day, days_count + 5))
+        for day_index, day in enumerate(days):
+            if not first_day <= day_index <= last_day or rng.random() < 0.05:
+                continue
+            if rng.random() < 0.1:
+                price += int(rng.integers(-5, 6)) * 10000
+            rows.append((flat_id, rooms_count_title, total_area, price, day, rb_id, RB_TITLES[rb_id]))
+
+    data = pd.DataFrame(rows, columns=['id_custome', 'rooms_count_title', 'total_area', 'price',
+                                       'price_actual_date', 'rb_id', 'rb_title'])
+    data['price_actual_date'] = pd.to_datetime(data['price_actual_date'])
+    return data.sort_values('price_actual_date', kind='mergesort', ignore_index=True)
+
+
+def get_arround_data(data: DataFrame, arround_id: str) -> DataFrame:
+    """Срез набора данных по ЖК окружения
+
+    Args:
+        data (DataFrame): Набор данных
+        arround_id (str): id окружения
+
+    Returns:
+        DataFrame: Срез окружения
+    """
+    rb_ids = next(arround['rb_ids'] for arround in ARROUNDS if arround['id'] == arround_id)
+    return data[data['rb_id'].isin(rb_ids)].reset_index(drop=True)
+
+
+def write_csv_dumps(data: DataFrame) -> None:
+    """Запись CSV дампов по всем окружениям, по каждому окружению
+    и дампа принадлежности ЖК к окружениям в текущую директорию
+
+    Args:
+        data (DataFrame): Набор данных
+    """
+    arround_ids = ','.join(arround['id'] for arround in ARROUNDS)
+    data.to_csv(f'.\\data\\{arround_ids}.csv', index=False, encoding='utf-8')
+    for arround in ARROUNDS:
+        get_arround_data(data, arround['id']).to_csv(f".\\data\\{arround['id']}.csv", index=False, encoding='utf-8')
+    arround_rb_rows = [{'around_id': int(arround['id']), 'rb_id': rb_id, 'rb_title': RB_TITLES[rb_id]}
+                       for arround in ARROUNDS for rb_id in arround['rb_ids']]
+    with open(f'.\\data\\around_rb_list_{arround_ids}.json', 'w', encoding='utf-8') as file:
+        json.dump(arround_rb_rows, file)
+
+
+def write_parser_dumps(data: DataFrame, dump_ext: str) -> None:
+    """Запись дампов по всем окружениям и по каждому окружению через
+    DataParser.dump_data(), как при получении данных из БД
+
+    Args:
+        data (DataFrame): Набор данных
+        dump_ext (str): Расширение дампов: SNAPSHOT_FILE_EXT или DAY_STORE_DIR_EXT
+    """
+    arround_ids = ','.join(arround['id'] for arround in ARROUNDS)
+    dumps = [(arround_ids, data)] + [(arround['id'], get_arround_data(data, arround['id'])) for arround in ARROUNDS]
+    for dump_name, dump_data in dumps:
+        data_parser = DataParser(DB_CONFIG)
+        data_parser.init_data(data=dump_data)
+        data_parser.dump_data(f'.\\data\\{dump_name}{dump_ext}')
+
+
+def get_common_stat_aggregates(data: DataFrame) -> DataFrame:
+    """Агрегаты общей статистики, которые возвращает SELECT SQL-запрос по GROUPING SETS
+    из DataRender, посчитанные по набору данных в pandas
+
+    Args:
+        data (DataFrame): Набор данных
+
+    Returns:
+        DataFrame: Агрегаты текущей и предыдущей даты по всем группировкам
+    """
+    current_date = data['price_actual_date'].max()
+    flats = data[data['price_actual_date'] >= current_date - pd.Timedelta(days=1)]
+    rows = []
+    # grouping_id как GROUPING(rb_title, rooms_count_title)
+    for grouping_id, group_rows in [(3, []), (2, ['rooms_count_title']), (1, ['rb_title']),
+                                    (0, ['rb_title', 'rooms_count_title'])]:
+        groups = flats.groupby(group_rows if len(group_rows) > 1 else group_rows[0]) if group_rows else [((), flats)]
+        for group_key, group in groups:
+            group_key = group_key if isinstance(group_key, tuple) else (group_key,)
+            row = {'grouping_id': grouping_id, 'rb_title': None, 'rooms_count_title': None,
+                   **dict(zip(group_rows, group_key)), 'price_actual_date': current_date}
+            for prefix, date_group in [('cur', group[group['price_actual_date'] == current_date]),
+                                       ('prev', group[group['price_actual_date'] < current_date])]:
+                row[f'{prefix}_count'] = len(date_group)
+                row[f'{prefix}_avg_total_area'] = date_group['total_area'].mean()
+                row[f'{prefix}_avg_price'] = date_group['price'].mean()
+                # sum() пустой группы в SQL - NULL
+                row[f'{prefix}_sum_price'] = date_group['price'].sum() if len(date_group) else np.nan
+                row[f'{prefix}_sum_total_area'] = date_group['total_area'].sum() if len(date_group) else np.nan
+                row[f'{prefix}_ids_count'] = date_group['id_custome'].nunique()
+            row['all_ids_count'] = group['id_custome'].nunique()
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def get_chat_config(**options: str) -> Dict[str, str]:
+    """Настройки чат-бота для загрузки синтетического набора данных из дамп файлов
+
+    Args:
+        options (str): Дополнительные настройки
+
+    Returns:
+        Dict[str, str]: Настройки чат-бота
+    """
+    return {
+        'token': '',
+        'arround_ids': ', '.join(arround['id'] for arround in ARROUNDS),
+        'arround_titles': ', '.join(arround['title'] for arround in ARROUNDS),
+        'current_date': str(CURRENT_DATE),
+        'is_load_from_dump': '1',
+        **options,
+    }
+
+
+def get_presenter_texts(presenter) -> List:
+    """Получение всех текстов и меню, которые чат-бот выводит по окружениям
+
+    Args:
+        presenter (DataPresenter): Презентер отрендеренных данных
+
+    Returns:
+        List: Тексты и списки меню в порядке обхода
+    """
+    texts: List = [presenter.get_consolidation_arounds_report(),
+                   sorted(presenter.get_all_using_flat_types()), sorted(presenter.get_all_using_rb_names())]
+    for arround_title in presenter.get_arounds_names():
+        presenter.set_current_around(arround_title)
+        texts.append(presenter.get_week_report())
+        for stat_type in ['summary_stat', 'new_stat', 'old_stat', 'sell_stat']:
+            presenter.set_main_stat_type(stat_type)
+            texts += [presenter.get_cut_cons_report(), presenter.get_full_cons_report(),
+                      presenter.get_count_flats_all_text(), presenter.get_each_rb_all_text(),
+                      presenter.get_flat_types(), presenter.get_rb_names()]
+            for flat_type in sorted(presenter.get_all_using_flat_types()):
+                presenter.set_flat_type(flat_type)
+                rb_names = presenter.get_rb_names_by_selected_flat_type() or []
+                texts += [presenter.get_selected_flat_type_data(), presenter.get_each_rb_data_by_flat_type(), rb_names]
+                texts += [presenter.get_rb_data_by_flat_type(rb_name) for rb_name in rb_names]
+            for rb_name in sorted(presenter.get_all_using_rb_names()):
+                presenter.set_rb_name(rb_name)
+                flat_types = presenter.get_flat_types_by_selected_rb_name() or []
+                texts += [presenter.get_selected_rb_name_data(), presenter.get_each_flat_type_by_rb_name(), flat_types]
+                texts += [presenter.get_flat_type_data_by_rb_name(flat_type) for flat_type in flat_types]
+    return texts
+
+
+@pytest.fixture(scope='session')
+def flats_data() -> DataFrame:
+    return generate_flats_data()
+
+
+@pytest.fixture
+def fake_db(monkeypatch, flats_data):
+    """Подмена запросов DBWrapper к БД: результаты SELECT SQL-запросов DataRender
+    строятся по синтетическому набору данных, подключение к БД не открывается.
+    Набор данных 'data' можно заменить, чтобы изменить данные в БД
+    """
+    arround_rb_rows = [{'around_id': int(arround['id']), 'rb_id': rb_id, 'rb_title': RB_TITLES[rb_id]}
+                       for arround in ARROUNDS for rb_id in arround['rb_ids']]
+    db: Dict = {'data': flats_data, 'queries': []}
+
+    def get_query_data(query: str) -> DataFrame:
+        arround_ids = re.search(r'around_id in \(([\d,\s]+)\)', query).group(1).split(',')
+        rb_ids = [row['rb_id'] for row in arround_rb_rows if str(row['around_id']) in arround_ids]
+        from_date = re.search(r">= '(\d{4}-\d{2}-\d{2})'::date", query)
+        from_timestamp = pd.Timestamp(from_date.group(1) if from_date else CURRENT_DATE + timedelta(days=-30))
+        data = db['data']
+        return data[data['rb_id'].isin(rb_ids) & (data['price_actual_date'] >= from_timestamp)].reset_index(drop=True)
+
+    def execute_select_pd(self, str_query: str) -> DataFrame:
+        db['queries'].append(str_query)
+        if 'GROUPING SETS' in str_query:
+            return get_common_stat_aggregates(get_query_data(str_query))
+        return get_query_data(str_query)
+
+    def execute_select(self, str_query: str) -> List[dict]:
+        db['queries'].append(str_query)
+        if 'rows_hash' not in str_query:
+            # id и наименования ЖК окружений
+            arround_ids = re.search(r'around_id in \(([\d,\s]+)\)', str_query).group(1).split(',')
+            return [row for row in arround_rb_rows if str(row['around_id']) in arround_ids]
+        # Отпечаток исходных данных: количество и хеш записей каждого дня
+        data = get_query_data(str_query)
+        rows_hashes = pd.util.hash_pandas_object(
+            data[['id_custome', 'rooms_count_title', 'total_area', 'price', 'rb_id']], index=False)
+        return [{'price_actual_date': day, 'rows_count': len(day_hashes), 'rows_hash': int(day_hashes.sum())}
+                for day, day_hashes in rows_hashes.groupby(data['price_actual_date'])]
+
+    monkeypatch.setattr(DBWrapper, 'execute_select_pd', execute_select_pd)
+    monkeypatch.setattr(DBWrapper, 'execute_select', execute_select)
+    return db
+
+
+@pytest.fixture
+def dump_dir(tmp_path, monkeypatch, flats_data):
+    """Временная текущая директория с CSV дампами синтетического набора данных
+    """
+    monkeypatch.chdir(tmp_path)
+    write_csv_dumps(flats_data)
+    return tmp_path
@@ -0,0 +1,228 @@
+"""Тесты парсера: векторные расчеты дают те же стат. данные,
+что и прямые расчеты по каждой группе и каждому дню
+"""
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+import modules.support_functions as sup_f
+from modules.data_parser import DataParser
+
+from .conftest import CURRENT_DATE, DB_CONFIG
+
+# Геттеры общей статистики по группировкам
+COMMON_STAT_GETTERS = ['get_common_cons_all_rb', 'get_common_cons_each_count_flats',
+                       'get_common_cons_each_rbs', 'get_common_cons_each_rb_to_count_flats']
+
+# Группировки стат. данных
+GROUPINGS = [['rooms_count_title'], ['rb_title'], ['rb_title', 'rooms_count_title']]
+# Промежутки по текущей дате: день, неделя и 31 день
+PERIODS = [(CURRENT_DATE, CURRENT_DATE),
+           (CURRENT_DATE + timedelta(days=-6), CURRENT_DATE),
+           (CURRENT_DATE + timedelta(days=-30), CURRENT_DATE)]
+
+
+def get_period_slice(data: DataFrame, from_date: date, to_date: date) -> DataFrame:
+    return data[(data.price_actual_date >= str(from_date)) & (data.price_actual_date <= str(to_date))]
+
+
+def get_old_data_by_counts(data: DataFrame, from_date: date, to_date: date) -> DataFrame:
+    """Повторяющиеся ежедневно записи прямым подсчетом записей каждого id_custome
+    """
+    data_slice = get_period_slice(data, from_date, to_date)
+    counts = data_slice.groupby('id_custome')['id_custome'].count()
+    old_ids = counts[counts == (to_date - from_date).days + 1].index
+    return data_slice[data_slice['id_custome'].isin(old_ids)].drop_duplicates(subset=['id_custome'])
+
+
+def get_events_data_by_days(data: DataFrame, from_date: date, to_date: date, is_new: bool) -> DataFrame:
+    """Новые или проданные записи по разнице id_custome каждого дня
+    и предыдущего дня в цикле по дням
+    """
+    data_slice = get_period_slice(data, from_date, to_date)
+    check_date = from_date
+    diffed_ids = []
+    while check_date <= to_date:
+        prev_day_ids = data_slice[data_slice.price_actual_date == str(check_date + timedelta(days=-1))]['id_custome']
+        cur_day_ids = data_slice[data_slice.price_actual_date == str(check_date)]['id_custome']
+        diffed_ids += list(np.setdiff1d(cur_day_ids, prev_day_ids) if is_new
+                           else np.setdiff1d(prev_day_ids, cur_day_ids))
+        check_date += timedelta(days=1)
+    return data_slice[data_slice['id_custome'].isin(set(diffed_ids))].drop_duplicates(subset=['id_custome'])
+
+
+def get_group_aggs(group: DataFrame) -> Dict:
+    return {
+        'count': len(group),
+        'avg_total_area': group['total_area'].astype('float64').mean(),
+        'avg_price': group['price'].astype('float64').mean(),
+        'sum_price': group['price'].astype('float64').sum(),
+        'sum_total_area': group['total_area'].astype('float64').sum(),
+    }
+
+
+def get_stat_data_by_groups(data_parser: DataParser, cur_data: DataFrame, prev_data: DataFrame,
+                            group_rows: List[str]) -> List[Dict]:
+    """Стат. данные по агрегатам каждой группы, посчитанным в pandas отдельно
+    """
+    all_data = pd.concat([cur_data.assign(is_cur=True), prev_data.assign(is_cur=False)])
+    output_data = []
+    for group_key, group in all_data.groupby(group_rows if len(group_rows) > 1 else group_rows[0], observed=True):
+        group_key = group_key if isinstance(group_key, tuple) else (group_key,)
+        cur_group, prev_group = group[group['is_cur']], group[~group['is_cur']]
+        cur_ids, prev_ids = set(cur_group['id_custome']), set(prev_group['id_custome'])
+        agg_row_data = data_parser.set_common_agg_attrs(
+            dict(zip(group_rows, group_key)), get_group_aggs(cur_group), get_group_aggs(prev_group),
+            len(cur_ids - prev_ids), len(prev_ids - cur_ids))
+        if agg_row_data:
+            output_data.append(agg_row_data)
+    return sup_f.sorted_data(output_data)
+
+
+def assert_rows_equal(data: DataFrame, expected_data: DataFrame) -> None:
+    """Сравнение записей и их порядка без учета индекса и компактных типов колонок
+    """
+    columns = ['id_custome', 'price', 'price_actual_date']
+    assert data[columns].astype({'price': 'int64'}).values.tolist() == expected_data[columns].values.tolist()
+
+
+@pytest.fixture
+def shuffled_data(flats_data):
+    # Строки дней перемешаны, первая запись id_custome в исходном порядке - не самого раннего дня
+    return flats_data.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.fixture
+def data_parser(flats_data):
+    data_parser = DataParser(DB_CONFIG)
+    data_parser.init_data(data=flats_data)
+    return data_parser
+
+
+@pytest.mark.parametrize('getter', COMMON_STAT_GETTERS)
+def test_pushdown_stat_data_matches_data_stat(fake_db, flats_data, data_parser, getter):
+    pushdown_parser = DataParser(DB_CONFIG)
+    pushdown_parser.init_data(data=flats_data)
+    # Запрос агрегатов по всем окружениям
+    pushdown_parser.init_common_stat_data('SELECT ... WHERE around_id in (13,3,14) GROUP BY GROUPING SETS (...);')
+    assert getattr(pushdown_parser, getter)() == getattr(data_parser, getter)()
+
+
+@pytest.mark.parametrize('from_date,to_date', PERIODS)
+def test_old_data_keeps_first_row_in_source_order(shuffled_data, from_date, to_date):
+    data_parser = DataParser(DB_CONFIG)
+    data_parser.init_data(data=shuffled_data)
+    assert_rows_equal(data_parser.get_old_data(from_date, to_date),
+                      get_old_data_by_counts(shuffled_data, from_date, to_date))
+
+
+def test_snapshot_keeps_source_order(tmp_path, shuffled_data):
+    data_parser = DataParser(DB_CONFIG)
+    data_parser.init_data(data=shuffled_data)
+    data_parser.dump_data(str(tmp_path / 'flats.feather'))
+    assert_rows_equal(pd.read_feather(tmp_path / 'flats.feather'), shuffled_data)
+
+
+@pytest.mark.parametrize('from_date,to_date', PERIODS)
+def test_new_and_sell_data_match_day_by_day_diffs(shuffled_data, from_date, to_date):
+    data_parser = DataParser(DB_CONFIG)
+    data_parser.init_data(data=shuffled_data)
+    assert_rows_equal(data_parser.get_new_data(from_date, to_date),
+                      get_events_data_by_days(shuffled_data, from_date, to_date, is_new=True))
+    assert_rows_equal(data_parser.get_sell_data(from_date, to_date),
+                      get_events_data_by_days(shuffled_data, from_date, to_date, is_new=False))
+
+
+@pytest.mark.parametrize('group_rows', GROUPINGS)
+def test_stat_data_matches_per_group_aggregates(data_parser, group_rows):
+    for cur_data, prev_data in [(data_parser.data_current_day, data_parser.data_previous_day),
+                                (data_parser.get_days_data(CURRENT_DATE + timedelta(days=-6), CURRENT_DATE),
+                                 data_parser.get_days_data(CURRENT_DATE + timedelta(days=-13),
+                                                           CURRENT_DATE + timedelta(days=-7)))]:
+        assert data_parser.generate_stat_data(cur_data, prev_data, group_rows) == \
+            get_stat_data_by_groups(data_parser, cur_data, prev_data, group_rows)
+
+
+@pytest.mark.parametrize('group_rows', [[]] + GROUPINGS)
+def test_rollup_stat_cube_matches_per_group_aggregates(data_parser, group_rows):
+    cur_data, prev_data = data_parser.data_current_day, data_parser.data_previous_day
+    stat_cube = data_parser.generate_stat_cube(cur_data, prev_data)
+    # Итог по всем записям - одна группа
+    expected_data = get_stat_data_by_groups(data_parser, cur_data.assign(all_rows=0), prev_data.assign(all_rows=0),
+                                            group_rows or ['all_rows'])
+    if not group_rows:
+        expected_data = [{key: value for key, value in row.items() if key != 'all_rows'} for row in expected_data]
+    assert data_parser.rollup_stat_cube(stat_cube, group_rows) == expected_data
+
+
+def test_window_presence_matches_direct_counts(flats_data, data_parser):
+    # Окна по номерам дней: сдвиги на день вперед и назад, сужение и расширение,
+    # скачок на непересекающееся окно и пустое окно
+    windows = [(0, 31), (1, 31), (1, 30), (2, 31), (0, 5), (3, 8), (20, 25), (10, 12),
+               (11, 30), (30, 31), (5, 5), (0, 31), (8, 15), (7, 14)]
+    for from_day_index, to_day_index in windows:
+        window_days = data_parser.data_days[from_day_index:to_day_index]
+        window_data = flats_data[flats_data['price_actual_date'].isin(window_days)]
+        counts = window_data['id_custome'].value_counts()
+        expected_presence = counts.reindex(data_parser.data_ids, fill_value=0).to_numpy()
+        presence = data_parser.get_window_presence(from_day_index, to_day_index)
+        assert presence.tolist() == expected_presence.tolist(), (from_day_index, to_day_index)
+
+
+def test_int64_keys_match_tuple_sets(data_parser):
+    rng = np.random.default_rng(1)
+    sizes = [7, 1, 1000]
+    a_codes = [rng.integers(0, size, 500) for size in sizes]
+    b_codes = [rng.integers(0, size, 500) for size in sizes]
+    a_keys = data_parser.encode_int64_keys(a_codes, sizes)
+    b_keys = data_parser.encode_int64_keys(b_codes, sizes)
+
+    def decode_tuples(keys):
+        return [tuple(int(code) for code in codes) for codes in zip(*data_parser.decode_int64_keys(keys, sizes))]
+
+    a_tuples, b_tuples = set(zip(*a_codes)), set(zip(*b_codes))
+    # Порядок ключей совпадает с порядком кортежей
+    assert decode_tuples(np.unique(a_keys)) == sorted(a_tuples)
+    assert decode_tuples(np.intersect1d(a_keys, b_keys)) == sorted(a_tuples & b_tuples)
+    assert decode_tuples(np.setdiff1d(a_keys, b_keys)) == sorted(a_tuples - b_tuples)
+    with pytest.raises(Exception):
+        data_parser.encode_int64_keys(a_codes, [2 ** 32, 2 ** 32])
+
+
+def test_group_codes_match_tuple_groups(flats_data, data_parser):
+    rb_titles = flats_data['rb_title'].to_numpy().copy()
+    rb_titles[::10] = None
+    columns = [rb_titles, flats_data['rooms_count_title'].to_numpy()]
+    row_group_codes, groups_keys = data_parser.get_group_codes(columns)
+
+    groups = list(zip(*groups_keys))
+    assert len(set(groups)) == len(groups)
+    for row_group_code, row_key in zip(row_group_codes, zip(*columns)):
+        if row_key[0] is None:
+            assert row_group_code == -1
+        else:
+            assert groups[row_group_code] == row_key
+
+
+@pytest.mark.parametrize('days_count', [1, 7])
+@pytest.mark.parametrize('group_rows', [[]] + GROUPINGS)
+def test_last_days_stat_data_matches_per_group_aggregates(monkeypatch, data_parser, group_rows, days_count):
+    # Суммы дневных агрегатов и агрегаты по записям отличаются порядком сложения,
+    # поэтому средние сравниваются без округления
+    for round_name in ['round_area', 'round_million', 'round_thousand']:
+        monkeypatch.setattr(sup_f, round_name, float)
+    cur_from_date = CURRENT_DATE + timedelta(days=-(days_count - 1))
+    prev_from_date, prev_to_date = cur_from_date + timedelta(days=-days_count), cur_from_date + timedelta(days=-1)
+    cur_data = data_parser.get_days_data(cur_from_date, CURRENT_DATE).assign(all_rows=0)
+    prev_data = data_parser.get_days_data(prev_from_date, prev_to_date).assign(all_rows=0)
+    expected_data = get_stat_data_by_groups(data_parser, cur_data, prev_data, group_rows or ['all_rows'])
+    for row in expected_data:
+        row.pop('all_rows', None)
+        row['pd_price_actual_date'] = prev_to_date
+        row['price_actual_date'] = CURRENT_DATE
+    stat_data = data_parser.get_last_days_stat_data(days_count, group_rows)
+    assert stat_data == [pytest.approx(row) for row in expected_data]
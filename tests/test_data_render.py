@@ -0,0 +1,152 @@
+"""Тесты рендеринга: режимы загрузки и рендеринга дают те же тексты,
+что и рендеринг каждого окружения из его CSV дампа
+"""
+import logging
+import os
+
+import pandas as pd
+import pytest
+
+from modules.data_parser import DAY_STORE_DIR_EXT, SNAPSHOT_FILE_EXT, DataParser
+from modules.data_presenter import DataPresenter
+from modules.data_render import RENDERED_SNAPSHOT_FILE_PATH
+from modules.db_wrapper import DBWrapper
+
+from .conftest import (CURRENT_DATE, DB_CONFIG, get_chat_config, get_presenter_texts, write_csv_dumps,
+                       write_parser_dumps)
+
+# Режимы, тексты которых сравниваются с текстами по CSV дампам окружений:
+# настройки чат-бота и расширение дампов, которые пишутся вместо CSV дампов
+RENDER_MODES = {
+    # Срезы окружений строятся в памяти из набора данных по всем окружениям
+    'partition': ({'is_partition_in_memory': '1'}, ''),
+    # Колоночные снимки вместо CSV дампов
+    'feather': ({}, SNAPSHOT_FILE_EXT),
+    # Хранилища по дням вместо CSV дампов
+    'day_store': ({'is_dump_to_day_store': '1'}, DAY_STORE_DIR_EXT),
+    # Разделы рендерятся при запросе, в том числе повторно после вытеснения из кеша
+    'lazy': ({'is_lazy_render': '1'}, ''),
+    'lazy_small_cache': ({'is_lazy_render': '1', 'render_cache_size': '2'}, ''),
+    # Окружения рендерятся в процессах пула
+    'parallel': ({'is_parallel_render': '1', 'render_workers': '2'}, ''),
+}
+
+# Режимы получения данных из БД, тексты которых сравниваются с текстами по CSV дампам окружений
+DB_RENDER_MODES = {
+    'db': {},
+    # Общая статистика агрегатами в БД, без набора данных по всем окружениям
+    'pushdown': {'is_stat_pushdown': '1'},
+    'pushdown_partition': {'is_stat_pushdown': '1', 'is_partition_in_memory': '1'},
+    'incremental': {'is_incremental_ingest': '1'},
+}
+
+# Режимы рендеринга, тексты которых при загрузке из снимка отрендеренных данных
+# сравниваются с текстами по CSV дампам окружений
+SNAPSHOT_RENDER_MODES = {
+    'eager': {},
+    # Разделы рендерятся при запросе по стат. данным из снимка
+    'lazy': {'is_lazy_render': '1'},
+}
+
+
+def forbid_construction(monkeypatch, *classes) -> None:
+    """Запрет создания объектов классов: при попадании в снимок
+    данные не получаются и не обрабатываются
+    """
+    def raise_on_init(self, *args, **kwargs):
+        raise AssertionError(f'{type(self).__name__} has been created on the snapshot hit')
+
+    for cls in classes:
+        monkeypatch.setattr(cls, '__init__', raise_on_init)
+
+
+@pytest.fixture
+def expected_texts(dump_dir):
+    return get_presenter_texts(DataPresenter(get_chat_config(), DB_CONFIG))
+
+
+@pytest.mark.parametrize('mode', RENDER_MODES)
+def test_render_mode_matches_csv_render(dump_dir, flats_data, expected_texts, mode):
+    chat_options, dump_ext = RENDER_MODES[mode]
+    if dump_ext:
+        write_parser_dumps(flats_data, dump_ext)
+    texts = get_presenter_texts(DataPresenter(get_chat_config(**chat_options), DB_CONFIG))
+    assert texts == expected_texts
+
+
+@pytest.mark.parametrize('mode', DB_RENDER_MODES)
+def test_db_render_mode_matches_csv_render(dump_dir, fake_db, expected_texts, mode):
+    chat_config = get_chat_config(is_load_from_dump='0', **DB_RENDER_MODES[mode])
+    texts = get_presenter_texts(DataPresenter(chat_config, DB_CONFIG))
+    assert texts == expected_texts
+
+
+def test_pushdown_removes_stale_all_arrounds_dump(dump_dir, fake_db):
+    DataPresenter(get_chat_config(is_load_from_dump='0', is_stat_pushdown='1'), DB_CONFIG)
+    assert not os.path.exists('.\\data\\13,3,14.csv')
+    assert os.path.exists('.\\data\\13.feather')
+    with pytest.raises(Exception, match='There is no dump'):
+        DataPresenter(get_chat_config(), DB_CONFIG)
+
+
+def test_lazy_render_cache_evicts_least_recently_used(dump_dir):
+    presenter = DataPresenter(get_chat_config(is_lazy_render='1', render_cache_size='2'), DB_CONFIG)
+    presenter.set_current_around('AA Group')
+    presenter.set_main_stat_type('summary_stat')
+    summary_cut_text = presenter.get_cut_cons_report()
+    assert presenter.get_cut_cons_report() == summary_cut_text
+    presenter.get_full_cons_report()
+    # Сокращенная сводка становится последней использованной
+    presenter.get_cut_cons_report()
+    assert presenter.get_render_cache_stats() == {'size': 2, 'max_size': 2, 'hits': 2, 'misses': 2}
+
+    # Новый раздел вытесняет полную сводку, сокращенная остается в кеше
+    presenter.set_main_stat_type('new_stat')
+    presenter.get_cut_cons_report()
+    presenter.set_main_stat_type('summary_stat')
+    assert presenter.get_cut_cons_report() == summary_cut_text
+    assert presenter.get_render_cache_stats() == {'size': 2, 'max_size': 2, 'hits': 3, 'misses': 3}
+    presenter.get_full_cons_report()
+    assert presenter.get_render_cache_stats() == {'size': 2, 'max_size': 2, 'hits': 3, 'misses': 4}
+
+
+def test_parallel_render_logs_worker_failure_with_arround(dump_dir, caplog):
+    os.remove('.\\data\\14.csv')
+    with caplog.at_level(logging.INFO):
+        with pytest.raises(Exception, match=r'arround 14 \(CC Group\)'):
+            DataPresenter(get_chat_config(is_parallel_render='1', render_workers='2'), DB_CONFIG)
+    # Записи процессов пула приходят в хендлеры родителя с трассировкой в тексте записи
+    worker_errors = [record.getMessage() for record in caplog.records
+                     if record.levelno == logging.ERROR and record.process != os.getpid()]
+    assert len(worker_errors) == 1
+    assert worker_errors[0].startswith('Rendering of arround 14 (CC Group) has been failed\nTraceback')
+    assert 'There is no dump' in worker_errors[0]
+
+
+@pytest.mark.parametrize('mode', SNAPSHOT_RENDER_MODES)
+def test_snapshot_render_matches_csv_render(dump_dir, monkeypatch, expected_texts, mode):
+    chat_config = get_chat_config(is_rendered_snapshot='1', **SNAPSHOT_RENDER_MODES[mode])
+    assert get_presenter_texts(DataPresenter(chat_config, DB_CONFIG)) == expected_texts
+    assert os.path.exists(RENDERED_SNAPSHOT_FILE_PATH)
+
+    forbid_construction(monkeypatch, DataParser, DBWrapper)
+    assert get_presenter_texts(DataPresenter(chat_config, DB_CONFIG)) == expected_texts
+
+
+def test_db_snapshot_is_rendered_again_on_price_change(dump_dir, monkeypatch, fake_db, flats_data):
+    chat_config = get_chat_config(is_load_from_dump='0', is_rendered_snapshot='1', is_lazy_render='1')
+    texts = get_presenter_texts(DataPresenter(chat_config, DB_CONFIG))
+    with monkeypatch.context() as patch:
+        # Подключение к БД нужно только для отпечатка исходных данных
+        forbid_construction(patch, DataParser)
+        assert get_presenter_texts(DataPresenter(chat_config, DB_CONFIG)) == texts
+
+    # Количество записей каждого дня то же, изменилась цена одной квартиры текущего дня
+    changed_data = flats_data.copy()
+    changed_row = changed_data.index[changed_data['price_actual_date'] == pd.Timestamp(CURRENT_DATE)][0]
+    changed_data.loc[changed_row, 'price'] += 100000000
+    fake_db['data'] = changed_data
+    changed_texts = get_presenter_texts(DataPresenter(chat_config, DB_CONFIG))
+    assert changed_texts != texts
+    write_csv_dumps(changed_data)
+    assert changed_texts == get_presenter_texts(DataPresenter(get_chat_config(), DB_CONFIG))
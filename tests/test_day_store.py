@@ -0,0 +1,80 @@
+"""Тесты хранилища основного набора данных по дням
+"""
+import os
+from datetime import timedelta
+
+import pandas as pd
+
+from modules.day_store import DayStore
+
+from .conftest import CURRENT_DATE
+
+
+def test_store_is_created_on_first_write(tmp_path, flats_data):
+    store_dir = str(tmp_path / 'flats.days')
+    day_store = DayStore(store_dir)
+    assert not os.path.exists(store_dir)
+    assert day_store.get_dates() == []
+
+    day_store.write_data(flats_data)
+    assert day_store.get_dates() == sorted(flats_data['price_actual_date'].dt.date.unique())
+
+
+def test_read_data_returns_written_days(tmp_path, flats_data):
+    day_store = DayStore(str(tmp_path / 'flats.days'))
+    day_store.write_data(flats_data)
+
+    from_date = CURRENT_DATE + timedelta(days=-7)
+    data = day_store.read_data(from_date, CURRENT_DATE)
+    expected_data = flats_data[flats_data['price_actual_date'].dt.date >= from_date].reset_index(drop=True)
+    assert data['rb_title'].dtype == 'category'
+    pd.testing.assert_frame_equal(data.astype({'rooms_count_title': object, 'rb_title': object}), expected_data)
+
+
+def test_read_data_conforms_days_to_last_schema(tmp_path, flats_data):
+    day_store = DayStore(str(tmp_path / 'flats.days'))
+    previous_day = flats_data['price_actual_date'].dt.date < CURRENT_DATE
+    # Дни, сохраненные до появления колонки rb_id
+    day_store.write_data(flats_data[previous_day].drop(columns=['rb_id']))
+    day_store.write_data(flats_data[~previous_day])
+
+    data = day_store.read_data()
+    assert list(data.columns) == list(flats_data.columns)
+    assert data['rb_id'].isna().sum() == previous_day.sum()
+    assert (data['rb_id'][~previous_day.to_numpy()] == flats_data['rb_id'][~previous_day]).all()
+
+
+def test_remove_dates_outside(tmp_path, flats_data):
+    day_store = DayStore(str(tmp_path / 'flats.days'))
+    day_store.write_data(flats_data)
+
+    from_date = CURRENT_DATE + timedelta(days=-3)
+    day_store.remove_dates_outside(from_date, CURRENT_DATE + timedelta(days=-1))
+    assert day_store.get_dates() == [from_date + timedelta(days=day) for day in range(3)]
+
+
+def test_update_data_refetches_partial_last_day(tmp_path, flats_data):
+    day_store = DayStore(str(tmp_path / 'flats.days'))
+    days = flats_data['price_actual_date'].dt.date
+    last_stored_date = CURRENT_DATE + timedelta(days=-2)
+    # Последний день сохранен неполным, а день позже текущей даты остался
+    # от загрузки с другой текущей датой
+    stored_data = flats_data[days < last_stored_date]
+    partial_data = flats_data[days == last_stored_date].iloc[::2]
+    future_data = flats_data[days == CURRENT_DATE].assign(
+        price_actual_date=pd.Timestamp(CURRENT_DATE + timedelta(days=1)))
+    day_store.write_data(pd.concat([stored_data, partial_data, future_data]))
+
+    requested_dates = []
+
+    def get_data(from_date):
+        requested_dates.append(from_date)
+        return flats_data[days >= from_date]
+
+    from_date = CURRENT_DATE + timedelta(days=-30)
+    data = day_store.update_data(get_data, from_date, CURRENT_DATE)
+
+    assert requested_dates == [last_stored_date]
+    assert day_store.get_dates() == [from_date + timedelta(days=day) for day in range(31)]
+    expected_data = flats_data[days >= from_date].reset_index(drop=True)
+    pd.testing.assert_frame_equal(data.astype({'rooms_count_title': object, 'rb_title': object}), expected_data)
@@ -0,0 +1,96 @@
+"""Тесты генерации фрагментов в разрезе ЖК по типу квартир и типов квартир по ЖК:
+раскладка записей за один проход дает те же тексты, что и просмотр всех записей
+по каждому ЖК или типу квартир
+"""
+from typing import Dict, List
+
+import pytest
+
+import modules.support_functions as sup_f
+from modules.data_parser import DataParser
+
+from .conftest import DB_CONFIG
+
+# Геттеры стат. данных по ЖК и типам квартир каждого типа статистики
+EACH_RB_TO_COUNT_FLATS_GETTERS = ['get_common_cons_each_rb_to_count_flats', 'get_new_cons_each_rb_to_count_flats',
+                                  'get_old_cons_each_rb_to_count_flats', 'get_sell_cons_each_rb_to_count_flats']
+
+
+def gen_group_texts_by_scans(data: List[Dict], group_row: str, get_type_desc) -> Dict[str, Dict]:
+    """Тексты по каждой группе просмотром всех записей для каждого уникального
+    значения group_row, как до раскладки записей за один проход
+
+    Args:
+        data (List[Dict]): Стат. данные
+        group_row (str): Строка группировки: rb_title или rooms_count_title
+        get_type_desc: Описание типа внутри группы по записи
+
+    Returns:
+        Dict[str, Dict]: По значению group_row 'all_types_text' и 'all_types_list'
+        из описания типа и текста со стат. данными
+    """
+    groups = {}
+    last_data_index = len(data) - 1
+    for group_title in set(row[group_row] for row in data):
+        all_types_text = ''
+        all_types_list = []
+        for i, row in enumerate(data):
+            if row[group_row] != group_title:
+                continue
+            body_text = sup_f.gen_body_text(row, False)
+            if body_text:
+                type_desc = get_type_desc(row)
+                if not all_types_text:
+                    all_types_text += type_desc + '\n' + body_text + '\n'
+                elif last_data_index != i:
+                    all_types_text += '\n' + type_desc + '\n' + body_text + '\n'
+                else:
+                    all_types_text += '\n' + type_desc + '\n' + body_text
+                all_types_list.append((type_desc, body_text))
+        groups[group_title] = {'all_types_text': all_types_text, 'all_types_list': all_types_list}
+    return groups
+
+
+def get_group_texts(types_data: Dict) -> Dict:
+    return {
+        'all_types_text': sup_f.gen_all_types_text(types_data),
+        'all_types_list': [(row['head'], row['body']) for row in types_data['all_types_list']],
+    }
+
+
+@pytest.fixture(scope='module')
+def data_parser(flats_data):
+    data_parser = DataParser(DB_CONFIG)
+    data_parser.init_data(data=flats_data)
+    return data_parser
+
+
+@pytest.mark.parametrize('getter', EACH_RB_TO_COUNT_FLATS_GETTERS)
+def test_each_rb_to_count_flats_matches_scans(data_parser, getter):
+    data = getattr(data_parser, getter)()
+    each_rb_flats_list = sup_f.gen_cons_each_rb_to_count_flats(data)['each_rb_flats_list']
+
+    expected_groups = gen_group_texts_by_scans(
+        data, 'rb_title', lambda row: sup_f.get_rooms_count_descs(row['rooms_count_title'])[0])
+    assert {row['rb_title']: get_group_texts(row) for row in each_rb_flats_list} == \
+        {sup_f.get_rb_title_desc(rb_title): group for rb_title, group in expected_groups.items()}
+    # ЖК идут в порядке стат. данных
+    rb_titles = [row['rb_title'] for row in data]
+    assert [row['rb_title'] for row in each_rb_flats_list] == \
+        [sup_f.get_rb_title_desc(rb_title) for rb_title in sorted(set(rb_titles), key=rb_titles.index)]
+
+
+@pytest.mark.parametrize('getter', EACH_RB_TO_COUNT_FLATS_GETTERS)
+def test_each_count_flats_to_rb_matches_scans(data_parser, getter):
+    data = getattr(data_parser, getter)()
+    each_flats_rb_list = sup_f.gen_cons_each_count_flats_to_rb(data)['each_flats_rb_list']
+
+    expected_groups = gen_group_texts_by_scans(
+        data, 'rooms_count_title', lambda row: sup_f.get_rb_title_desc(row['rb_title']))
+    assert {row['rooms_count_title']: get_group_texts(row) for row in each_flats_rb_list} == \
+        {sup_f.get_rooms_count_descs(rooms_count_title)[1]: group
+         for rooms_count_title, group in expected_groups.items()}
+    # Типы квартир идут в порядке сортировки, студии первыми
+    assert [row['type_head'] for row in each_flats_rb_list] == \
+        [sup_f.get_rooms_count_descs(rooms_count_title)[0]
+         for rooms_count_title in sorted(expected_groups, key=sup_f.get_rooms_count_sort_key)]